@@ -0,0 +1,271 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：Benchmark.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/17 16:20
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+Core热点路径的基准测试
+生成指定规模的合成密码本，统计各操作的延迟分位数和进程峰值内存，并与保存的基线对比
+完全离线运行，生成的密码本放在临时目录中，结束后删除
+
+用法：
+    python Benchmark.py                                  # 默认规模 100,10000,100000
+    python Benchmark.py --sizes 100,10000 --save-baseline benchmark_baseline.json
+    python Benchmark.py --baseline benchmark_baseline.json   # 有操作变慢超过容差时返回码为1
+"""
+__version__ = "0.0.1.0"
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+from Breach import BreachCorpus
+from Core import ARGON2_LEGACY_COST, ARGON2_PROFILES, KeyWordNoteBook, calibrate_argon2_cost
+from Storage import STORAGE_TYPES
+
+# Argon2参数预设：fast用于快速度量其余路径，legacy为旧版写死的参数；也可选ARGON2_PROFILES中的档位（本机校准）
+ARGON2_PRESETS = {
+    "fast": {"memory_cost": 8192, "time_cost": 1, "parallelism": 1},
+    "legacy": ARGON2_LEGACY_COST,
+}
+MAIN_KEY = "benchmark-main-key"
+DEFAULT_SIZES = (100, 10_000, 100_000)
+
+
+def peak_rss_mb() -> float | None:
+    """进程峰值常驻内存（MB），无法获取时返回None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux以KB为单位，macOS以字节为单位
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:     # Windows
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def make_items(n: int, rng: random.Random):
+    """生成n个合成条目（KeyItem）"""
+    domains = ["example", "mail", "shop", "bank", "forum", "cloud", "game", "news", "video", "work"]
+    tlds = ["com", "cn", "net", "org", "io"]
+    letters = string.ascii_letters + string.digits
+    for i in range(n):
+        domain = f"{rng.choice(domains)}{i % 997}.{rng.choice(tlds)}"
+        yield {
+            "URL": f"https://www.{domain}/login",
+            "UserName": f"user{i}_{''.join(rng.choices(string.ascii_lowercase, k=5))}",
+            "Password": "".join(rng.choices(letters, k=rng.randint(8, 20))),
+            "LinkURL": f"{rng.choice(domains)}@{domain}" if i % 3 == 0 else "",
+            "Note": f"synthetic entry {i}" if i % 5 == 0 else "",
+        }
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽Core的控制台输出，避免打印影响计时"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(fn, repeat: int) -> list[float]:
+    """重复执行fn，返回每次耗时（秒）"""
+    samples = []
+    with quiet():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict:
+    """延迟分位数（毫秒）"""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {"n": len(ordered), "p50": pct(50), "p90": pct(90), "p99": pct(99), "max": ordered[-1] * 1000}
+
+
+def build_vault(path: str, size: int, args) -> float:
+    """创建size个条目的密码本，返回耗时（秒）"""
+    start = time.perf_counter()
+    with quiet():
+        book = KeyWordNoteBook(MAIN_KEY, path=path, storage=args.storage, argon2_cost=args.argon2_cost)
+        token = book.verify_main_key(MAIN_KEY, issue_token=True, uses=1)
+        results = book.add_items(make_items(size, random.Random(args.seed)), token)
+        book.close()
+    if len(results) != size or not all(r["ok"] for r in results):
+        raise RuntimeError("生成合成密码本失败")
+    return time.perf_counter() - start
+
+
+def build_corpus(path: str, size: int, rng: random.Random):
+    """合成泄露库：size个随机SHA-1摘要"""
+    source = path + ".txt"
+    with open(source, "w") as f:
+        for _ in range(size):
+            f.write(f"{rng.getrandbits(160):040X}:1\n")
+    BreachCorpus.convert(source, path)
+    os.remove(source)
+
+
+def run_size(size: int, workdir: str, args) -> dict:
+    """在一个规模上运行全部操作"""
+    path = os.path.join(workdir, f"vault_{size}.{args.storage}")
+    build_seconds = build_vault(path, size, args)
+    rng = random.Random(args.seed + size)
+
+    def open_book():
+        return KeyWordNoteBook(MAIN_KEY, path=path, journal=args.journal, verify_mode=args.verify_mode,
+                               storage=args.storage, argon2_cost=args.argon2_cost)
+
+    ops = {"load": measure(lambda: open_book().close(), args.heavy_repeat)}
+    with quiet():
+        book = open_book()
+        token = book.verify_main_key(MAIN_KEY, issue_token=True, uses=None, ttl=3600)
+    keys = list(book.load_dict["ItemList"])
+    new_items = make_items(args.heavy_repeat, rng)
+    corpus_path = os.path.join(workdir, f"corpus_{size}.kwbc")
+    build_corpus(corpus_path, size, rng)
+
+    ops["verify_main_key"] = measure(lambda: book.verify_main_key(MAIN_KEY), args.heavy_repeat)
+    ops["get_item_by_id"] = measure(lambda: book.get_item_by_id(rng.choice(keys), token), args.repeat)
+    ops["get_items_by_ids"] = measure(lambda: book.get_items_by_ids(keys, token), args.heavy_repeat)
+    ops["get_non_secret_items"] = measure(book.get_non_secret_items, args.heavy_repeat)
+    ops["score_all"] = measure(lambda: book.score_all(token), args.heavy_repeat)
+    with BreachCorpus(corpus_path) as corpus:
+        ops["check_breached"] = measure(lambda: book.check_breached(corpus, token), args.heavy_repeat)
+    ops["search"] = measure(lambda: book.search(rng.choice(["mail", "user12", "shop3", "bnak"])), args.repeat)
+    ops["find_by_url"] = measure(lambda: book.find_by_url(f"https://login.mail{rng.randrange(997)}.com:443/"),
+                                 args.repeat)
+    ops["_compute_file_hmac"] = measure(lambda: book._compute_file_hmac(book.load_dict), args.repeat)
+    ops["add_item"] = measure(lambda: book.add_item(next(new_items), token), args.heavy_repeat)
+    ops["_sync_to_file"] = measure(book._sync_to_file, args.heavy_repeat)
+    with quiet():
+        book.close()
+
+    return {
+        "build_seconds": build_seconds,
+        "ops": {name: summarize(samples) for name, samples in ops.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """与基线比较p50延迟，返回超出容差的项"""
+    regressions = []
+    for size, current in results["sizes"].items():
+        base = baseline["sizes"].get(size)
+        if base is None:
+            continue
+        for op, stats in current["ops"].items():
+            base_stats = base["ops"].get(op)
+            if base_stats and stats["p50"] > base_stats["p50"] * (1 + tolerance):
+                regressions.append(f"{size:>7} {op:<22} p50 {base_stats['p50']:.3f}ms -> {stats['p50']:.3f}ms")
+    return regressions
+
+
+def print_report(results: dict):
+    print(f"Argon2: {results['meta']['argon2_cost']}  存储: {results['meta']['storage']}  "
+          f"日志模式: {results['meta']['journal']}  校验: {results['meta']['verify_mode']}")
+    for size, data in results["sizes"].items():
+        rss = data["peak_rss_mb"]
+        print(f"\n== {size} 条  生成耗时 {data['build_seconds']:.2f}s  峰值内存 "
+              + (f"{rss:.1f}MB" if rss is not None else "未知"))
+        print(f"{'操作':<22}{'次数':>6}{'p50(ms)':>12}{'p90(ms)':>12}{'p99(ms)':>12}{'max(ms)':>12}")
+        for op, s in data["ops"].items():
+            print(f"{op:<24}{s['n']:>6}{s['p50']:>12.3f}{s['p90']:>12.3f}{s['p99']:>12.3f}{s['max']:>12.3f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="密码本Core基准测试")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="密码本规模，逗号分隔")
+    parser.add_argument("--argon2", choices=[*ARGON2_PRESETS, *ARGON2_PROFILES], default="fast",
+                        help="Argon2参数预设或档位")
+    parser.add_argument("--memory-cost", type=int, help="覆盖预设的memory_cost（KiB）")
+    parser.add_argument("--time-cost", type=int, help="覆盖预设的time_cost")
+    parser.add_argument("--parallelism", type=int, help="覆盖预设的parallelism")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default="json", help="存储后端")
+    parser.add_argument("--journal", action="store_true", help="启用日志模式")
+    parser.add_argument("--verify-mode", choices=("full", "parallel", "lazy"), default="full", help="加载校验方式")
+    parser.add_argument("--repeat", type=int, default=200, help="轻量操作的重复次数")
+    parser.add_argument("--heavy-repeat", type=int, default=5, help="加载、写入等重量操作的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据的随机种子")
+    parser.add_argument("--baseline", help="与该基线文件比较")
+    parser.add_argument("--save-baseline", help="把本次结果保存为基线文件")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的p50变慢比例")
+    parser.add_argument("--json", dest="json_out", help="把完整结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    if args.argon2 in ARGON2_PRESETS:
+        args.argon2_cost = dict(ARGON2_PRESETS[args.argon2])
+    else:   # 档位只校准一次，生成和加载使用同一组参数
+        args.argon2_cost = calibrate_argon2_cost(**ARGON2_PROFILES[args.argon2])
+    for name in ("memory_cost", "time_cost", "parallelism"):
+        if getattr(args, name) is not None:
+            args.argon2_cost[name] = getattr(args, name)
+    sizes = sorted(int(s) for s in args.sizes.split(",") if s.strip())
+
+    results = {
+        "meta": {"argon2_cost": args.argon2_cost, "storage": args.storage, "journal": args.journal,
+                 "verify_mode": args.verify_mode, "python": sys.version.split()[0]},
+        "sizes": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="kwnb_bench_")
+    try:
+        # 从小到大运行，进程峰值内存单调增长，每个规模记录的即是截至该规模的峰值
+        for size in sizes:
+            print(f"正在测试 {size} 条...", file=sys.stderr)
+            results["sizes"][str(size)] = run_size(size, workdir, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n基线已保存到 {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("argon2_cost") != args.argon2_cost \
+                or baseline.get("meta", {}).get("storage") != args.storage:
+            print("\n警告：基线的Argon2参数或存储后端与本次不同，对比结果仅供参考")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n以下操作比基线慢{args.tolerance:.0%}以上：")
+            print("\n".join(regressions))
+            return 1
+        print("\n未发现超过容差的性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：Breach.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/17 23:10
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+离线泄露密码库
+把下载到本地的SHA-1或NTLM泄露哈希列表（每行"HEX"或"HEX:次数"，如Have I Been Pwned的下载文件）
+一次性转换为排序去重的二进制文件，之后内存映射并二分查找，不把整个库读入内存
+
+文件格式（整数均为小端）：
+    头部    MAGIC(4) 版本(2) 哈希类型(1) 分桶位数(1) 条数(8)
+    分桶表  (2^位数+1)个uint64，第i项为摘要前缀为i的第一条记录的序号
+    记录    排序去重后的完整摘要，SHA-1每条20字节，NTLM每条16字节
+可选的分块布隆过滤器保存在"<文件>.bloom"，查不到的摘要大多不必访问记录区
+"""
+__version__ = "0.0.1.0"
+
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b"KWBC"
+BLOOM_MAGIC = b"KWBF"
+FORMAT_VERSION = 1
+HASH_KINDS = {"sha1": (1, 20), "ntlm": (2, 16)}    # 哈希类型 -> (类型编号, 摘要长度)
+BLOOM_BLOCK_BITS = 512      # 布隆过滤器每块的位数（一个缓存行），每个摘要的k位都落在同一块内
+
+_HEADER = struct.Struct("<4sHBBQ")
+_BLOOM_HEADER = struct.Struct("<4sHBBQQ")   # MAGIC 版本 k 保留 块数 对应的记录条数
+_FANOUT = struct.Struct("<QQ")
+
+
+def _fanout_bits(count: int) -> int:
+    """分桶位数：平均每桶约256条，表的大小在256项到1600万项之间"""
+    return min(24, max(8, (count // 256).bit_length()))
+
+
+def _md4(data: bytes) -> bytes:
+    """MD4（RFC 1320），OpenSSL 3默认不再提供，计算NTLM哈希时备用"""
+    mask = 0xFFFFFFFF
+
+    def rol(x, n):
+        x &= mask
+        return ((x << n) | (x >> (32 - n))) & mask
+
+    length = len(data) * 8
+    data += b"\x80" + b"\0" * ((55 - len(data)) % 64) + struct.pack("<Q", length & 0xFFFFFFFFFFFFFFFF)
+    a, b, c, d = 0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476
+    for offset in range(0, len(data), 64):
+        x = struct.unpack_from("<16I", data, offset)
+        aa, bb, cc, dd = a, b, c, d
+        for i in range(16):     # 第1轮 F(b,c,d) = (b&c)|(~b&d)
+            k, s = i, (3, 7, 11, 19)[i % 4]
+            a, b, c, d = d, rol(a + ((b & c) | (~b & d)) + x[k], s), b, c
+        for i in range(16):     # 第2轮 G(b,c,d) = (b&c)|(b&d)|(c&d)
+            k, s = (i % 4) * 4 + i // 4, (3, 5, 9, 13)[i % 4]
+            a, b, c, d = d, rol(a + ((b & c) | (b & d) | (c & d)) + x[k] + 0x5A827999, s), b, c
+        for i in range(16):     # 第3轮 H(b,c,d) = b^c^d
+            k, s = (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)[i], (3, 9, 11, 15)[i % 4]
+            a, b, c, d = d, rol(a + (b ^ c ^ d) + x[k] + 0x6ED9EBA1, s), b, c
+        a, b, c, d = (a + aa) & mask, (b + bb) & mask, (c + cc) & mask, (d + dd) & mask
+    return struct.pack("<4I", a, b, c, d)
+
+
+def password_digest(password: str, kind: str = "sha1") -> bytes:
+    """
+    计算密码在泄露库中的摘要
+    :param password: 明文密码
+    :param kind: sha1（UTF-8编码）或ntlm（MD4，UTF-16LE编码）
+    """
+    if kind == "sha1":
+        return hashlib.sha1(password.encode("utf-8")).digest()
+    if kind == "ntlm":
+        data = password.encode("utf-16-le")
+        try:
+            return hashlib.new("md4", data).digest()
+        except ValueError:
+            return _md4(data)
+    raise ValueError(f"不支持的哈希类型: {kind}")
+
+
+def _parse_lines(source: str, width: int):
+    """逐行解析泄露列表，产出摘要；空行跳过，格式错误时报告行号"""
+    with open(source, "rb") as f:
+        for line_no, line in enumerate(f, 1):
+            text = line.split(b":", 1)[0].strip()
+            if not text:
+                continue
+            try:
+                digest = bytes.fromhex(text.decode("ascii"))
+            except (UnicodeDecodeError, ValueError):
+                digest = b""
+            if len(digest) != width:
+                raise ValueError(f"{source} 第 {line_no} 行不是有效的{width * 2}位十六进制摘要")
+            yield digest
+
+
+def _read_run(path: str, width: int, block_records: int = 65536):
+    """按块读取一个已排序的临时分段"""
+    with open(path, "rb") as f:
+        while block := f.read(width * block_records):
+            for i in range(0, len(block), width):
+                yield block[i:i + width]
+
+
+def _bloom_positions(digest: bytes, blocks: int, k: int) -> list[int]:
+    """摘要本身已是均匀的哈希值：前8字节选块，后8字节做双重哈希给出块内的k位"""
+    base = int.from_bytes(digest[:8], "little") % blocks * BLOOM_BLOCK_BITS
+    h1 = int.from_bytes(digest[8:12], "little")
+    h2 = int.from_bytes(digest[12:16], "little") | 1
+    return [base + (h1 + i * h2) % BLOOM_BLOCK_BITS for i in range(k)]
+
+
+class BreachCorpus:
+    """
+    已转换的泄露库（只读，内存映射）
+    只有查找时访问到的页会被读入，检查整个密码本通常只触及几百个页
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} 不是泄露库文件")
+        try:
+            magic, version, kind_id, self.fanout_bits, self.count = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} 不是泄露库文件或版本不受支持")
+            kinds = {kind_id: (name, width) for name, (kind_id, width) in HASH_KINDS.items()}
+            if kind_id not in kinds:
+                raise ValueError(f"{path} 的哈希类型未知: {kind_id}")
+            self.kind, self.width = kinds[kind_id]
+            self._fanout_offset = _HEADER.size
+            self._records_offset = self._fanout_offset + ((1 << self.fanout_bits) + 1) * 8
+            if len(self._map) != self._records_offset + self.count * self.width:
+                raise ValueError(f"{path} 长度与头部不符，文件可能不完整")
+        except Exception:
+            self.close()
+            raise
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+            self._map.madvise(mmap.MADV_RANDOM)     # 二分查找是随机访问，关闭预读
+        self._bloom_file = self._bloom = None
+        self._open_bloom(path + ".bloom")
+
+    def _open_bloom(self, bloom_path: str):
+        """存在与本库匹配的布隆过滤器时一并映射；不匹配（如库被重新转换）时忽略"""
+        if not os.path.exists(bloom_path):
+            return
+        bloom_file = open(bloom_path, "rb")
+        try:
+            bloom = mmap.mmap(bloom_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            bloom_file.close()
+            return
+        magic, version, k, _, blocks, count = (_BLOOM_HEADER.unpack_from(bloom, 0) if len(bloom) >= _BLOOM_HEADER.size
+                                               else (b"", 0, 0, 0, 0, 0))
+        if (magic != BLOOM_MAGIC or version != FORMAT_VERSION or count != self.count
+                or len(bloom) != _BLOOM_HEADER.size + blocks * BLOOM_BLOCK_BITS // 8):
+            print(f"布隆过滤器 {bloom_path} 与泄露库不匹配，已忽略")
+            bloom.close()
+            bloom_file.close()
+            return
+        if hasattr(bloom, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+            bloom.madvise(mmap.MADV_RANDOM)
+        self._bloom_file, self._bloom = bloom_file, bloom
+        self._bloom_k, self._bloom_blocks = k, blocks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._close_bloom()
+        for handle in ("_map", "_file"):
+            obj = getattr(self, handle, None)
+            if obj is not None:
+                obj.close()
+                setattr(self, handle, None)
+
+    def _close_bloom(self):
+        for handle in ("_bloom", "_bloom_file"):
+            obj = getattr(self, handle, None)
+            if obj is not None:
+                obj.close()
+                setattr(self, handle, None)
+
+    def digest(self, password: str) -> bytes:
+        """按本库的哈希类型计算密码摘要"""
+        return password_digest(password, self.kind)
+
+    def contains(self, digest: bytes) -> bool:
+        """
+        摘要是否在库中：布隆过滤器 -> 分桶表定位区间 -> 区间内二分查找
+        :param digest: 与本库类型一致的完整摘要
+        """
+        if len(digest) != self.width:
+            raise ValueError(f"摘要长度应为 {self.width} 字节")
+        if self._bloom is not None:
+            bloom = self._bloom
+            for bit in _bloom_positions(digest, self._bloom_blocks, self._bloom_k):
+                if not bloom[_BLOOM_HEADER.size + (bit >> 3)] >> (bit & 7) & 1:
+                    return False
+        prefix = int.from_bytes(digest[:4], "big") >> (32 - self.fanout_bits)
+        lo, hi = _FANOUT.unpack_from(self._map, self._fanout_offset + prefix * 8)
+        data, width, base = self._map, self.width, self._records_offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = base + mid * width
+            record = data[offset:offset + width]
+            if record < digest:
+                lo = mid + 1
+            elif record > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def check(self, passwords) -> list[bool]:
+        """
+        批量检查密码是否出现在泄露库中，按摘要排序后查找，相邻的查找命中同一批页
+        :param passwords: 明文密码的可迭代对象
+        :return: 与输入顺序一致的布尔列表
+        """
+        digests = [self.digest(password) for password in passwords]
+        found = {digest: self.contains(digest) for digest in sorted(set(digests))}
+        return [found[digest] for digest in digests]
+
+    @staticmethod
+    def convert(source: str, dest: str, kind: str = "sha1", chunk_records: int = 2_000_000,
+                bloom_bits_per_entry: int = 0, progress=None) -> int:
+        """
+        把文本格式的泄露列表转换为排序去重的二进制库（只需做一次）
+        输入不必有序：每chunk_records条排序后写入临时分段，最后多路归并，内存占用与输入大小无关
+        :param source: 文本文件，每行"HEX"或"HEX:次数"
+        :param dest: 输出文件，写完后原子替换
+        :param kind: sha1或ntlm
+        :param chunk_records: 每个排序分段的条数
+        :param bloom_bits_per_entry: 布隆过滤器每条记录的位数，0表示不生成（10位约1%误判）
+        :param progress: 进度回调 progress(阶段, 已处理条数)
+        :return: 去重后的条数
+        """
+        if kind not in HASH_KINDS:
+            raise ValueError(f"不支持的哈希类型: {kind}")
+        kind_id, width = HASH_KINDS[kind]
+        dest_dir = os.path.dirname(os.path.abspath(dest))
+        runs, total = [], 0
+        with tempfile.TemporaryDirectory(dir=dest_dir, prefix=".breach-") as work_dir:
+            # 1. 分段排序
+            chunk = []
+            for digest in _parse_lines(source, width):
+                chunk.append(digest)
+                if len(chunk) >= chunk_records:
+                    runs.append(BreachCorpus._write_run(work_dir, len(runs), chunk))
+                    total += len(chunk)
+                    chunk = []
+                    if progress:
+                        progress("sort", total)
+            if chunk or not runs:
+                runs.append(BreachCorpus._write_run(work_dir, len(runs), chunk))
+                total += len(chunk)
+
+            # 2. 多路归并去重，同时统计分桶；分桶位数按去重前的条数估计
+            bits = _fanout_bits(total)
+            buckets = array("Q", bytes(8 * ((1 << bits) + 1)))
+            records_offset = _HEADER.size + len(buckets) * 8
+            tmp_path = os.path.join(work_dir, "corpus")
+            count, previous, shift, next_report = 0, None, 32 - bits, chunk_records
+            with open(tmp_path, "wb") as out:
+                out.seek(records_offset)
+                buffer = bytearray()
+                for digest in heapq.merge(*(_read_run(path, width) for path in runs)):
+                    if digest == previous:
+                        continue
+                    previous = digest
+                    buckets[(int.from_bytes(digest[:4], "big") >> shift) + 1] += 1
+                    buffer += digest
+                    count += 1
+                    if len(buffer) >= 1 << 20:
+                        out.write(buffer)
+                        buffer.clear()
+                    if progress and count >= next_report:
+                        progress("merge", count)
+                        next_report += chunk_records
+                out.write(buffer)
+                for i in range(1, len(buckets)):    # 每桶条数 -> 累计起始序号
+                    buckets[i] += buckets[i - 1]
+                out.seek(0)
+                out.write(_HEADER.pack(MAGIC, FORMAT_VERSION, kind_id, bits, count))
+                if sys.byteorder != "little":
+                    buckets.byteswap()
+                out.write(buckets.tobytes())
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, dest)
+        if progress:
+            progress("done", count)
+
+        bloom_path = dest + ".bloom"
+        if bloom_bits_per_entry > 0:
+            BreachCorpus.build_bloom(dest, bloom_bits_per_entry, progress)
+        elif os.path.exists(bloom_path):
+            os.remove(bloom_path)   # 旧的过滤器与新库不匹配
+        return count
+
+    @staticmethod
+    def _write_run(work_dir: str, n: int, chunk: list) -> str:
+        chunk.sort()
+        path = os.path.join(work_dir, f"run{n:05d}")
+        with open(path, "wb") as f:
+            f.write(b"".join(chunk))
+        return path
+
+    @staticmethod
+    def build_bloom(path: str, bits_per_entry: int = 10, progress=None):
+        """
+        为已转换的库生成分块布隆过滤器"<库>.bloom"（逐条计算位置，大库耗时较长，可选）
+        每条记录的k位落在同一个64字节块内，一次查找最多读一个缓存行
+        :param path: 泄露库文件
+        :param bits_per_entry: 每条记录的位数，10位时误判率约1%
+        """
+        with BreachCorpus(path) as corpus:
+            corpus._close_bloom()   # 旧的过滤器即将被替换
+            k = max(1, min(8, round(bits_per_entry * math.log(2))))
+            blocks = max(1, math.ceil(corpus.count * bits_per_entry / BLOOM_BLOCK_BITS))
+            bloom_path = path + ".bloom"
+            tmp_path = bloom_path + ".tmp"
+            size = _BLOOM_HEADER.size + blocks * BLOOM_BLOCK_BITS // 8
+            with open(tmp_path, "w+b") as f:
+                f.truncate(size)
+                with mmap.mmap(f.fileno(), size) as bloom:
+                    data, width, base = corpus._map, corpus.width, corpus._records_offset
+                    for i in range(corpus.count):
+                        offset = base + i * width
+                        for bit in _bloom_positions(data[offset:offset + width], blocks, k):
+                            bloom[_BLOOM_HEADER.size + (bit >> 3)] |= 1 << (bit & 7)
+                        if progress and i % 1_000_000 == 999_999:
+                            progress("bloom", i + 1)
+                    bloom[:_BLOOM_HEADER.size] = _BLOOM_HEADER.pack(BLOOM_MAGIC, FORMAT_VERSION, k, 0,
+                                                                    blocks, corpus.count)
+                    bloom.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, bloom_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="离线泄露密码库工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert_parser = sub.add_parser("convert", help="把文本格式的泄露哈希列表转换为可查找的二进制库")
+    convert_parser.add_argument("src", help="文本文件，每行\"HEX\"或\"HEX:次数\"")
+    convert_parser.add_argument("dst", help="输出的泄露库文件")
+    convert_parser.add_argument("--kind", choices=sorted(HASH_KINDS), default="sha1", help="哈希类型（默认sha1）")
+    convert_parser.add_argument("--bloom", type=int, default=0, metavar="BITS",
+                                help="同时生成布隆过滤器，每条记录的位数（默认不生成）")
+    convert_parser.add_argument("--chunk", type=int, default=2_000_000, help="每个排序分段的条数")
+    check_parser = sub.add_parser("check", help="检查从标准输入读取的密码（每行一个）是否泄露")
+    check_parser.add_argument("corpus", help="泄露库文件")
+    args = parser.parse_args()
+    if args.command == "convert":
+        n = BreachCorpus.convert(args.src, args.dst, args.kind, args.chunk, args.bloom,
+                                 progress=lambda stage, done: print(f"{stage}: {done}"))
+        print(f"已转换 {n} 条摘要: {args.src} -> {args.dst}")
+    elif args.command == "check":
+        with BreachCorpus(args.corpus) as corpus:
+            lines = [line.rstrip("\r\n") for line in sys.stdin]
+            hits = corpus.check(lines)
+        print(f"{sum(hits)}/{len(lines)} 个密码出现在泄露库中")
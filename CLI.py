@@ -0,0 +1,225 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：CLI.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/18 00:20
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+无界面的命令行工具，只依赖Core，不导入PyQt，不需要显示器
+主密码从标准输入（终端中为不回显的提示）或--password-fd指定的文件描述符读取，每行一个，
+不出现在命令行参数中；结果以JSON输出到标准输出，Core的提示信息默认丢弃（-v时输出到标准错误）
+
+用法：
+    python -m CLI --vault my_key.json list                     < 主密码
+    python -m CLI --vault my_key.json search mail --limit 5    < 主密码
+    python -m CLI --vault my_key.json get 3 7                  < 主密码
+    python -m CLI --vault my_key.json add --url a.com --username me   < 主密码+换行+新条目的密码
+    python -m CLI --vault my_key.json import items.json        < 主密码
+    python -m CLI --vault my_key.json export -o backup.json    < 主密码
+    python -m CLI --vault my_key.json verify                   < 主密码
+返回码：0成功，1验证失败/条目不存在/文件损坏，2参数错误
+"""
+__version__ = "0.0.1.0"
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from Core import KeyItem, KeyWordNoteBook
+from Storage import STORAGE_TYPES
+
+USER_FIELDS = ("URL", "UserName", "Password", "LinkURL", "Note")    # 用户填写的字段（导入导出的内容）
+EXPORT_FIELDS = ("Index", *USER_FIELDS, "PasswordLevel")            # 导出的字段，不含密码指纹等内部字段
+
+
+class CLIError(Exception):
+    """命令执行失败，消息输出到标准错误，返回码为1；result不为None时同时作为JSON结果输出"""
+
+    def __init__(self, message: str, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+class SecretReader:
+    """按行读取主密码等机密输入；终端中用不回显的提示，否则从流中逐行读取"""
+
+    def __init__(self, fd: int | None):
+        self._stream = open(fd, "r", encoding="utf-8", closefd=False) if fd is not None else sys.stdin
+
+    def read(self, prompt: str) -> str:
+        if self._stream.isatty():
+            import getpass
+            return getpass.getpass(prompt, stream=sys.stderr)
+        line = self._stream.readline()
+        if not line:
+            raise CLIError(f"没有读到{prompt.rstrip('：: ')}")
+        return line.rstrip("\r\n")
+
+
+def emit(value, pretty: bool = False):
+    """把结果以JSON写到标准输出"""
+    json.dump(value, sys.stdout, ensure_ascii=False, indent=2 if pretty else None,
+              separators=None if pretty else (",", ":"))
+    sys.stdout.write("\n")
+
+
+def open_book(args, main_key: str) -> KeyWordNoteBook:
+    """打开密码本；文件不存在时只有指定--create才新建，避免输错路径时悄悄建出空密码本"""
+    if not args.create and not os.path.exists(args.vault):
+        raise CLIError(f"密码本不存在: {args.vault}（新建请加 --create）")
+    try:
+        return KeyWordNoteBook(main_key, path=args.vault, storage=args.storage, journal=args.journal)
+    except (ValueError, UnicodeError) as e:
+        raise CLIError(str(e))
+
+
+def cmd_list(book: KeyWordNoteBook, args, main_key: str):
+    return book.get_non_secret_items()
+
+
+def cmd_search(book: KeyWordNoteBook, args, main_key: str):
+    if args.url:
+        return book.find_by_url(args.query)
+    return book.search(args.query, fields=args.field, limit=args.limit)
+
+
+def cmd_get(book: KeyWordNoteBook, args, main_key: str):
+    items = book.get_items_by_ids(args.ids, main_key)
+    if not items:
+        raise CLIError("主密码验证失败")
+    missing = [No for No, item in zip(args.ids, items) if item is None]
+    if missing:
+        raise CLIError(f"条目不存在: {', '.join(missing)}")
+    return [{field: item[field] for field in EXPORT_FIELDS if field in item} for item in items]
+
+
+def cmd_add(book: KeyWordNoteBook, args, main_key: str):
+    item = KeyItem()
+    item.update({"URL": args.url, "UserName": args.username, "Password": args.read_secret("条目密码："),
+                 "LinkURL": args.link_url, "Note": args.note})
+    No = book.add_item(item, main_key)
+    if No == "-1":
+        raise CLIError("主密码验证失败")
+    return {"Index": No}
+
+
+def cmd_import(book: KeyWordNoteBook, args, main_key: str):
+    import Importer
+    try:
+        result = Importer.import_file(book, args.file, main_key, args.format, args.chunk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CLIError(f"导入失败：{e}")
+    if result is None:
+        raise CLIError("主密码验证失败")
+    return result
+
+
+def cmd_export(book: KeyWordNoteBook, args, main_key: str):
+    keys = [item["Index"] for item in book.get_non_secret_items()]
+    items = book.get_items_by_ids(keys, main_key)
+    if keys and not items:
+        raise CLIError("主密码验证失败")
+    data = {"items": [{field: item[field] for field in EXPORT_FIELDS if field in item} for item in items]}
+    if not args.output:
+        return data
+    # 导出文件含明文密码，只允许当前用户读写
+    fd = os.open(args.output, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return {"exported": len(data["items"]), "output": args.output}
+
+
+def cmd_verify(book: KeyWordNoteBook, args, main_key: str):
+    # 打开时已经校验了主密码、文件头HMAC和全部条目MAC（verify_mode="full"）
+    return {"ok": True, "items": len(book.load_dict["ItemList"]),
+            "merkle_root": book.load_dict["ARGON2_PARAMS"].get("merkle_root")}
+
+
+COMMANDS = {"list": cmd_list, "search": cmd_search, "get": cmd_get, "add": cmd_add,
+            "import": cmd_import, "export": cmd_export, "verify": cmd_verify}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m CLI", description="密码本命令行工具（无界面）")
+    parser.add_argument("--vault", default="my_key.json", help="密码本文件（默认my_key.json）")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, help="存储后端（默认按扩展名）")
+    parser.add_argument("--journal", action="store_true", help="启用日志模式")
+    parser.add_argument("--create", action="store_true", help="密码本不存在时新建")
+    parser.add_argument("--password-fd", type=int, help="从该文件描述符读取主密码（默认标准输入）")
+    parser.add_argument("--pretty", action="store_true", help="缩进输出JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="把Core的提示信息输出到标准错误")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="列出全部条目（不含密码）")
+    search = sub.add_parser("search", help="按非敏感字段检索条目（不含密码）")
+    search.add_argument("query", help="查询字符串")
+    search.add_argument("--field", action="append", choices=("URL", "UserName", "LinkURL", "Note"),
+                        help="参与匹配的字段，可重复指定（默认全部）")
+    search.add_argument("--limit", type=int, default=50, help="最多返回的条数")
+    search.add_argument("--url", action="store_true", help="按网址域名查找（自动填充）")
+    get = sub.add_parser("get", help="获取条目（含明文密码）")
+    get.add_argument("ids", nargs="+", help="条目Index")
+    add = sub.add_parser("add", help="添加条目，条目密码从主密码的下一行读取")
+    add.add_argument("--url", required=True, help="网址")
+    add.add_argument("--username", required=True, help="用户名")
+    add.add_argument("--link-url", default="", help="关联账户")
+    add.add_argument("--note", default="", help="备注")
+    imp = sub.add_parser("import", help="从浏览器、其他密码管理器或export的导出文件导入条目，(网址, 用户名)重复的跳过")
+    imp.add_argument("file", help="CSV或JSON导出文件；-表示标准输入（需配合--password-fd，默认按JSON读取）")
+    imp.add_argument("--format", help="导出格式：chrome/edge/firefox/bitwarden/keepass/keepassxc/"
+                                      "bitwarden-json/json（默认自动识别）")
+    imp.add_argument("--chunk", type=int, default=2000, help="每块写入的条数")
+    export = sub.add_parser("export", help="导出全部条目（含明文密码）为JSON")
+    export.add_argument("-o", "--output", help="输出文件（必须不存在，权限600），默认标准输出")
+    sub.add_parser("verify", help="校验主密码和文件完整性")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "import" and args.file == "-" and args.password_fd is None:
+        print("从标准输入导入时，主密码需通过 --password-fd 提供", file=sys.stderr)
+        return 2
+    reader = SecretReader(args.password_fd)
+    args.read_secret = reader.read
+    # Core的提示信息不能混进JSON输出
+    log = sys.stderr if args.verbose else open(os.devnull, "w")
+    book = None
+    try:
+        main_key = reader.read("主密码：")
+        with contextlib.redirect_stdout(log):
+            book = open_book(args, main_key)
+            result = COMMANDS[args.command](book, args, main_key)
+        emit(result, args.pretty)
+        return 0
+    except CLIError as e:
+        if e.result is None and args.command == "verify":
+            e.result = {"ok": False, "error": str(e)}
+        if e.result is not None:
+            emit(e.result, args.pretty)
+        print(f"错误：{e}", file=sys.stderr)
+        return 1
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return 1
+    finally:
+        if book is not None:
+            with contextlib.redirect_stdout(log):
+                book.close()
+        if log is not sys.stderr:
+            log.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
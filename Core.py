@@ -20,15 +20,80 @@
 """
 __version__ = "0.0.1.2"
 
-from cryptography.fernet import Fernet
 import json
+import atexit
 import base64
-from argon2 import PasswordHasher,exceptions,Type
-import re
+import contextlib
 import secrets
 import os
 import hmac
 import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from Storage import JournalFile, RotationFile, VaultStorage, open_storage
+
+# 加密库（argon2、cryptography）、线程池以及Strength/Search/Breach在首次用到的函数中导入，
+# 导入Core本身很轻，界面可以先显示登录窗口；warm_up()可在等待用户输入时提前在后台导入
+if TYPE_CHECKING:
+    from argon2 import PasswordHasher
+    from cryptography.fernet import Fernet
+    from Breach import BreachCorpus
+    from Search import DomainIndex, ReuseIndex, SearchIndex
+
+# 旧版文件未记录Argon2参数，按当时写死的参数处理
+ARGON2_LEGACY_COST = {"memory_cost": 131072, "time_cost": 6, "parallelism": 6}
+# 成本档位：目标解锁耗时（秒）和内存上限（KiB），具体参数由calibrate_argon2_cost在本机校准
+ARGON2_PROFILES = {
+    "low": {"target_seconds": 0.3, "max_memory_cost": 65536},
+    "medium": {"target_seconds": 0.8, "max_memory_cost": 262144},
+    "high": {"target_seconds": 2.0, "max_memory_cost": 1048576},
+}
+ARGON2_DEFAULT_PROFILE = "medium"
+ARGON2_MIN_MEMORY_COST = 19456     # 低于此内存（19MiB）的参数视为过时
+ARGON2_MAX_TIME_COST = 32
+UNLOCK_HASHES = 2                  # 一次解锁的Argon2次数：验证哈希 + 派生AES密钥
+
+
+def warm_up():
+    """提前导入登录和常用操作要用到的模块（可在后台线程中调用），之后首次解锁不必等待导入"""
+    import argon2
+    import cryptography.fernet
+    import concurrent.futures
+    import Strength
+    import Search
+
+
+def calibrate_argon2_cost(target_seconds: float = 0.8, max_memory_cost: int = 262144,
+                          parallelism: int = None, hash_len: int = 64) -> dict:
+    """
+    在本机校准Argon2参数，使一次解锁耗时接近target_seconds
+    并行度取CPU核数（最多8）；先把内存翻倍到上限或单次耗时接近目标，再增加迭代次数补足
+    :param target_seconds: 目标解锁耗时（秒）
+    :param max_memory_cost: 内存上限（KiB）
+    :param parallelism: 并行度，None时按CPU核数
+    :return: {"memory_cost", "time_cost", "parallelism"}
+    """
+    from argon2 import Type, low_level
+    lanes = parallelism or max(1, min(os.cpu_count() or 1, 8))
+    per_hash = target_seconds / UNLOCK_HASHES
+
+    def run(memory_cost):
+        start = time.perf_counter()
+        low_level.hash_secret_raw(b"calibration", secrets.token_bytes(16), time_cost=1,
+                                  memory_cost=memory_cost, parallelism=lanes, hash_len=hash_len, type=Type.ID)
+        return time.perf_counter() - start
+
+    memory_cost = max(8 * lanes, min(32768, max_memory_cost))
+    elapsed = run(memory_cost)
+    while elapsed * 2 <= per_hash and memory_cost * 2 <= max_memory_cost:
+        memory_cost *= 2
+        elapsed = run(memory_cost)
+    time_cost = max(1, min(ARGON2_MAX_TIME_COST, int(per_hash / elapsed)))
+    return {"memory_cost": memory_cost, "time_cost": time_cost, "parallelism": lanes}
 
 
 def is_base64(s: str) -> bool:
@@ -43,10 +108,16 @@ class Argon2Params(dict):
     keycode = {
         "verify_hash": lambda x:isinstance(x,str) and x.startswith("$argon2id$"),   # 验证哈希数
         "hash_len": lambda x:isinstance(x,int) and x >= 64,                         # 哈希结果长度
+        "memory_cost": lambda x: isinstance(x, int) and x >= 8,                     # Argon2内存（KiB）
+        "time_cost": lambda x: isinstance(x, int) and x >= 1,                       # Argon2迭代次数
+        "parallelism": lambda x: isinstance(x, int) and x >= 1,                     # Argon2并行度
         "encryption_salt": lambda x:isinstance(x,str) and is_base64(x),             # AES加密盐
         "hmac_salt": lambda x: isinstance(x, str) and is_base64(x),                 # HMAC盐
         "hmac_key_encrypted":lambda x:isinstance(x,str),                            # 加密存储HMAC密钥
-        "integrity_check": lambda x: isinstance(x, str) and len(x) == 64            # HMAC完整性校验值
+        "integrity_check": lambda x: isinstance(x, str) and len(x) == 64,           # HMAC完整性校验值
+        "merkle_root": lambda x: isinstance(x, str) and len(x) == 64,               # 条目MAC的Merkle根
+        "next_index": lambda x: isinstance(x, int) and x >= 1,                      # 下一个分配的条目Index
+        "strength_version": lambda x: isinstance(x, int)                            # 密码等级的评估算法版本
     }
     def __setitem__(self, key, value):
         if key not in self.keycode:
@@ -65,6 +136,8 @@ class KeyItem(dict):
         # 由管理器控制和获取
         "Index": lambda x:isinstance(x,str),            # 条目序号，唯一ID
         "PasswordLevel": lambda x: isinstance(x, int),  # 密码等级
+        "Fingerprint": lambda x: isinstance(x, str),    # 密码指纹（带密钥的HMAC），用于发现重复使用的密码
+        "Breached": lambda x: isinstance(x, bool),      # 密码出现在离线泄露库中（修改密码后清除）
         # 由用户填写
         "URL": lambda x:isinstance(x,str),              # 使用的网址
         "UserName": lambda x:isinstance(x,str),         # 用户名
@@ -101,12 +174,309 @@ class FrequentlyKey(dict):
         for key, value in temp_dict.items():
             self[key] = value
 
+class MerkleTree:
+    """
+    以条目Index为槽位的Merkle树
+    叶子为条目MAC（32字节），空槽位为全0；内部节点为sha256(0x01|左|右)
+    树按2的幂扩容，根统一折叠到DEPTH层，因此根只取决于条目内容，与扩容历史无关
+    修改一个条目只需重算叶子到根的一条路径
+    """
+    DEPTH = 32                  # 最多支持2^32个槽位
+    NODE_SIZE = 32
+    _empty = [bytes(32)]        # _empty[k]：第k层空子树的哈希
+
+    def __init__(self, leaves: dict[int, bytes] = None):
+        """
+        :param leaves: {槽位: 叶子MAC}
+        """
+        leaves = leaves or {}
+        capacity = 1
+        max_slot = max(leaves, default=0)
+        while capacity <= max_slot:
+            capacity *= 2
+        level = bytearray(capacity * self.NODE_SIZE)
+        for slot, mac in leaves.items():
+            level[slot * self.NODE_SIZE:(slot + 1) * self.NODE_SIZE] = mac
+        self.levels: list[bytearray] = [level]
+        while len(level) > self.NODE_SIZE:
+            parent = bytearray(len(level) // 2)
+            for i in range(len(parent) // self.NODE_SIZE):
+                parent[i * self.NODE_SIZE:(i + 1) * self.NODE_SIZE] = self._children_hash(level, i)
+            self.levels.append(parent)
+            level = parent
+
+    @classmethod
+    def sparse_root(cls, leaves: dict[int, bytes]) -> str:
+        """
+        只按已占用的槽位逐层合并计算根，与root()结果相同
+        时间O(条目数*DEPTH)、内存O(条目数)，与槽位取值无关，用于分配完整的树之前校验
+        :param leaves: {槽位: 叶子MAC}，槽位须小于2^DEPTH
+        """
+        nodes = sorted(leaves.items())
+        for k in range(cls.DEPTH):
+            empty, parents, i = cls.empty(k), [], 0
+            while i < len(nodes):
+                slot, node = nodes[i]
+                if slot % 2:
+                    parents.append((slot // 2, cls._hash(empty, node)))
+                elif i + 1 < len(nodes) and nodes[i + 1][0] == slot + 1:
+                    parents.append((slot // 2, cls._hash(node, nodes[i + 1][1])))
+                    i += 1
+                else:
+                    parents.append((slot // 2, cls._hash(node, empty)))
+                i += 1
+            nodes = parents
+        return (nodes[0][1] if nodes else cls.empty(cls.DEPTH)).hex()
+
+    def update(self, slot: int, mac: bytes | None):
+        """
+        设置一个槽位的叶子并重算到根的路径
+        :param slot: 槽位（条目Index）
+        :param mac: 叶子MAC，None表示删除
+        """
+        while slot >= len(self.levels[0]) // self.NODE_SIZE:
+            self._grow()
+        n = self.NODE_SIZE
+        self.levels[0][slot * n:(slot + 1) * n] = mac if mac is not None else bytes(n)
+        i = slot
+        for k in range(1, len(self.levels)):
+            i //= 2
+            self.levels[k][i * n:(i + 1) * n] = self._children_hash(self.levels[k - 1], i)
+
+    def root(self) -> str:
+        """Merkle根（16进制）"""
+        node = bytes(self.levels[-1][:self.NODE_SIZE])
+        for k in range(len(self.levels) - 1, self.DEPTH):
+            node = self._hash(node, self.empty(k))
+        return node.hex()
+
+    def _grow(self):
+        """容量翻倍：各层右侧补空子树，再加一层新根"""
+        for k, level in enumerate(self.levels):
+            level.extend(self.empty(k) * (len(level) // self.NODE_SIZE))
+        top = self.levels[-1]
+        self.levels.append(bytearray(self._children_hash(top, 0)))
+
+    def _children_hash(self, level: bytearray, i: int) -> bytes:
+        """计算level中第i个父节点的哈希"""
+        n = self.NODE_SIZE
+        return self._hash(level[2 * i * n:(2 * i + 1) * n], level[(2 * i + 1) * n:(2 * i + 2) * n])
+
+    @staticmethod
+    def _hash(left, right) -> bytes:
+        return hashlib.sha256(b"\x01" + left + right).digest()
+
+    @classmethod
+    def empty(cls, k: int) -> bytes:
+        """第k层空子树的哈希"""
+        while len(cls._empty) <= k:
+            last = cls._empty[-1]
+            cls._empty.append(cls._hash(last, last))
+        return cls._empty[k]
+
+class RevealCache:
+    """
+    已展示条目的明文缓存：按Index的LRU，限定容量和存活时间（从写入起计，访问不续期）
+    明文保存在bytearray中，淘汰、过期、失效和清空时先清零再丢弃；
+    缓存项绑定写入时的密文，密文变化后自动失效。返回给调用方的str副本无法清零
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        :param max_size: 最多缓存的条目数，<=0表示不缓存
+        :param ttl: 存活时间（秒），<=0表示不缓存
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str, bytearray]] = OrderedDict()  # Index -> (过期时间, 密文, 明文)
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def get(self, No: str, ciphertext: str) -> str | None:
+        """取缓存的明文，未命中、已过期或密文已变化时返回None"""
+        with self._lock:
+            entry = self._entries.get(No)
+            if entry is None:
+                return None
+            expiry, cached_ciphertext, buf = entry
+            if expiry <= time.monotonic() or cached_ciphertext != ciphertext:
+                self._drop(No)
+                return None
+            self._entries.move_to_end(No)
+            return buf.decode('utf-8')
+
+    def put(self, No: str, ciphertext: str, plaintext: str):
+        """缓存明文，超出容量时淘汰最久未使用的条目"""
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._drop(No)
+            self._entries[No] = (time.monotonic() + self.ttl, ciphertext, bytearray(plaintext.encode('utf-8')))
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+            if self._timer is None:
+                self._schedule(self.ttl)
+
+    def invalidate(self, keys):
+        """清除指定条目的缓存"""
+        with self._lock:
+            for No in keys:
+                self._drop(No)
+
+    def clear(self):
+        """清除全部缓存"""
+        with self._lock:
+            for No in list(self._entries):
+                self._drop(No)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _drop(self, No: str):
+        """移除一项并清零明文，调用方需持有_lock"""
+        entry = self._entries.pop(No, None)
+        if entry is not None:
+            buf = entry[2]
+            buf[:] = bytes(len(buf))
+
+    def _schedule(self, delay: float):
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        """定时清除过期项，即使之后不再访问，明文也不会超时驻留"""
+        with self._lock:
+            self._timer = None
+            now = time.monotonic()
+            for No in [No for No, (expiry, _, _) in self._entries.items() if expiry <= now]:
+                self._drop(No)
+            if self._entries:
+                self._schedule(max(0.0, min(expiry for expiry, _, _ in self._entries.values()) - now))
+
+
+class FlushScheduler:
+    """
+    写回调度：变更只把密码本标记为脏，合并窗口结束时统一写入一次
+    窗口从第一次变更开始计时，后续变更不延长窗口，未落盘的数据最多滞后delay秒
+    定时器是守护线程，不会拖住解释器退出；忘记close()时由解释器退出时的atexit钩子写入剩余变更
+    """
+
+    def __init__(self, flush_fn, delay: float):
+        """
+        :param flush_fn: 实际写入函数，失败时抛出异常，脏标记保留以便下次重试
+        :param delay: 合并窗口（秒）
+        """
+        self.delay = delay
+        self._flush_fn = flush_fn
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self.error: Exception | None = None     # 最近一次后台写入的异常，之后写入成功时清除
+        _live_schedulers.add(self)
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未写入的变更"""
+        return self._dirty
+
+    def mark_dirty(self):
+        """标记有未写入的变更，窗口内尚未安排写入时启动定时器"""
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """立即写入未落盘的变更，没有变更时不做任何事"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+        try:
+            self._flush_fn()
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+        self.error = None
+
+    def cancel(self):
+        """取消已安排的写入（不清除脏标记）"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            self.error = e
+            print(f"后台写入密码本失败：{e}，将在下次flush()时重试")
+
+
+_live_schedulers: "weakref.WeakSet[FlushScheduler]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_at_exit():
+    """解释器退出时写入未调用close()的密码本中尚未落盘的变更（守护定时器此时不再触发）"""
+    for scheduler in list(_live_schedulers):
+        try:
+            scheduler.flush()
+        except Exception as e:
+            print(f"退出时写入密码本失败：{e}")
+
+
 class KeyWordNoteBook:
-    """密码本管理器"""
-    def __init__(self, mainKey:str,path:str=r"my_key.json"):
+    """
+    密码本管理器
+    API可在工作线程中调用：Argon2验证不持锁，内存数据的读写和持久化由_io_lock串行化
+    """
+    TOKEN_PREFIX = "kwt_"   # 授权令牌前缀，用于区分令牌和二级密码
+    BULK_CHUNK = 512        # 批量加解密时每个线程任务处理的条数
+    BULK_MAX_WORKERS = 8    # 批量加解密的最大线程数
+    # 允许向前端返回的非敏感字段（明确白名单，拒绝一切未声明字段）
+    NON_SECRET_FIELDS = {
+        "Breached",         # 密码已泄露
+        "Index",            # 条目唯一ID
+        "LinkURL",          # 关联账户
+        "Note",             # 备注
+        "PasswordLevel",    # 密码等级
+        "URL",              # 网址
+        "UserName"          # 用户名
+    }
+
+    def __init__(self, mainKey:str,path:str=r"my_key.json",key_cache_timeout:float=300,
+                 journal:bool=False,verify_mode:str="full",storage:str|VaultStorage=None,
+                 argon2_cost:dict=None,reveal_cache_size:int=0,reveal_cache_ttl:float=30,
+                 flush_delay:float=0,search_index:bool=False):
         """
         :param mainKey: 管理员主密钥
         :param path: 密码本文件路径
+        :param key_cache_timeout: 派生密钥缓存的空闲超时（秒），<=0表示不缓存，每次使用都重新派生
+        :param journal: 是否启用日志模式，变更追加到 path+".journal"，超过阈值后在后台压缩回主文件
+        :param verify_mode: 加载时条目MAC的校验方式："full"逐条校验，"parallel"线程池并行校验，
+                            "lazy"只校验Merkle根，条目在首次访问时校验
+        :param storage: 存储后端："json"、"sqlite"、"indexed"或VaultStorage实例，None时按文件扩展名选择
+                        （.db/.sqlite为SQLite，.kwnb为索引容器；索引容器配合verify_mode="lazy"时条目按需解码）
+        :param argon2_cost: Argon2成本：ARGON2_PROFILES中的档位名（在本机校准），
+                            或{"memory_cost","time_cost","parallelism"}（缺省项按旧版参数）；
+                            None时新建密码本按默认档位校准，已有密码本仅在参数过时时重新哈希。
+                            参数随密码本保存，登录成功后与目标不符的密码本自动重新哈希
+        :param reveal_cache_size: get_item_by_id解密结果的缓存条数，0表示不缓存
+        :param reveal_cache_ttl: 解密结果的缓存时间（秒），到期清零，修改/删除条目或lock()时立即清除
+        :param flush_delay: 写回合并窗口（秒），>0时变更先只改内存，窗口内的多次变更合并为一次写入；
+                            0表示每次变更立即写入。日志模式下变更本身就是追加写入，忽略该参数。
+                            需要确定落盘时调用flush()或close()
+        :param search_index: 是否在加载时建立检索索引（需要逐字检索的调用方首次输入不必等待建立），
+                             False时在首次调用search()时建立
         """
         self.Path = path
         self.MainKey = mainKey
@@ -115,176 +485,665 @@ class KeyWordNoteBook:
         self.encryption_salt = None     # 加密专用盐
         self.hmac_key = None            # HMAC密钥
 
-        self.ph = PasswordHasher(       # argon2加密器初始化
-            type=Type.ID,
-            memory_cost=131072,
-            time_cost=6,
-            parallelism=6,
-            hash_len =64)   # TODO：hash_len从文件中动态加载设置
+        # 会话密钥缓存：登录后只派生一次AES密钥，空闲超时或lock()后清除
+        self.key_cache_timeout = key_cache_timeout
+        self._aes_key_buf: bytearray | None = None  # AES密钥缓冲区（可清零）
+        self._fernet_cache: "Fernet | None" = None    # 缓存的Fernet加密器
+        self._key_last_used = 0.0                   # 缓存最后一次使用的时间
+        self._key_timer: threading.Timer | None = None  # 空闲超时定时器
+        self._key_lock = threading.RLock()          # 保护缓存的锁
+
+        # 存储：主文件作为检查点，日志模式下变更追加到日志文件
+        self._io_lock = threading.RLock()           # 保护主字典和文件写入的锁
+        self._storage = storage if isinstance(storage, VaultStorage) else open_storage(path, storage)
+        self._journal = JournalFile(path + ".journal")
+        self._rotation = RotationFile(path + ".rotate")     # 修改主密码的进度文件
+        self.journal_enabled = journal
+        if journal and self._storage.incremental:
+            print("存储后端支持增量写入，忽略日志模式")
+            self.journal_enabled = False
+        self._compact_thread: threading.Thread | None = None
+        self._closed = False                        # close()之后后台压缩不再写入
+
+        # 写回：合并窗口内的变更只记录涉及的条目，到期后一次写入
+        self._pending_put: set[str] = set()         # 待写入的新增/修改条目
+        self._pending_delete: set[str] = set()      # 待写入的删除条目
+        self._flusher = FlushScheduler(self._flush_pending, flush_delay) \
+            if flush_delay > 0 and not self.journal_enabled else None
+        self._deferred = 0                          # deferred_writes()的嵌套层数，>0时变更暂不写入
+
+        # 完整性：每个条目一个MAC，MAC组成Merkle树，根存入ARGON2_PARAMS
+        self.verify_mode = verify_mode
+        self._merkle: MerkleTree | None = None
+        self._unverified: set[str] = set()          # lazy模式下尚未校验的条目
+
+        # 已展示条目的明文缓存（默认关闭）
+        self._reveal_cache = RevealCache(reveal_cache_size, reveal_cache_ttl)
+
+        # 检索索引，首次调用search()时建立
+        self._search_index: "SearchIndex | None" = None
+        # 网址索引（按可注册域名分桶），首次调用find_by_url()时建立
+        self._domain_index: "DomainIndex | None" = None
+        # 密码指纹索引，首次调用find_reused()时建立
+        self._reuse_index: "ReuseIndex | None" = None
+
+        # 授权令牌：sha256(令牌) -> [过期时间, 剩余次数]，只保存摘要不保存令牌本身
+        self._tokens: dict[bytes, list] = {}
+        self._token_lock = threading.Lock()
+
+        # argon2加密器，参数从文件加载（新建时按argon2_cost确定）
+        self._argon2_cost = argon2_cost
+        self._argon2_target: dict | None = None     # 解析/校准后的目标参数
+        self.ph: "PasswordHasher | None" = None
 
         self._init_or_load_file()
+        if search_index:
+            with self._io_lock:
+                self._ensure_search_index()
 
     # API函数
-    def verify_main_key(self,upw:str)->bool:
+    def verify_main_key(self,upw:str,issue_token:bool=False,uses:int|None=1,ttl:float=60):
         """
         验证用户权限
         :param upw: 二级密码
+        :param issue_token: 为True时验证成功后签发授权令牌，增删改查API可用令牌代替二级密码，
+                            一次用户操作只需一次Argon2验证
+        :param uses: 令牌可用次数，None表示在有效期内不限次数
+        :param ttl: 令牌有效期（秒）
+        :return: issue_token为False时返回是否验证成功；为True时返回令牌，验证失败返回None
         """
+        from argon2 import exceptions
         try:
             self.ph.verify(self.verify_hash, upw)
             print("主密码验证成功")
-            return True
         except exceptions.VerifyMismatchError:
             print("密码验证失败")
-            return False
+            return None if issue_token else False
+        if not issue_token:
+            return True
+        token = self.TOKEN_PREFIX + secrets.token_urlsafe(32)
+        with self._token_lock:
+            self._tokens[hashlib.sha256(token.encode()).digest()] = [time.monotonic() + ttl, uses]
+        return token
+
+    def revoke_token(self, token: str):
+        """作废授权令牌（操作完成或取消后调用）"""
+        with self._token_lock:
+            self._tokens.pop(hashlib.sha256(token.encode()).digest(), None)
 
     def add_item(self, data: KeyItem,upw:str) -> str:
         """
         向文件中新增条目，主键自增
         :param data:要添加的条目
-        :param upw: 二级密码
+        :param upw: 二级密码或授权令牌
         :return:新增条目的key
         """
         # 验证用户权限
-        try:
-            self.ph.verify(self.verify_hash, upw)
-            print("主密码验证成功,添加条目")
-        except exceptions.VerifyMismatchError:
-            print("二级密码验证失败，不能添加条目")
+        if not self._authorize(upw, "添加条目"):
             return "-1"
 
         # 编辑条目
-        data["Index"] = self._get_index()
         data["PasswordLevel"] = self.get_password_level(data["Password"])
+        data["Fingerprint"] = self._fingerprint(self._fingerprint_key(), data["Password"])
         data["Password"] = self._encode_aes(data["Password"])  # AES加密主数据
 
-        # 写入条目
-        self.load_dict["ItemList"].update({data["Index"]: data})
-        self._sync_to_file()
+        # 写入条目（分配主键和写入在同一把锁内，并发添加时主键不会重复）
+        with self._io_lock:
+            data["Index"] = self._get_index()
+            self.load_dict["ItemList"].update({data["Index"]: data})
+            self._commit(put={data["Index"]: data})
         print("已写入条目", data["Index"])
         return data["Index"]
 
+    def add_items(self, items, upw: str) -> list[dict]:
+        """
+        批量新增条目：一次权限验证、一次密钥派生、统一分配主键、一次写入文件
+        条目逐个流式校验，任一条目不合法时整批回滚，不写入任何条目
+        :param items: KeyItem的可迭代对象（可以是生成器）
+        :param upw: 二级密码或授权令牌
+        :return: 逐条结果 [{"Index": str, "ok": bool, "error": str}, ...]，
+                 未写入的条目Index为"-1"；二级密码验证失败时返回空列表
+        """
+        # 验证用户权限（整批只验证一次）
+        if not self._authorize(upw, "批量添加条目"):
+            return []
+
+        results = []
+        staged: list[tuple[KeyItem, dict]] = []     # 暂存区 (条目, 对应结果)，全部通过后才写入主字典
+        failed = False
+        for data in items:
+            # 流式校验：类型由KeyItem.__setitem__检查，必填字段在此检查
+            try:
+                item = KeyItem()
+                item.update({k: v for k, v in data.items() if k not in ("Index", "PasswordLevel", "Fingerprint")})
+                missing = [k for k in ("URL", "UserName", "Password") if k not in item]
+                if missing:
+                    raise ValueError(f"缺少字段：{', '.join(missing)}")
+            except (KeyError, ValueError, AttributeError) as e:
+                failed = True
+                results.append({"Index": "-1", "ok": False, "error": str(e)})
+                continue
+            if failed:  # 已确定回滚，后续条目只做校验
+                results.append({"Index": "-1", "ok": True, "error": ""})
+                continue
+
+            # 密码等级和加密在全部校验通过后统一进行
+            result = {"Index": "-1", "ok": True, "error": ""}
+            staged.append((item, result))
+            results.append(result)
+
+        if failed:
+            for result in results:
+                if result["ok"]:
+                    result.update({"Index": "-1", "ok": False, "error": "同批次存在非法条目，已回滚"})
+            print("批量添加失败，已回滚")
+            return results
+
+        if staged:
+            from Strength import score_all as score_passwords
+            fingerprint_key = self._fingerprint_key()
+            for (item, _), level in zip(staged, score_passwords(item["Password"] for item, _ in staged)):
+                item["PasswordLevel"] = level
+                item["Fingerprint"] = self._fingerprint(fingerprint_key, item["Password"])
+            # 整批共用一次派生的密钥，在线程池中并行加密
+            ciphertexts = self._encode_aes_many([item["Password"] for item, _ in staged])
+            for (item, _), ciphertext in zip(staged, ciphertexts):
+                item["Password"] = ciphertext
+            # 统一分配主键并写入条目，一次同步文件；写入失败时从主字典中撤回
+            with self._io_lock:
+                next_index = int(self._get_index(len(staged)))
+                put = {}
+                for offset, (item, result) in enumerate(staged):
+                    item["Index"] = result["Index"] = str(next_index + offset)
+                    put[item["Index"]] = item
+                self.load_dict["ItemList"].update(put)
+                try:
+                    self._commit(put=put)
+                except Exception:
+                    for index in put:
+                        self.load_dict["ItemList"].pop(index, None)
+                    self._update_integrity(delete=list(put))
+                    raise
+        print(f"已批量写入 {len(staged)} 条条目")
+        return results
+
     def delete_item(self,No:str,upw:str)->bool:
         """
         从文件中删除指定条目标记为No的条目
-        :param upw: 二级密码
+        :param upw: 二级密码或授权令牌
         :param No: 要删除的条目的Index
         :return: 是否删除成功
         """
-        try:
-            self.ph.verify(self.verify_hash, upw)
-            print("主密码验证成功,删除条目")
-        except exceptions.VerifyMismatchError:
-            print("二级密码验证失败，不能删除条目")
+        if not self._authorize(upw, "删除条目"):
             return False
 
-        if No in self.load_dict["ItemList"]:
+        with self._io_lock:
+            if No not in self.load_dict["ItemList"]:
+                print(f"条目 {No} 不存在，删除失败")
+                return False
             # 从内存字典中删除条目
             del self.load_dict["ItemList"][No]
 
             # 同步到文件
-            self._sync_to_file()
-            print(f"已删除条目 {No}")
-            return True
-        else:
-            print(f"条目 {No} 不存在，删除失败")
-            return False
+            self._commit(delete=[No])
+        print(f"已删除条目 {No}")
+        return True
 
     def update_item(self, No: str, data: KeyItem,upw:str):
         """
         修改条目
-        :param upw: 二级密码
+        :param upw: 二级密码或授权令牌
         :param No: 要修改的条目编号
         :param data:新结构体
         :return:成功返回新条目索引，失败返回False
         """
         # 验证用户权限
-        try:
-            self.ph.verify(self.verify_hash, upw)
-            print("主密码验证成功,修改条目")
-        except exceptions.VerifyMismatchError:
-            print("二级密码验证失败，不能修改条目")
+        if not self._authorize(upw, "修改条目"):
             return False
 
-        if No in self.load_dict["ItemList"]:
+        with self._io_lock:
+            if No not in self.load_dict["ItemList"]:
+                print(f"条目 {No} 不存在，修改失败")
+                return False
             # 修改条目
+            self._verify_items([No])
             item = self.load_dict["ItemList"][No]
 
             data["Index"] = item["Index"]
             if "Password" in data:
                 data["PasswordLevel"] = self.get_password_level(data["Password"])
+                data["Fingerprint"] = self._fingerprint(self._fingerprint_key(), data["Password"])
                 data["Password"] = self._encode_aes(data["Password"])  # AES加密主数据
+                if "Breached" in item and data["Fingerprint"] == item.get("Fingerprint"):
+                    data["Breached"] = item["Breached"]     # 编辑界面总会带上密码，密码未变时保留泄露标记
             else:
                 # 如果未提供新密码，保留原密码
                 data["Password"] = item["Password"]
                 data["PasswordLevel"] = item["PasswordLevel"]
+                if "Fingerprint" in item:
+                    data["Fingerprint"] = item["Fingerprint"]
+                if "Breached" in item:
+                    data["Breached"] = item["Breached"]     # 泄露标记只对原密码有效，改密码后清除
 
             # 写入条目
             self.load_dict["ItemList"].update({data["Index"]: data})
-            self._sync_to_file()
-            print("已写入条目", data["Index"])
-            return data["Index"]
-        else:
-            print(f"条目 {No} 不存在，修改失败")
-            return False
+            self._commit(put={data["Index"]: data})
+        print("已写入条目", data["Index"])
+        return data["Index"]
 
     def get_item_by_id(self,No:str,upw:str)->dict|None:
         """
         获取指定条目的（解密后）
-        :param upw: 用户密码，独立验证
+        :param upw: 二级密码或授权令牌，独立验证
         :param No: 指定条目索引
         :return: 解密后的单个条目
         """
         # 1. 验证权限（确保用户已登录）
-        try:
-            self.ph.verify(self.verify_hash, upw)
-            print("主密码验证成功,展示条目")
-        except exceptions.VerifyMismatchError:
-            print("二级密码验证失败，不能展示条目")
+        if not self._authorize(upw, "展示条目"):
             return None
 
         # 2. 获取条目数据
-        if No in self.load_dict["ItemList"]:
-            target_items = self.load_dict.get("ItemList").get(No).copy()#注意返回拷贝
-            print(target_items)
-            # 解密密码字段
-            try:
-                target_items["Password"] = self._decode_aes(target_items["Password"])
-                return target_items
-            except Exception as e:
-                print(f"解密条目 {No} 失败: {str(e)}")
+        with self._io_lock:
+            if No not in self.load_dict["ItemList"]:
                 return None
-        return None
+            self._verify_items([No])
+            target_items = self.load_dict.get("ItemList").get(No).copy()#注意返回拷贝
+        print(target_items)
+        # 解密密码字段（近期展示过的条目直接取缓存）
+        try:
+            ciphertext = target_items["Password"]
+            plaintext = self._reveal_cache.get(No, ciphertext)
+            if plaintext is None:
+                plaintext = self._decode_aes(ciphertext)
+                self._reveal_cache.put(No, ciphertext, plaintext)
+            target_items["Password"] = plaintext
+            return target_items
+        except Exception as e:
+            print(f"解密条目 {No} 失败: {str(e)}")
+            return None
+
+    def get_items_by_ids(self, Nos: list, upw: str) -> list:
+        """
+        批量获取解密后的条目（导出、审计等场景），只验证一次权限，密码在线程池中并行解密
+        :param Nos: 条目索引列表
+        :param upw: 二级密码或授权令牌
+        :return: 与Nos顺序一致的条目列表，不存在的条目为None；验证失败返回空列表
+        """
+        if not self._authorize(upw, "批量展示条目"):
+            return []
+        with self._io_lock:
+            item_list = self.load_dict["ItemList"]
+            self._verify_items([No for No in Nos if No in item_list])
+            items = [item_list[No].copy() if No in item_list else None for No in Nos]
+        found = [item for item in items if item is not None]
+        for item, plaintext in zip(found, self._decode_aes_many([item["Password"] for item in found])):
+            item["Password"] = plaintext
+        return items
+
+    def score_all(self, upw: str) -> int:
+        """
+        按当前的强度算法重新评估全部条目的密码等级（算法更新后使用），只写入等级有变化的条目
+        登录时若文件记录的算法版本过旧会自动执行一次
+        :param upw: 二级密码或授权令牌
+        :return: 等级有变化的条目数，验证失败返回-1
+        """
+        if not self._authorize(upw, "重新评估密码等级"):
+            return -1
+        return self._rescore()
+
+    def check_breached(self, corpus: "str | BreachCorpus", upw: str) -> list[str]:
+        """
+        用离线泄露库检查全部条目的密码，命中的条目标记Breached，之前命中但已不在库中的清除标记
+        密码在内存中批量解密后按摘要排序查找，泄露库只映射不读入；只写入标记有变化的条目
+        :param corpus: 泄露库（Breach.py转换得到的文件路径或已打开的BreachCorpus）
+        :param upw: 二级密码或授权令牌
+        :return: 密码已泄露的条目Index列表，验证失败返回空列表
+        """
+        if not self._authorize(upw, "检查泄露密码"):
+            return []
+        opened = isinstance(corpus, str)
+        if opened:
+            from Breach import BreachCorpus
+            corpus = BreachCorpus(corpus)
+        try:
+            with self._io_lock:
+                self._verify_items(list(self._unverified))
+                item_list = self.load_dict["ItemList"]
+                keys = list(item_list)
+                passwords = self._decode_aes_many([item_list[No]["Password"] for No in keys])
+                breached = [No for No, hit in zip(keys, corpus.check(passwords)) if hit]
+                hits = set(breached)
+                put = {}
+                for No in keys:
+                    item = item_list[No]
+                    if No in hits and not item.get("Breached"):
+                        put[No] = {**item, "Breached": True}
+                    elif No not in hits and "Breached" in item:
+                        put[No] = {k: v for k, v in item.items() if k != "Breached"}
+                if put:
+                    item_list.update(put)
+                    self._commit(put=put)
+        finally:
+            if opened:
+                corpus.close()
+        print(f"泄露检查完成：{len(breached)}/{len(keys)} 条密码出现在泄露库中")
+        return breached
 
     def get_non_secret_items(self)->list:
         """
         获取所有条目（非密码字段）
         :return:
         """
-        item_list = self.load_dict.get("ItemList", {})
-        non_secret_items = []  # 存储过滤后的非敏感条目
-
-        # 定义允许向前端返回的非敏感字段（明确白名单，拒绝一切未声明字段）
-        allowed_fields = {
-            "Index",            # 条目唯一ID
-            "LinkURL",          # 关联账户
-            "Note",             # 备注
-            "PasswordLevel",    # 密码等级
-            "URL",              # 网址
-            "UserName"          # 用户名
-        }
-        # 过滤敏感字段：仅保留allowed_fields中的字段
-        for item_id, item_data in item_list.items():
-            filtered_item = {
-                field: item_data.get(field, "")
-                for field in allowed_fields
-                if field in item_data
-            }
+        with self._io_lock:
+            item_list = self.load_dict.get("ItemList", {})
+            non_secret_items = []  # 存储过滤后的非敏感条目
+            self._verify_items(list(self._unverified))
 
-            non_secret_items.append(filtered_item)
+            # 过滤敏感字段：仅保留NON_SECRET_FIELDS中的字段
+            for item_id, item_data in item_list.items():
+                non_secret_items.append(self._non_secret_view(item_data))
 
         return non_secret_items
 
+    def get_non_secret_item(self, No: str) -> dict | None:
+        """
+        获取单个条目的非密码字段，用于界面按变更结果局部刷新
+        :param No: 条目索引
+        :return: 非敏感条目，不存在时返回None
+        """
+        with self._io_lock:
+            item = self.load_dict.get("ItemList", {}).get(No)
+            if item is None:
+                return None
+            self._verify_items([No])
+            return self._non_secret_view(item)
+
+    def search(self, query: str, fields=None, limit: int = 50) -> list[dict]:
+        """
+        按非敏感字段检索条目，支持前缀、子串和模糊匹配
+        索引在加载时（search_index=True）或首次检索时建立，之后随增删改增量更新
+        :param query: 查询字符串（不区分大小写）
+        :param fields: 参与匹配的字段（URL/UserName/LinkURL/Note），None表示全部
+        :param limit: 最多返回的条数
+        :return: 按相关度排序的非敏感条目列表
+        """
+        with self._io_lock:
+            keys = self._ensure_search_index().search(query, fields=fields, limit=limit)
+            self._verify_items(keys)
+            item_list = self.load_dict["ItemList"]
+            return [self._non_secret_view(item_list[No]) for No in keys]
+
+    def find_by_url(self, url: str) -> list[dict]:
+        """
+        按网址查找条目（自动填充）：协议、www.、子域名和端口不影响匹配，
+        如 https://login.example.com:8443/a 能找到网址为 example.com 的条目
+        索引在首次查找时建立，之后随增删改增量更新，每次查找只看同一域名下的条目
+        :param url: 网址
+        :return: 非敏感条目列表，主机名完全相同的排在前面
+        """
+        with self._io_lock:
+            if self._domain_index is None:
+                from Search import DomainIndex
+                self._domain_index = DomainIndex()
+                self._domain_index.build(self.load_dict["ItemList"])
+            keys = self._domain_index.lookup(url)
+            self._verify_items(keys)
+            item_list = self.load_dict["ItemList"]
+            return [self._non_secret_view(item_list[No]) for No in keys]
+
+    def find_reused(self) -> list[list[str]]:
+        """
+        找出重复使用同一密码的条目：按条目保存的密码指纹分组，不解密任何密码
+        索引在首次调用时建立（缺少指纹的旧条目在此时补算一次），之后随增删改增量更新
+        :return: 使用同一密码的Index分组，每组至少两个
+        """
+        with self._io_lock:
+            groups = self._ensure_reuse_index().groups()
+            self._verify_items([No for group in groups for No in group])
+            return groups
+
+    def reused_with(self, No: str) -> list[str]:
+        """
+        与指定条目使用同一密码的其他条目，只查该条目所在的一组，用于增删改后局部刷新重复标记
+        :param No: 条目索引
+        :return: Index列表（不含No本身），没有重复或条目不存在时为空列表
+        """
+        with self._io_lock:
+            peers = sorted(self._ensure_reuse_index().peers(No), key=lambda key: (int(key) if key.isdigit() else 0, key))
+            self._verify_items(peers)
+            return peers
+
+    def _ensure_reuse_index(self) -> "ReuseIndex":
+        """返回密码指纹索引，尚未建立时补算缺少的指纹并用全部条目建立，调用方需持有_io_lock"""
+        if self._reuse_index is None:
+            self._backfill_fingerprints()
+            from Search import ReuseIndex
+            self._reuse_index = ReuseIndex()
+            self._reuse_index.build(self.load_dict["ItemList"])
+        return self._reuse_index
+
+    def _ensure_search_index(self) -> "SearchIndex":
+        """返回检索索引，尚未建立时用全部条目建立，调用方需持有_io_lock"""
+        if self._search_index is None:
+            from Search import SearchIndex
+            self._search_index = SearchIndex()
+            self._search_index.build(self.load_dict["ItemList"])
+        return self._search_index
+
+    def _non_secret_view(self, item: dict) -> dict:
+        """条目的非敏感字段副本"""
+        return {field: item.get(field, "") for field in self.NON_SECRET_FIELDS if field in item}
+
+    def _authorize(self, upw: str, action: str) -> bool:
+        """
+        校验二级密码或授权令牌
+        令牌先做sha256再按摘要比对，耗时与令牌内容无关；令牌无效时按二级密码做Argon2验证
+        :param upw: 二级密码，或verify_main_key签发的令牌
+        :param action: 操作名称，用于提示
+        """
+        if upw.startswith(self.TOKEN_PREFIX) and self._consume_token(upw):
+            return True
+        from argon2 import exceptions
+        try:
+            self.ph.verify(self.verify_hash, upw)
+            print(f"主密码验证成功,{action}")
+            return True
+        except exceptions.VerifyMismatchError:
+            print(f"二级密码验证失败，不能{action}")
+            return False
+
+    def _consume_token(self, token: str) -> bool:
+        """令牌有效则扣减一次可用次数；过期或次数用尽的令牌随即删除"""
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.monotonic()
+        with self._token_lock:
+            for key in [k for k, (expiry, _) in self._tokens.items() if expiry <= now]:
+                del self._tokens[key]
+            # 按摘要查找：查找耗时只可能泄露摘要的信息，无法据此逐字节猜出令牌
+            entry = self._tokens.get(digest)
+            if entry is None:
+                return False
+            if entry[1] is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._tokens[digest]
+            return True
+
+    def lock(self):
+        """
+        锁定密码本：立即清除会话密钥缓存和明文缓存，作废全部授权令牌
+        下次加解密时会重新派生密钥
+        """
+        with self._key_lock:
+            self._evict_key_cache()
+        self._reveal_cache.clear()
+        with self._token_lock:
+            self._tokens.clear()
+        print("密码本已锁定，会话密钥已清除")
+
+    def flush(self):
+        """立即写入合并窗口中尚未落盘的变更，返回后变更已持久化"""
+        if self._flusher is not None:
+            self._flusher.flush()
+
+    @contextlib.contextmanager
+    def deferred_writes(self):
+        """
+        分多次提交的批量操作（如导入）期间推迟写入：变更只记录涉及的条目，退出时一次写入（异常退出时同样写入）
+        每次写入都重写整个文件的后端（JSON、索引容器）因此只写一次；日志模式和增量后端本来只写变更，不推迟
+            with book.deferred_writes():
+                for chunk in chunks:
+                    book.add_items(chunk, token)
+        """
+        if self.journal_enabled or self._storage.incremental:
+            yield
+            return
+        with self._io_lock:
+            self._deferred += 1
+        try:
+            yield
+        finally:
+            with self._io_lock:
+                self._deferred -= 1
+                if not self._deferred:
+                    self._flush_pending()
+
+    def close(self):
+        """关闭密码本：等待后台的日志压缩结束，写入未落盘的变更，锁定并释放存储后端"""
+        compact = self._compact_thread
+        if compact is not None:
+            compact.join()      # 压缩线程需要_io_lock，不能持锁等待
+        with self._io_lock:
+            self._closed = True     # 等待期间又启动的压缩在取得锁后直接放弃
+            self.flush()
+            self.lock()
+            self._storage.close()
+
+    def change_main_key(self, old_key: str, new_key: str, progress=None, batch_size: int = 5000) -> bool:
+        """
+        修改主密码并轮换全部密钥：重新生成盐、验证哈希、AES密钥和HMAC密钥，分批重新加密全部密文并重建完整性数据
+        每批结果追加到进度文件（path+".rotate"）并落盘，中途崩溃后用同样的新旧密码再次调用即从断点续做；
+        主文件只在最后整体原子写入一次，不会出现一半新密钥一半旧密钥的文件
+        :param old_key: 当前主密码（不接受授权令牌）
+        :param new_key: 新主密码
+        :param progress: 进度回调 progress(已完成条数, 总条数)
+        :param batch_size: 每批重新加密的条数
+        :return: 是否修改成功，当前主密码错误时返回False
+        """
+        if not new_key:
+            raise ValueError("新主密码不能为空")
+        from argon2 import exceptions
+        from cryptography.fernet import Fernet
+        try:
+            self.ph.verify(self.verify_hash, old_key)
+        except exceptions.VerifyMismatchError:
+            print("主密码验证失败，不能修改主密码")
+            return False
+
+        with self._io_lock:
+            self._verify_items(list(self._unverified))  # 重算MAC前确认条目未被篡改
+            if self.journal_enabled and self._journal.records:
+                self._compact_journal()     # 从不含日志的检查点开始轮换
+            base = self.load_dict["ARGON2_PARAMS"]["integrity_check"]
+
+            # 1. 续做未完成的轮换（进度属于当前检查点且新密码一致），否则重新开始
+            done_items, done_frequent, new_params = {}, {}, None
+            header = self._rotation.read_header()
+            if header is not None and header.get("base") == base:
+                try:
+                    self.ph.verify(header["params"]["verify_hash"], new_key)
+                    new_hmac_key = self._derive_hmac_key(new_key, base64.b64decode(header["params"]["hmac_salt"]))
+                    header, batches = self._rotation.resume(new_hmac_key)
+                    for batch in batches:
+                        done_items.update(batch["items"])
+                        done_frequent.update(batch["frequent"])
+                    new_params = header["params"]
+                    print(f"续做未完成的主密码修改，已完成 {len(done_items)} 条")
+                except (exceptions.VerificationError, KeyError, ValueError):
+                    done_items, done_frequent = {}, {}
+            if new_params is None:
+                new_params = {
+                    "verify_hash": self.ph.hash(new_key),
+                    "encryption_salt": base64.b64encode(secrets.token_bytes(16)).decode('utf-8'),
+                    "hmac_salt": base64.b64encode(secrets.token_bytes(32)).decode('utf-8'),
+                }
+                new_hmac_key = self._derive_hmac_key(new_key, base64.b64decode(new_params["hmac_salt"]))
+            new_aes_key = bytearray(self._derive_aes_key(new_key, base64.b64decode(new_params["encryption_salt"])))
+            new_fernet = Fernet(base64.urlsafe_b64encode(new_aes_key))
+            self._wipe(new_aes_key)
+            if "hmac_key_encrypted" not in new_params:
+                new_params["hmac_key_encrypted"] = new_fernet.encrypt(base64.b64encode(new_hmac_key)).decode('utf-8')
+                self._rotation.begin({"base": base, "params": new_params}, new_hmac_key)
+
+            # 2. 分批重新加密，每批落盘后报告进度
+            old_fernet = self._get_fernet()
+
+            new_fingerprint_key = self._fingerprint_key(new_hmac_key)
+
+            def reencrypt(token: str) -> str:
+                return new_fernet.encrypt(old_fernet.decrypt(token.encode('utf-8'))).decode('utf-8')
+
+            def reencrypt_item(token: str) -> dict:
+                """重新加密条目密码，同时用新的HMAC子密钥重算指纹"""
+                password = old_fernet.decrypt(token.encode('utf-8'))
+                return {"Password": new_fernet.encrypt(password).decode('utf-8'),
+                        "Fingerprint": self._fingerprint(new_fingerprint_key, password)}
+
+            item_list = self.load_dict["ItemList"]
+            pending = [No for No in item_list if No not in done_items and "Password" in item_list[No]]
+            total = len(done_items) + len(pending)
+            if progress:
+                progress(len(done_items), total)
+            for start in range(0, len(pending), batch_size):
+                keys = pending[start:start + batch_size]
+                batch = dict(zip(keys, self._parallel_map(reencrypt_item, [item_list[No]["Password"] for No in keys])))
+                self._rotation.append(batch)
+                done_items.update(batch)
+                if progress:
+                    progress(len(done_items), total)
+            frequently = self.load_dict.get("FrequentlyKeys", {})
+            if not done_frequent and any("Password" in v for v in frequently.values()):
+                done_frequent = {k: reencrypt(v["Password"]) for k, v in frequently.items() if "Password" in v}
+                self._rotation.append({}, done_frequent)
+
+            # 3. 切换到新密钥，重建完整性数据后整体写入；写入失败时恢复原状态
+            snapshot = (self.load_dict, self.MainKey, self.verify_hash, self.encryption_salt,
+                        self.hmac_salt, self.hmac_key, self._merkle)
+            self.load_dict = {
+                **self.load_dict,
+                "ARGON2_PARAMS": {**self.load_dict["ARGON2_PARAMS"], **new_params},
+                "ItemList": {No: {**item, **done_items[No]} if No in done_items else item
+                             for No, item in item_list.items()},
+                "FrequentlyKeys": {k: {**v, "Password": done_frequent[k]} if k in done_frequent else v
+                                   for k, v in frequently.items()},
+            }
+            self.MainKey = new_key
+            self.verify_hash = new_params["verify_hash"]
+            self.encryption_salt = base64.b64decode(new_params["encryption_salt"])
+            self.hmac_salt = base64.b64decode(new_params["hmac_salt"])
+            self.hmac_key = new_hmac_key
+            with self._key_lock:
+                self._evict_key_cache()
+            try:
+                self._rebuild_integrity()
+                self._sync_to_file()
+            except Exception:
+                (self.load_dict, self.MainKey, self.verify_hash, self.encryption_salt,
+                 self.hmac_salt, self.hmac_key, self._merkle) = snapshot
+                with self._key_lock:
+                    self._evict_key_cache()
+                raise
+            if self.journal_enabled:
+                self._journal.reset(self.load_dict["ARGON2_PARAMS"]["integrity_check"])
+            self._attach_journal()      # HMAC密钥已更换
+            self._rotation.remove()
+            self._reveal_cache.clear()
+            self._reuse_index = None    # 指纹已按新的HMAC子密钥重算，下次find_reused()时重建
+            with self._token_lock:      # 旧密码签发的令牌全部作废
+                self._tokens.clear()
+        print("主密码修改完成")
+        return True
+
     def get_frequently_key(self,level:int):
         """
         获取常用密码
@@ -300,34 +1159,38 @@ class KeyWordNoteBook:
         :return:
         """
         # 检查文件是否存在
-        if not os.path.exists(self.Path):
+        if not self._storage.exists():
             self._initialize_new_book()
             return
 
-        with open(self.Path, 'r', encoding='utf-8') as self.file:
-            try:
-                self.file.seek(0)
-                self.load_dict = json.load(self.file)  # json文件->dict
-            except json.JSONDecodeError:
-                print("JSON文件格式错误，使用空文件，重新初始化密码")
-                self._initialize_new_book()
-                return
+        try:
+            self.load_dict = self._storage.load()
+        except json.JSONDecodeError:
+            print("JSON文件格式错误，使用空文件，重新初始化密码")
+            self._initialize_new_book()
+            return
 
         params = self.load_dict.get("ARGON2_PARAMS", {})
 
-        # 验证核心参数完整性（必须包含所有关键字段）
+        # 验证核心参数完整性（必须包含所有关键字段，merkle_root缺失时按旧格式校验）
         required_params = [ "verify_hash", "hash_len","encryption_salt",
                             "hmac_salt", "hmac_key_encrypted", "integrity_check"]
         missing = [p for p in required_params if p not in params]
         if missing:
             raise UnicodeError(f"文件参数不完整，缺少：{', '.join(missing)}")
 
+        # 按文件记录的参数构造Argon2加密器（旧版文件未记录参数时使用旧参数）
+        self.ph = self._make_hasher(self._stored_argon2_cost(params), params["hash_len"])
+
         # 验证登录
+        from argon2 import exceptions
         self.verify_hash = params["verify_hash"]
         try:
             self.ph.verify(self.verify_hash, self.MainKey)
             print("主密码验证成功")
         except exceptions.VerifyMismatchError:
+            if self._rotation.exists():     # 修改主密码未完成时主文件仍是原密码
+                raise ValueError("输入的登录密码不正确（上次修改主密码未完成，请使用原主密码登录）")
             raise ValueError ("输入的登录密码不正确")
         except exceptions.VerificationError:
             raise UnicodeError("哈希字符串格式错误")
@@ -347,9 +1210,37 @@ class KeyWordNoteBook:
         self.hmac_key = base64.b64decode(hmac_key_str)          # 解密hmac密钥 bytes
 
         # 文件完整性验证
-        computed_hmac = self._compute_file_hmac(self.load_dict)    # 计算文件的hmac
-        if computed_hmac != params["integrity_check"]:
-            raise ValueError("文件HMAC校验失败，内容可能被篡改或损坏")
+        legacy = "merkle_root" not in params
+        if legacy:
+            # 旧格式：整个文件一个HMAC，校验通过后升级为Merkle格式
+            computed_hmac = self._compute_legacy_file_hmac(self.load_dict)
+            if not hmac.compare_digest(computed_hmac, params["integrity_check"]):
+                raise ValueError("文件HMAC校验失败，内容可能被篡改或损坏")
+            self._rebuild_integrity()
+        else:
+            self._verify_integrity()
+        if "next_index" not in params:  # 旧版文件没有计数器，按现有最大Index补上
+            params["next_index"] = max(map(int, self.load_dict["ItemList"]), default=0) + 1
+
+        # 在检查点之上重放日志
+        self._attach_journal()
+        self._replay_journal()
+        if legacy:
+            self._sync_to_file()
+            if self.journal_enabled:
+                self._journal.reset(self.load_dict["ARGON2_PARAMS"]["integrity_check"])
+            print("文件已升级为Merkle完整性格式")
+
+        # 登录成功后，参数过时的密码本按目标参数重新哈希
+        target = self._outdated_argon2_cost(self.load_dict["ARGON2_PARAMS"])
+        if target is not None:
+            self._rehash(target)
+            print("Argon2参数已更新:", target)
+
+        # 密码等级的评估算法更新后，重新评估全部条目
+        from Strength import STRENGTH_VERSION
+        if self.load_dict["ARGON2_PARAMS"].get("strength_version") != STRENGTH_VERSION:
+            print(f"密码等级已按新算法重新评估，{self._rescore()} 条有变化")
 
         print("文件加载完成，验证通过")
 
@@ -359,7 +1250,9 @@ class KeyWordNoteBook:
         用于文件不存在，或json文件格式错误时
         :return:
         """
-        # 1. 生成验证用哈希
+        # 1. 按目标参数构造Argon2加密器，生成验证用哈希
+        cost = self._target_argon2_cost()
+        self.ph = self._make_hasher(cost, 64)
         self.verify_hash = self.ph.hash(self.MainKey)
         # 2. 生成16字节AES盐
         self.encryption_salt = secrets.token_bytes(16)  # bytes
@@ -378,10 +1271,16 @@ class KeyWordNoteBook:
         m_Argon2Params = Argon2Params()  # 加密参数
         m_Argon2Params["verify_hash"] = self.verify_hash
         m_Argon2Params["hash_len"] = 64
+        m_Argon2Params.update(cost)
         m_Argon2Params["encryption_salt"] = encrypted_salt_b64
         m_Argon2Params["hmac_salt"] = hmac_salt_b64
         m_Argon2Params["hmac_key_encrypted"] = encrypted_hmac_key
         m_Argon2Params["integrity_check"] = "1234567890123456789012345678901234567890123456789012345678901234"
+        self._merkle = MerkleTree()
+        m_Argon2Params["merkle_root"] = self._merkle.root()
+        m_Argon2Params["next_index"] = 1
+        from Strength import STRENGTH_VERSION
+        m_Argon2Params["strength_version"] = STRENGTH_VERSION
 
         m_ItemDict: dict[str:KeyItem] = {}  # 用户条目
         m_FrequentlyKeyDict: dict[str:FrequentlyKey] = {}  # 常用条目
@@ -390,14 +1289,32 @@ class KeyWordNoteBook:
         self.load_dict.update({
             "ARGON2_PARAMS": m_Argon2Params,
             "ItemList": m_ItemDict,
+            "ItemMAC": {},
             "FrequentlyKeys": m_FrequentlyKeyDict
             })
         self._sync_to_file()
+        self._journal.remove()  # 旧日志和轮换进度属于被替换的密码本
+        self._rotation.remove()
+        self._attach_journal()
         print("新密码本初始化完成")
 
     def _compute_file_hmac(self, data: dict) -> str:
         """
-        使用HMAC密钥计算文件HMAC
+        使用HMAC密钥计算文件头的HMAC
+        只覆盖ARGON2_PARAMS（含merkle_root）和FrequentlyKeys，条目由Merkle根间接覆盖
+        :param data: 要计算的文件dict
+        :return:hmac值
+        """
+        header = {
+            "ARGON2_PARAMS": {k: v for k, v in data["ARGON2_PARAMS"].items() if k != "integrity_check"},
+            "FrequentlyKeys": data.get("FrequentlyKeys", {})
+        }
+        data_str = json.dumps(header, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode()
+        return hmac.new(self.hmac_key, msg=data_str, digestmod=hashlib.sha256).hexdigest()
+
+    def _compute_legacy_file_hmac(self, data: dict) -> str:
+        """
+        旧格式的整文件HMAC，仅用于校验和升级旧文件
         :param data: 要计算的文件dict
         :return:hmac值
         """
@@ -420,25 +1337,371 @@ class KeyWordNoteBook:
             digestmod=hashlib.sha256
         ).hexdigest()
 
+    def _compute_item_mac(self, No: str, item: dict) -> str:
+        """计算单个条目的MAC，绑定条目Index，防止条目被替换或调换位置"""
+        item_str = json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hmac.new(self.hmac_key, msg=f"{No}|{item_str}".encode(), digestmod=hashlib.sha256).hexdigest()
+
+    def _rebuild_integrity(self):
+        """重新计算全部条目MAC并重建Merkle树（新建或升级旧文件时使用）"""
+        item_list = self.load_dict["ItemList"]
+        item_macs = {No: self._compute_item_mac(No, item) for No, item in item_list.items()}
+        self.load_dict["ItemMAC"] = item_macs
+        self._merkle = MerkleTree({int(No): bytes.fromhex(mac) for No, mac in item_macs.items()})
+        self.load_dict["ARGON2_PARAMS"]["merkle_root"] = self._merkle.root()
+        self._unverified = set()
+
+    def _verify_integrity(self):
+        """
+        加载时校验：文件头HMAC → 条目集合与Index格式 → Merkle根 → 条目MAC（按verify_mode）
+        能发现条目被篡改、调换、删除，以及MAC被替换
+        """
+        params = self.load_dict["ARGON2_PARAMS"]
+        if not hmac.compare_digest(self._compute_file_hmac(self.load_dict), params["integrity_check"]):
+            raise ValueError("文件HMAC校验失败，内容可能被篡改或损坏")
+        item_list = self.load_dict.get("ItemList", {})
+        item_macs = self.load_dict.setdefault("ItemMAC", {})
+        if item_macs.keys() != item_list.keys():
+            raise ValueError("条目与MAC不一致，条目可能被删除或插入")
+        # Index不在文件头HMAC覆盖范围内，先检查格式再据此分配Merkle树
+        try:
+            leaves = {self._merkle_slot(No): bytes.fromhex(mac) for No, mac in item_macs.items()}
+        except ValueError:
+            raise ValueError("条目Index或MAC格式错误，内容可能被篡改或损坏")
+        if any(len(mac) != MerkleTree.NODE_SIZE for mac in leaves.values()):
+            raise ValueError("条目MAC格式错误，内容可能被篡改或损坏")
+        # 完整的树按最大Index分配；Index远大于条目数时先按排序后的槽位校验根，通过后再分配
+        if max(leaves, default=0) > 4 * len(leaves) + 1024:
+            if not hmac.compare_digest(MerkleTree.sparse_root(leaves), params["merkle_root"]):
+                raise ValueError("Merkle根校验失败，内容可能被篡改或损坏")
+        self._merkle = MerkleTree(leaves)
+        if not hmac.compare_digest(self._merkle.root(), params["merkle_root"]):
+            raise ValueError("Merkle根校验失败，内容可能被篡改或损坏")
+
+        self._unverified = set(item_list)
+        if self.verify_mode == "lazy":
+            return
+        if self.verify_mode == "parallel":
+            from concurrent.futures import ThreadPoolExecutor
+            keys = list(self._unverified)
+            workers = os.cpu_count() or 1
+            chunk = max(1, len(keys) // workers + 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(self._verify_items, [keys[i:i + chunk] for i in range(0, len(keys), chunk)]))
+        else:
+            self._verify_items(list(self._unverified))
+
+    @staticmethod
+    def _merkle_slot(No: str) -> int:
+        """条目Index对应的Merkle槽位，Index须为规范的十进制数且在树的容量内"""
+        if not (isinstance(No, str) and No.isascii() and No.isdigit() and len(No) <= 10):
+            raise ValueError(f"无效的条目Index: {No!r}")
+        slot = int(No)
+        if str(slot) != No or slot >= 2 ** MerkleTree.DEPTH:
+            raise ValueError(f"无效的条目Index: {No!r}")
+        return slot
+
+    def _verify_items(self, keys: list):
+        """校验条目MAC，通过后从待校验集合移除"""
+        item_list = self.load_dict["ItemList"]
+        item_macs = self.load_dict["ItemMAC"]
+        for No in keys:
+            if No not in self._unverified:
+                continue
+            if not hmac.compare_digest(self._compute_item_mac(No, item_list[No]), item_macs[No]):
+                raise ValueError(f"条目 {No} MAC校验失败，内容可能被篡改或损坏")
+            self._unverified.discard(No)
+
+    def _update_integrity(self, put: dict = None, delete: list = None):
+        """增量更新：只重算变更条目的MAC和它们到Merkle根的路径"""
+        item_macs = self.load_dict["ItemMAC"]
+        for No, item in (put or {}).items():
+            mac = self._compute_item_mac(No, item)
+            item_macs[No] = mac
+            self._merkle.update(int(No), bytes.fromhex(mac))
+            self._unverified.discard(No)
+        for No in delete or []:
+            item_macs.pop(No, None)
+            self._merkle.update(int(No), None)
+            self._unverified.discard(No)
+        self.load_dict["ARGON2_PARAMS"]["merkle_root"] = self._merkle.root()
+
+    def _commit(self, put: dict = None, delete: list = None):
+        """
+        持久化一次变更，调用方需持有_io_lock
+        日志模式下只追加变更记录；启用写回或deferred_writes()期间只记录涉及的条目，之后合并写入；否则立即写入存储后端
+        :param put: 新增或修改的条目 {Index: KeyItem}
+        :param delete: 删除的条目Index列表
+        """
+        self._update_integrity(put, delete)
+        if self._flusher is not None or self._deferred:
+            self._pending_put.difference_update(delete or [])
+            self._pending_put.update(put or {})
+            self._pending_delete.difference_update(put or {})
+            self._pending_delete.update(delete or [])
+            if self._flusher is not None:
+                self._flusher.mark_dirty()
+        elif not self.journal_enabled:
+            self.load_dict["ARGON2_PARAMS"]["integrity_check"] = self._compute_file_hmac(self.load_dict)
+            self._storage.apply(self.load_dict, put, delete)
+        else:
+            for index, item in (put or {}).items():
+                self._journal.append({"op": "put", "key": index, "item": item})
+            for index in delete or []:
+                self._journal.append({"op": "del", "key": index})
+            if self._journal.needs_compaction():
+                self._start_compaction()
+        self._update_indexes(put, delete)
+
+    def _update_indexes(self, put: dict = None, delete: list = None):
+        """变更写入成功后，增量更新内存索引，并清除变更条目的明文缓存"""
+        self._reveal_cache.invalidate([*(put or {}), *(delete or [])])
+        if self._search_index is not None:
+            self._search_index.update(put, delete)
+        if self._domain_index is not None:
+            self._domain_index.update(put, delete)
+        if self._reuse_index is not None:
+            self._reuse_index.update(put, delete)
+
+    def _attach_journal(self):
+        """将日志绑定到当前检查点和加密上下文"""
+        self._journal.attach(self.load_dict["ARGON2_PARAMS"]["integrity_check"],
+                             self._encode_aes, self._decode_aes, self.hmac_key)
+
+    def _replay_journal(self):
+        """重放日志中的变更；未启用日志模式时把重放结果合并回主文件并删除日志"""
+        ops = self._journal.replay()
+        item_list = self.load_dict["ItemList"]
+        for op in ops:
+            if op["op"] == "put":
+                item_list[op["key"]] = op["item"]
+                params = self.load_dict["ARGON2_PARAMS"]    # 计数器随检查点保存，日志中新增的条目需要补上
+                params["next_index"] = max(params["next_index"], int(op["key"]) + 1)
+                self._update_integrity(put={op["key"]: op["item"]})
+            elif op["op"] == "del":
+                item_list.pop(op["key"], None)
+                self._update_integrity(delete=[op["key"]])
+        if ops:
+            print(f"已重放 {len(ops)} 条日志记录")
+        if not self.journal_enabled:
+            if ops:
+                self._sync_to_file()
+            self._journal.remove()
+        elif self._journal.needs_compaction():
+            self._start_compaction()
+
+    def _start_compaction(self):
+        """在后台线程中压缩日志（已有压缩任务时忽略）"""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self._compact_journal, daemon=True)
+        self._compact_thread.start()
+
+    def _compact_journal(self):
+        """
+        压缩日志：把内存中的完整状态写成新检查点，再截断日志
+        检查点写完、日志截断前崩溃时，旧日志的base与新检查点不符，加载时会被忽略
+        """
+        with self._io_lock:
+            if self._closed:
+                return      # 日志仍然完整，下次打开时重放
+            self._sync_to_file()
+            self._journal.reset(self.load_dict["ARGON2_PARAMS"]["integrity_check"])
+            print("日志压缩完成")
+
+    def _flush_pending(self):
+        """写入合并窗口中累积的变更：文件HMAC只算一次，增量后端只写涉及的条目；deferred_writes()期间不写入"""
+        with self._io_lock:
+            if self._deferred or (not self._pending_put and not self._pending_delete):
+                return
+            item_list = self.load_dict["ItemList"]
+            put = {No: item_list[No] for No in self._pending_put if No in item_list}
+            delete = list(self._pending_delete)
+            self.load_dict["ARGON2_PARAMS"]["integrity_check"] = self._compute_file_hmac(self.load_dict)
+            self._storage.apply(self.load_dict, put, delete)
+            self._pending_put.clear()
+            self._pending_delete.clear()
+
     def _sync_to_file(self):
-        """将内存中的数据同步到文件，统一管理写入操作"""
-        with open(self.Path, 'w', encoding='utf-8') as f:
+        """将内存中的完整数据同步到存储后端，统一管理写入操作"""
+        with self._io_lock:
             computed_hmac = self._compute_file_hmac(self.load_dict)
             self.load_dict["ARGON2_PARAMS"]["integrity_check"] = computed_hmac
-            json.dump(self.load_dict,
-                      f,
-                      sort_keys=True,
-                      ensure_ascii=False,
-                      indent=4,
-                      separators=(',', ': '))
-
-    def _derive_hmac_key(self)->bytes:
-        """使用hmac_salt派生HMAC密钥"""
-        if not self.hmac_salt:
+            self._storage.save(self.load_dict)
+            # 整体写入已包含合并窗口中的变更
+            self._pending_put.clear()
+            self._pending_delete.clear()
+
+    @staticmethod
+    def _make_hasher(cost: dict, hash_len: int) -> "PasswordHasher":
+        """按给定参数构造Argon2id加密器"""
+        from argon2 import PasswordHasher, Type
+        return PasswordHasher(type=Type.ID, hash_len=hash_len, **cost)
+
+    @staticmethod
+    def _stored_argon2_cost(params: dict) -> dict:
+        """文件中记录的Argon2参数，旧版文件缺失的项按旧参数补齐"""
+        return {key: params.get(key, value) for key, value in ARGON2_LEGACY_COST.items()}
+
+    def _target_argon2_cost(self) -> dict:
+        """解析argon2_cost得到目标参数；档位名在首次调用时于本机校准，结果缓存"""
+        if self._argon2_target is None:
+            cost = self._argon2_cost
+            if isinstance(cost, dict):
+                self._argon2_target = {**ARGON2_LEGACY_COST, **cost}
+            else:
+                profile = cost or ARGON2_DEFAULT_PROFILE
+                if profile not in ARGON2_PROFILES:
+                    raise ValueError(f"未知的Argon2档位: {profile}")
+                self._argon2_target = calibrate_argon2_cost(**ARGON2_PROFILES[profile])
+        return self._argon2_target
+
+    def _outdated_argon2_cost(self, params: dict) -> dict | None:
+        """
+        判断文件的Argon2参数是否过时，过时则返回目标参数
+        显式参数要求完全一致；档位按耗时校准，存在测量误差，只有成本偏离目标一倍以上才算过时；
+        未指定时只处理明显过时的情况（旧版文件、并行度超过CPU核数、内存低于下限），避免每次登录都校准
+        """
+        stored = self._stored_argon2_cost(params)
+        if isinstance(self._argon2_cost, dict):
+            target = self._target_argon2_cost()
+            return target if stored != target else None
+        obsolete = ("memory_cost" not in params
+                    or stored["parallelism"] > (os.cpu_count() or 1)
+                    or stored["memory_cost"] < ARGON2_MIN_MEMORY_COST)
+        if self._argon2_cost is None and not obsolete:
+            return None
+        target = self._target_argon2_cost()
+        if not obsolete:
+            work, target_work = stored["memory_cost"] * stored["time_cost"], target["memory_cost"] * target["time_cost"]
+            if target_work / 2 <= work <= target_work * 2 and stored["memory_cost"] <= target["memory_cost"] * 2:
+                return None
+        return target
+
+    def _rehash(self, cost: dict):
+        """
+        按新的Argon2参数重新生成验证哈希和AES密钥，并用新密钥重新加密全部密文
+        HMAC密钥保持不变（只重新加密存储），条目MAC随密文重算；
+        新数据在内存中构建完成后一次性原子写入，中途失败时文件和内存保持原状
+        """
+        with self._io_lock:
+            self._verify_items(list(self._unverified))  # 重算MAC前确认条目未被篡改
+            old_fernet = self._get_fernet()
+            old_state = (self.ph, self.verify_hash, self.encryption_salt)
+            self._reveal_cache.clear()
+            try:
+                self.ph = self._make_hasher(cost, self.load_dict["ARGON2_PARAMS"]["hash_len"])
+                self.verify_hash = self.ph.hash(self.MainKey)
+                self.encryption_salt = secrets.token_bytes(16)
+                with self._key_lock:
+                    self._evict_key_cache()
+                new_fernet = self._get_fernet()
+
+                def reencrypt_all(entries: dict) -> dict:
+                    keys = [k for k, v in entries.items() if "Password" in v]
+                    tokens = self._parallel_map(
+                        lambda t: new_fernet.encrypt(old_fernet.decrypt(t.encode('utf-8'))).decode('utf-8'),
+                        [entries[k]["Password"] for k in keys])
+                    result = dict(entries)
+                    for k, token in zip(keys, tokens):
+                        result[k] = {**entries[k], "Password": token}
+                    return result
+
+                item_list = reencrypt_all(self.load_dict["ItemList"])
+                frequently = reencrypt_all(self.load_dict.get("FrequentlyKeys", {}))
+                hmac_key_encrypted = new_fernet.encrypt(base64.b64encode(self.hmac_key)).decode('utf-8')
+            except Exception:
+                self.ph, self.verify_hash, self.encryption_salt = old_state
+                with self._key_lock:
+                    self._evict_key_cache()
+                raise
+
+            params = self.load_dict["ARGON2_PARAMS"]
+            params.update(cost)
+            params["verify_hash"] = self.verify_hash
+            params["encryption_salt"] = base64.b64encode(self.encryption_salt).decode('utf-8')
+            params["hmac_key_encrypted"] = hmac_key_encrypted
+            self.load_dict["ItemList"] = item_list
+            self.load_dict["FrequentlyKeys"] = frequently
+            self._rebuild_integrity()
+            self._sync_to_file()
+            if self.journal_enabled:
+                self._journal.reset(params["integrity_check"])
+
+    def _rescore(self) -> int:
+        """
+        解密全部密码并批量评估等级，等级有变化的条目重算MAC，连同算法版本一次写入
+        已经解密了全部密码，顺便补上旧条目缺少的密码指纹
+        :return: 等级有变化的条目数
+        """
+        from Strength import STRENGTH_VERSION, score_all as score_passwords
+        with self._io_lock:
+            self._verify_items(list(self._unverified))  # 重算MAC前确认条目未被篡改
+            item_list = self.load_dict["ItemList"]
+            params = self.load_dict["ARGON2_PARAMS"]
+            keys = list(item_list)
+            passwords = self._decode_aes_many([item_list[No]["Password"] for No in keys])
+            fingerprint_key = self._fingerprint_key()
+            put, changed = {}, 0
+            for No, password, level in zip(keys, passwords, score_passwords(passwords)):
+                item = item_list[No]
+                update = {}
+                if item.get("PasswordLevel") != level:
+                    update["PasswordLevel"] = level
+                    changed += 1
+                if "Fingerprint" not in item:
+                    update["Fingerprint"] = self._fingerprint(fingerprint_key, password)
+                if update:
+                    put[No] = {**item, **update}
+            if not put and params.get("strength_version") == STRENGTH_VERSION:
+                return 0
+            item_list.update(put)
+            params["strength_version"] = STRENGTH_VERSION
+            self._update_integrity(put=put)
+            self._sync_to_file()
+            if self.journal_enabled:
+                self._journal.reset(params["integrity_check"])
+            self._update_indexes(put=put)
+            return changed
+
+    def _backfill_fingerprints(self):
+        """为缺少密码指纹的旧条目补算指纹（只解密这些条目），一次写入"""
+        with self._io_lock:
+            item_list = self.load_dict["ItemList"]
+            missing = [No for No, item in item_list.items() if "Fingerprint" not in item]
+            if not missing:
+                return
+            self._verify_items(missing)
+            fingerprint_key = self._fingerprint_key()
+            passwords = self._decode_aes_many([item_list[No]["Password"] for No in missing])
+            put = {No: {**item_list[No], "Fingerprint": self._fingerprint(fingerprint_key, password)}
+                   for No, password in zip(missing, passwords)}
+            item_list.update(put)
+            self._commit(put=put)
+            print(f"已为 {len(put)} 条旧条目补算密码指纹")
+
+    def _fingerprint_key(self, hmac_key: bytes = None) -> bytes:
+        """密码指纹的子密钥，由HMAC密钥派生，与条目MAC使用的密钥分离（修改主密码时可指定新的HMAC密钥）"""
+        return hmac.new(hmac_key or self.hmac_key, b"KeyWordNoteBook/password-fingerprint", hashlib.sha256).digest()
+
+    @staticmethod
+    def _fingerprint(key: bytes, password: str | bytes) -> str:
+        """
+        密码指纹：子密钥对密码的HMAC（截取128位），同一密码本中相同的密码指纹相同
+        不知道HMAC密钥时无法用指纹离线猜测密码
+        """
+        if isinstance(password, str):
+            password = password.encode('utf-8')
+        return hmac.new(key, password, hashlib.sha256).hexdigest()[:32]
+
+    def _derive_hmac_key(self, main_key: str = None, salt: bytes = None)->bytes:
+        """使用hmac_salt派生HMAC密钥（修改主密码时可指定新的主密码和盐）"""
+        salt = salt or self.hmac_salt
+        if not salt:
             raise RuntimeError("HMAC盐值未初始化")
         try:
             # 用主密码+hmac盐值生成哈希，提取前16字节作为hmac密钥
-            hash_result = self.ph.hash(self.MainKey, salt=self.hmac_salt)
+            hash_result = self.ph.hash(main_key or self.MainKey, salt=salt)
 
             parts = hash_result.split("$")
             if len(parts) < 6:
@@ -480,29 +1743,124 @@ class KeyWordNoteBook:
         except Exception as e:
             raise RuntimeError(f"AES解密失败（可能被篡改或密钥错误）: {str(e)}")
 
-    def _get_fernet(self) -> Fernet:
+    def _encode_aes_many(self, plaintexts: list) -> list:
+        """
+        批量加密：整批共用一次派生的密钥，在线程池中分块并行
+        :param plaintexts: 明文列表
+        :return: 与输入顺序一致的密文列表
+        """
+        fernet = self._get_fernet()
+        try:
+            return self._parallel_map(lambda text: fernet.encrypt(text.encode('utf-8')).decode('utf-8'), plaintexts)
+        except Exception as e:
+            raise RuntimeError(f"AES批量加密失败: {str(e)}")
+
+    def _decode_aes_many(self, ciphertexts: list) -> list:
+        """
+        批量解密：整批共用一次派生的密钥，在线程池中分块并行
+        :param ciphertexts: 密文列表
+        :return: 与输入顺序一致的明文列表
+        """
+        fernet = self._get_fernet()
+        try:
+            return self._parallel_map(lambda token: fernet.decrypt(token.encode('utf-8')).decode('utf-8'), ciphertexts)
+        except Exception as e:
+            raise RuntimeError(f"AES批量解密失败（可能被篡改或密钥错误）: {str(e)}")
+
+    def _parallel_map(self, fn, values: list) -> list:
+        """
+        按BULK_CHUNK分块在线程池中执行fn，结果保持输入顺序
+        线程数不超过CPU核数和BULK_MAX_WORKERS；只有一块或单核时直接串行执行
+        """
+        chunks = [values[i:i + self.BULK_CHUNK] for i in range(0, len(values), self.BULK_CHUNK)]
+        workers = min(len(chunks), os.cpu_count() or 1, self.BULK_MAX_WORKERS)
+        if workers <= 1:
+            return [fn(value) for value in values]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [result for chunk in pool.map(lambda c: [fn(v) for v in c], chunks) for result in chunk]
+
+    def _get_fernet(self) -> "Fernet":
         """
         生成Fernet加密器（封装了AES-GCM）
+        会话内优先使用缓存，缓存失效时重新派生
+        """
+        with self._key_lock:
+            if self._fernet_cache is not None:
+                if time.monotonic() - self._key_last_used < self.key_cache_timeout:
+                    self._key_last_used = time.monotonic()
+                    return self._fernet_cache
+                self._evict_key_cache()  # 已超时但定时器尚未触发
+
+            # 派生32字节AES密钥，存入可清零的缓冲区
+            aes_key = bytearray(self._derive_aes_key())  # 32字节密钥（AES-256）
+            # 将原始密钥转换为Fernet要求的URL安全Base64格式
+            fernet_key = base64.urlsafe_b64encode(aes_key)
+            # 确保密钥长度正确，32字节原始密钥经Base64编码后应为44字节
+            if len(fernet_key) != 44:
+                raise ValueError(f"无效的Fernet密钥长度: {len(fernet_key)}")
+            # Fernet加密器（内部使用AES-GCM模式，自带认证）
+            from cryptography.fernet import Fernet
+            fernet = Fernet(fernet_key)
+
+            if self.key_cache_timeout <= 0:  # 不缓存：用完即清
+                self._wipe(aes_key)
+                return fernet
+            self._aes_key_buf = aes_key
+            self._fernet_cache = fernet
+            self._key_last_used = time.monotonic()
+            self._schedule_key_eviction(self.key_cache_timeout)
+            return fernet
+
+    def _schedule_key_eviction(self, delay: float):
+        """启动空闲超时定时器，到期时检查是否需要清除缓存"""
+        if self._key_timer is not None:
+            self._key_timer.cancel()
+        self._key_timer = threading.Timer(delay, self._on_key_cache_timer)
+        self._key_timer.daemon = True
+        self._key_timer.start()
+
+    def _on_key_cache_timer(self):
+        """定时器回调：空闲时间达到超时则清除，否则按剩余时间重新计时"""
+        with self._key_lock:
+            if self._fernet_cache is None:
+                return
+            idle = time.monotonic() - self._key_last_used
+            if idle >= self.key_cache_timeout:
+                self._evict_key_cache()
+                print("会话密钥空闲超时，已清除")
+            else:
+                self._schedule_key_eviction(self.key_cache_timeout - idle)
+
+    def _evict_key_cache(self):
+        """
+        清除会话密钥缓存，调用方需持有_key_lock
+        密钥缓冲区先清零再释放；Fernet对象内部的bytes副本无法清零，只能解除引用
         """
-        # 派生32字节AES密钥
-        aes_key = self._derive_aes_key()  # 32字节密钥（AES-256）
-        # 将原始密钥转换为Fernet要求的URL安全Base64格式
-        fernet_key = base64.urlsafe_b64encode(aes_key)
-        # 确保密钥长度正确，32字节原始密钥经Base64编码后应为44字节
-        if len(fernet_key) != 44:
-            raise ValueError(f"无效的Fernet密钥长度: {len(fernet_key)}")
-        # 返回Fernet加密器（内部使用AES-GCM模式，自带认证）
-        return Fernet(fernet_key)
+        if self._key_timer is not None:
+            self._key_timer.cancel()
+            self._key_timer = None
+        if self._aes_key_buf is not None:
+            self._wipe(self._aes_key_buf)
+            self._aes_key_buf = None
+        self._fernet_cache = None
 
-    def _derive_aes_key(self) -> bytes:
+    @staticmethod
+    def _wipe(buf: bytearray):
+        """用0覆盖可变缓冲区（原地写入，不重新分配）"""
+        buf[:] = bytes(len(buf))
+
+    def _derive_aes_key(self, main_key: str = None, salt: bytes = None) -> bytes:
         """
         使用加密专用盐值派生AES密钥,应该随用随调，使用后立刻清理
+        修改主密码时可指定新的主密码和盐
         """
-        if not self.encryption_salt:
+        salt = salt or self.encryption_salt
+        if not salt:
             raise RuntimeError("加密盐值未初始化")
         # 用主密码+加密盐值生成哈希，提取前32字节作为AES-256密钥
         try:
-            hash_result = self.ph.hash(self.MainKey, salt=self.encryption_salt)
+            hash_result = self.ph.hash(main_key or self.MainKey, salt=salt)
             parts = hash_result.split("$")
             if len(parts) < 6:
                 raise ValueError(f"无效的Argon2哈希格式: {hash_result}")
@@ -517,73 +1875,27 @@ class KeyWordNoteBook:
         except Exception as e:
             raise RuntimeError(f"派生AES密钥失败: {str(e)}")
 
-    def _get_index(self)->str:
+    def _get_index(self, count: int = 1)->str:
         """
-        获取一个新的条目index
-        :return:
+        分配新的条目index，调用方需持有_io_lock
+        取文件头中持久化的单调计数器，不扫描条目；删除的index不会被复用
+        :param count: 连续分配的个数
+        :return: 第一个index
         """
-        ItemList = self.load_dict.get("ItemList",{})
-        if not ItemList:
-            return "1"
-        # 取现有最大索引值并加1，确保唯一性
-        max_index = max(int(key) for key in ItemList)
-        return str(max_index + 1)
+        params = self.load_dict["ARGON2_PARAMS"]
+        index = params["next_index"]
+        params["next_index"] = index + count
+        return str(index)
 
     @staticmethod
     def get_password_level(key: str) -> int:
         """
-        估计密码强度（0-5级，数字越大越安全）
+        估计密码强度（0-5级，数字越大越安全），算法见Strength.py
         :param key: 待评估的密码字符串
         :return: 强度等级（0-5）
         """
-        if not isinstance(key, str) or len(key) == 0:
-            return 0
-        score = 0  # 评分
-        length = len(key)
-        # 1. 密码长度评估（占比30%）
-        if length >= 16:
-            score += 3  # 超长密码（优秀）
-        elif length >= 12:
-            score += 2  # 长密码（良好）
-        elif length >= 8:
-            score += 1  # 标准长度（及格）
-        # 小于8位不加分
-
-        # 2. 字符类型多样性（占比40%）
-        # 检查是否包含小写字母、大写字母、数字、特殊符号
-        has_lower = re.search(r'[a-z]', key) is not None
-        has_upper = re.search(r'[A-Z]', key) is not None
-        has_digit = re.search(r'\d', key) is not None
-        has_special = re.search(r'[^a-zA-Z0-9]', key) is not None
-
-        # 每包含一种类型加1分，最多4分
-        char_types = sum([has_lower, has_upper, has_digit, has_special])
-        score += char_types
-
-        # 3. 复杂度评估（占比30%）
-        # 3.1 避免纯数字或纯字母
-        if not (key.isdigit() or key.isalpha()):
-            score += 1
-
-        # 3.2 检查是否包含常见弱密码模式（如连续字符、重复字符）
-        weak_patterns = [
-            r'^(0-9){6,}$',  # 纯数字且长度≥6
-            r'^[a-zA-Z]{6,}$',  # 纯字母且长度≥6
-            r'^(.)\1{4,}$',  # 单个字符重复≥5次（如aaaaa）
-            r'^123456|654321|111111|abcdef|fedcba$'  # 常见序列
-        ]
-        is_weak_pattern = any(re.match(pattern, key.lower()) for pattern in weak_patterns)
-        if not is_weak_pattern:
-            score += 1
-
-        # 3.3 检查是否包含常见词典词（简单检查）
-        common_words = {'password', '123456', 'qwerty', 'admin', 'user', 'passwd', 'abc123'}
-        if key.lower() not in common_words and not any(word in key.lower() for word in common_words):
-            score += 1
-
-        # 映射分数到0-5级（总分最高10分）
-        level = min(5, max(0, (score // 2)))  # 10分→5级，8分→4级，以此类推
-        return level
+        from Strength import password_level
+        return password_level(key)
 
     @staticmethod
     def argon2_base64_decode(encoded: str) -> bytes:
@@ -0,0 +1,310 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：Importer.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/18 02:40
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+从浏览器和其他密码管理器的导出文件导入条目
+支持Chrome/Edge/Firefox的CSV导出、Bitwarden的CSV/JSON导出、KeePass/KeePassXC的CSV导出，
+以及本项目（CLI export）的JSON；格式按表头或JSON结构自动识别
+文件逐行（JSON逐个条目）流式读取，按(URL, 用户名)去重后分块调用add_items：
+整个导入只验证一次权限、只派生一次密钥，每块加密后提交一次，读取文件的内存占用与文件大小无关
+每次写入都重写整个文件的后端（JSON、.kwnb）在导入期间推迟写入（deferred_writes），导入结束时只写一次
+"""
+__version__ = "0.0.1.0"
+
+import contextlib
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+
+# CSV格式 -> {字段: 表头列名（小写）}；Title为站点/条目名称，Type为条目类型（只导入登录类条目）
+CSV_FORMATS = {
+    "chrome": {"Title": "name", "URL": "url", "UserName": "username", "Password": "password", "Note": "note"},
+    "firefox": {"URL": "url", "UserName": "username", "Password": "password"},
+    "bitwarden": {"Type": "type", "Title": "name", "Note": "notes", "URL": "login_uri",
+                  "UserName": "login_username", "Password": "login_password"},
+    "keepassxc": {"Title": "title", "UserName": "username", "Password": "password", "URL": "url", "Note": "notes"},
+    "keepass": {"Title": "account", "UserName": "login name", "Password": "password", "URL": "web site",
+                "Note": "comments"},
+}
+FORMAT_ALIASES = {"edge": "chrome"}     # Edge的导出与Chrome相同
+JSON_FORMATS = ("bitwarden-json", "json")   # json为扁平条目（本项目导出或同名字段）
+FORMATS = (*CSV_FORMATS, *FORMAT_ALIASES, *JSON_FORMATS)
+DEFAULT_CHUNK_SIZE = 2000   # 每块条数：一块加密后提交一次
+MAX_REPORTED_SKIPS = 100    # 结果中最多列出的跳过行
+_NUMBER_CHARS = re.compile(r"[-+0-9.eE]*")
+
+
+def detect_csv_format(header: list[str]) -> str:
+    """按CSV表头识别导出来源"""
+    columns = {name.strip().lower() for name in header}
+    if "login_password" in columns:
+        return "bitwarden"
+    if "login name" in columns:
+        return "keepass"
+    if {"httprealm", "guid"} & columns:
+        return "firefox"
+    if "title" in columns:
+        return "keepassxc"
+    if {"url", "username", "password"} <= columns:
+        return "chrome"
+    raise ValueError(f"无法识别的CSV格式，表头为: {', '.join(header)}")
+
+
+def _make_item(url, user_name, password, note="", title="") -> dict | str:
+    """
+    把一条记录整理为条目；不能导入时返回原因
+    网址为空时用名称代替；名称不是网址的一部分时写入备注
+    """
+    url, user_name, note, title = (value.strip() if isinstance(value, str) else ""
+                                   for value in (url, user_name, note, title))
+    if not isinstance(password, str) or not password:
+        return "没有密码"
+    if not url:
+        url = title
+    elif title and title.lower() not in url.lower():
+        note = f"{title}\n{note}" if note else title
+    if not url:
+        return "没有网址和名称"
+    return {"URL": url, "UserName": user_name, "Password": password, "LinkURL": "", "Note": note}
+
+
+def iter_csv(f, fmt: str = None):
+    """
+    逐行读取CSV导出
+    :param f: 文本文件对象（newline=""打开）
+    :param fmt: CSV格式名，None时按表头识别
+    :return: 生成器，产出(行号, 条目或跳过原因)
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    if header and header[0].startswith("\ufeff"):   # 带BOM的UTF-8
+        header[0] = header[0][1:]
+    fmt = FORMAT_ALIASES.get(fmt, fmt) or detect_csv_format(header)
+    if fmt not in CSV_FORMATS:
+        raise ValueError(f"不支持的CSV格式: {fmt}")
+    positions = {name.strip().lower(): i for i, name in enumerate(header)}
+    mapping = CSV_FORMATS[fmt]
+    missing = [mapping[field] for field in ("URL", "Password") if mapping[field] not in positions]
+    if missing:
+        raise ValueError(f"CSV缺少列: {', '.join(missing)}（按{fmt}格式）")
+    columns = {field: positions.get(column) for field, column in mapping.items()}
+
+    for line_no, row in enumerate(reader, 2):
+        if not any(row):
+            continue
+        values = {field: row[i] if i is not None and i < len(row) else "" for field, i in columns.items()}
+        if values.get("Type", "login") not in ("login", ""):
+            yield line_no, f"不是登录条目（{values['Type']}）"
+            continue
+        # Bitwarden的多个网址用逗号分隔，取第一个
+        url = values.get("URL", "").split(",")[0] if fmt == "bitwarden" else values.get("URL", "")
+        yield line_no, _make_item(url, values.get("UserName"), values.get("Password"),
+                                  values.get("Note"), values.get("Title"))
+
+
+class _JSONStream:
+    """按块读取的JSON解析器：逐个解析值，大数组不必整体读入内存"""
+
+    def __init__(self, f, block_size: int = 1 << 16):
+        self._f, self._block_size = f, block_size
+        self._buf, self._pos, self._eof = "", 0, False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        data = self._f.read(self._block_size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """下一个非空白字符，读完时为空串"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos:self._pos + 1]
+
+    def take(self, expected: str):
+        ch = self.peek()
+        if ch != expected:
+            raise ValueError(f"JSON格式错误：应为 {expected!r}，实际为 {ch!r}")
+        self._pos += 1
+
+    def value(self):
+        """解析下一个完整的值；缓冲区内不完整时继续读入"""
+        self.peek()
+        # 被块边界截断的数字仍能解析成功（如1.5e10只读到1），读到数字之后的字符为止
+        while _NUMBER_CHARS.match(self._buf, self._pos).end() == len(self._buf) and self._fill():
+            pass
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            self._pos = end
+            return value
+
+
+def iter_json_array(f, key: str = "items"):
+    """
+    流式读取JSON中的条目数组：顶层为数组，或顶层对象的key字段为数组（其他字段整体解析后丢弃）
+    :return: 生成器，产出数组中的每个元素
+    """
+    stream = _JSONStream(f)
+    if stream.peek() != "[":
+        stream.take("{")
+        while True:
+            if stream.peek() == "}":
+                return      # 没有条目数组
+            name = stream.value()
+            stream.take(":")
+            if name == key and stream.peek() == "[":
+                break
+            stream.value()
+            if stream.peek() == ",":
+                stream.take(",")
+    stream.take("[")
+    if stream.peek() == "]":
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() != ",":
+            stream.take("]")
+            return
+        stream.take(",")
+
+
+def _json_item(record) -> dict | str:
+    """把JSON条目整理为条目：Bitwarden的嵌套结构，或字段名与KeyItem/常见导出相同的扁平结构"""
+    if not isinstance(record, dict):
+        return "不是对象"
+    if "login" in record or isinstance(record.get("type"), int):
+        if record.get("type") != 1 or not isinstance(record.get("login"), dict):   # Bitwarden: 1为登录条目
+            return f"不是登录条目（type={record.get('type')}）"
+        login = record["login"]
+        uris = login.get("uris") or []
+        url = uris[0].get("uri") if uris and isinstance(uris[0], dict) else ""
+        return _make_item(url, login.get("username"), login.get("password"), record.get("notes"),
+                          record.get("name"))
+    fields = {k.lower(): v for k, v in record.items()}
+    item = _make_item(fields.get("url") or fields.get("login_uri"), fields.get("username"),
+                      fields.get("password"), fields.get("note") or fields.get("notes"),
+                      fields.get("title") or fields.get("name"))
+    if isinstance(item, dict) and isinstance(fields.get("linkurl"), str):
+        item["LinkURL"] = fields["linkurl"]
+    return item
+
+
+def iter_items(path: str, fmt: str = None):
+    """
+    按格式（或扩展名）选择读取方式，流式产出 (位置, 条目或跳过原因)
+    位置对CSV为行号，对JSON为条目序号（从1开始）
+    :param path: 导出文件，-表示标准输入（未指定格式时按JSON读取）
+    :param fmt: 格式（见FORMATS），None时按扩展名和CSV表头识别
+    """
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if fmt is not None and fmt not in FORMATS:
+        raise ValueError(f"不支持的导入格式: {fmt}")
+    if fmt:
+        is_json = fmt in JSON_FORMATS
+    else:
+        is_json = path == "-" or os.path.splitext(path)[1].lower() == ".json"
+    with (contextlib.nullcontext(sys.stdin) if path == "-"
+          else open(path, encoding="utf-8-sig", newline="")) as f:
+        if is_json:
+            for n, record in enumerate(iter_json_array(f), 1):
+                yield n, _json_item(record)
+        else:
+            yield from iter_csv(f, fmt)
+
+
+def dedupe_key(url: str, user_name: str) -> bytes:
+    """去重键：(网址, 用户名)，网址不区分大小写、忽略末尾的/；只保存摘要，占用与条目内容无关"""
+    text = f"{url.strip().lower().rstrip('/')}\0{user_name.strip()}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def import_file(book, path: str, upw: str, fmt: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                progress=None) -> dict | None:
+    """
+    导入导出文件中的条目：与密码本中已有条目及文件中前面的条目(URL, 用户名)相同的跳过，其余分块写入
+    每块调用一次add_items；整个导入共用一个授权令牌和一次派生的密钥，重写整个文件的后端只在结束时写入一次
+    中途出错时已提交的块保留（同样写入文件）
+    :param book: KeyWordNoteBook实例
+    :param path: 导出文件
+    :param upw: 二级密码，或不限次数的授权令牌
+    :param fmt: 格式（见FORMATS），None时自动识别
+    :param chunk_size: 每块条数
+    :param progress: 进度回调 progress(已读取条数, 已写入条数)
+    :return: {"read", "imported", "duplicates", "skipped": [{"at", "reason"}], "skipped_count"}，
+             验证失败返回None
+    """
+    token = upw
+    if not upw.startswith(book.TOKEN_PREFIX):
+        token = book.verify_main_key(upw, issue_token=True, uses=None, ttl=3600)
+        if token is None:
+            return None
+    seen = {dedupe_key(item.get("URL", ""), item.get("UserName", "")) for item in book.get_non_secret_items()}
+    result = {"read": 0, "imported": 0, "duplicates": 0, "skipped": [], "skipped_count": 0}
+    chunk, chunk_size = [], max(1, chunk_size)
+
+    def write_chunk():
+        results = book.add_items(chunk, token)
+        if not results:
+            raise PermissionError("授权令牌已失效，导入中止")
+        failed = [r for r in results if not r["ok"]]
+        if failed:
+            raise ValueError(f"写入失败: {failed[0]['error']}")
+        result["imported"] += len(results)
+        chunk.clear()
+        if progress:
+            progress(result["read"], result["imported"])
+
+    try:
+        with book.deferred_writes():
+            for at, item in iter_items(path, fmt):
+                result["read"] += 1
+                if isinstance(item, str):
+                    result["skipped_count"] += 1
+                    if len(result["skipped"]) < MAX_REPORTED_SKIPS:
+                        result["skipped"].append({"at": at, "reason": item})
+                    continue
+                key = dedupe_key(item["URL"], item["UserName"])
+                if key in seen:
+                    result["duplicates"] += 1
+                    continue
+                seen.add(key)
+                chunk.append(item)
+                if len(chunk) >= chunk_size:
+                    write_chunk()
+            if chunk:
+                write_chunk()
+    finally:
+        if token is not upw:
+            book.revoke_token(token)
+    print(f"导入完成：读取 {result['read']} 条，写入 {result['imported']} 条，"
+          f"重复 {result['duplicates']} 条，跳过 {result['skipped_count']} 条")
+    return result
+
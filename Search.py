@@ -0,0 +1,491 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：Search.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/17 14:05
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+非敏感字段的内存检索
+基于三元组（trigram）倒排索引，支持前缀、子串和模糊匹配，结果按相关度排序；
+按可注册域名分桶的网址索引，用于根据网址查找条目；按密码指纹分组的索引，用于找出重复使用的密码
+"""
+__version__ = "0.0.1.0"
+
+import heapq
+import ipaddress
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from urllib.parse import urlsplit
+
+# 词首（文本开头或非字母数字字符之后）的前两个字符
+_WORD_HEAD = re.compile(r"(?:^|(?<=[\W_]))(?=(.{1,2}))", re.S)
+
+
+class SearchIndex:
+    """
+    条目检索索引，分三级查找，前一级凑够limit条就不再进入下一级：
+    1. 精确/前缀：每个字段一张按文本排序的有序表，二分查找
+    2. 子串：三元组倒排表求交集后逐个核对；不足三个字符的查询先查词首前缀倒排表（词前缀匹配得分更高），
+       再取在第2个字符之后包含查询的三元组的倒排表（词中出现的位置）
+    3. 模糊：按三元组重合比例匹配，容忍拼写错误
+    子串级别最多核对MAX_SCAN个候选，几乎命中全部条目的查询（逐字输入的中间状态）耗时也有上限
+    每个条目分配一个内部文档号，倒排表保存文档号列表（比集合省内存）；
+    修改/删除只把旧文档号标记为失效，失效过多时整体重建
+    """
+    FIELDS = ("URL", "UserName", "LinkURL", "Note")     # 参与检索的字段
+    FIELD_WEIGHT = {"URL": 1.0, "UserName": 1.0, "LinkURL": 0.9, "Note": 0.8}
+    FUZZY_THRESHOLD = 0.5   # 模糊匹配所需的三元组重合比例
+    COMMON_RATIO = 0.2      # 出现在超过该比例文档中的三元组不参与模糊计数
+    MAX_SCAN = 1000         # 子串级别每次最多核对的候选数
+
+    def __init__(self):
+        self._docs: list[tuple[str, dict] | None] = []    # 文档号 -> (Index, {字段: 小写文本})，None表示失效
+        self._doc_of: dict[str, int] = {}                 # Index -> 文档号
+        self._postings: dict[str, list[int]] = {}         # 三元组 -> 文档号列表
+        self._prefixes: dict[str, list[int]] = {}         # 词首的前1~2个字符 -> 文档号列表
+        self._inner: dict[str, list[str]] = {}            # 1~2个字符 -> 从第2个字符起包含它的三元组
+        self._sorted: dict[str, list[tuple[str, int]]] = {f: [] for f in self.FIELDS}  # 字段 -> 有序表
+        self._dead = 0                                    # 失效文档数
+
+    def __len__(self):
+        return len(self._doc_of)
+
+    def build(self, items: dict):
+        """
+        用全部条目重建索引
+        :param items: {Index: KeyItem}
+        """
+        self._load([(No, self._texts(item)) for No, item in items.items()])
+
+    def update(self, put: dict = None, delete: list = None):
+        """
+        增量更新索引
+        :param put: 新增或修改的条目 {Index: KeyItem}
+        :param delete: 删除的条目Index列表
+        """
+        for No in delete or []:
+            self._remove(No)
+        for No, item in (put or {}).items():
+            self._remove(No)
+            self._add(No, self._texts(item))
+        if self._dead > 1024 and self._dead > len(self._doc_of):
+            self._compact()
+
+    def search(self, query: str, fields=None, limit: int = 50) -> list[str]:
+        """
+        检索条目
+        :param query: 查询字符串（不区分大小写）
+        :param fields: 参与匹配的字段，None表示全部FIELDS
+        :param limit: 最多返回的条数
+        :return: 按相关度从高到低排列的Index列表
+        """
+        q = self._normalize("", query.strip())
+        if not q or limit <= 0:
+            return []
+        fields = tuple(f for f in (fields or self.FIELDS) if f in self.FIELDS)
+        found: dict[int, float] = {}    # 文档号 -> 得分
+
+        # 1. 精确和前缀匹配
+        for field in fields:
+            keys = self._sorted[field]
+            i = bisect_left(keys, (q,))
+            # 有序表按字典序排列，多取一些再按得分（较短优先）筛选
+            for text, doc_id in keys[i:i + limit * 8]:
+                if not text.startswith(q):
+                    break
+                score = (1.0 if len(text) == len(q) else 0.9) * self.FIELD_WEIGHT[field] - len(text) * 1e-6
+                if score > found.get(doc_id, 0):
+                    found[doc_id] = score
+
+        # 2. 子串匹配
+        grams = self._grams(q)
+        if len(found) < limit:
+            if grams:
+                self._check(q, self._candidates(grams), fields, found)
+            else:   # 不足三个字符的查询无法使用三元组：先取词首前缀，再取词中出现的位置
+                self._check(q, self._prefixes.get(q, ()), fields, found)
+                if len(found) < limit:
+                    self._check(q, self._inner_candidates(q), fields, found)
+
+        # 3. 模糊匹配
+        if len(found) < limit and len(grams) > 1:
+            found.update(self._fuzzy(grams, fields, found, limit))
+
+        best = heapq.nlargest(limit, found.items(), key=lambda kv: (kv[1], -kv[0]))
+        return [self._docs[doc_id][0] for doc_id, _ in best]
+
+    def _load(self, docs: list):
+        """
+        用已规范化的文本重建索引
+        :param docs: [(Index, {字段: 规范化文本})]
+        """
+        self._docs, self._doc_of, self._dead = [], {}, 0
+        self._postings, self._prefixes, self._inner = {}, {}, {}
+        self._sorted = {f: [] for f in self.FIELDS}
+        for No, texts in docs:
+            self._add(No, texts, keep_sorted=False)
+        for keys in self._sorted.values():
+            keys.sort()
+
+    def _texts(self, item: dict) -> dict:
+        """条目各检索字段的规范化文本"""
+        return {f: self._normalize(f, str(item.get(f, ""))) for f in self.FIELDS}
+
+    def _add(self, No: str, texts: dict, keep_sorted: bool = True):
+        doc_id = len(self._docs)
+        self._docs.append((No, texts))
+        self._doc_of[No] = doc_id
+        grams, prefixes = set(), set()
+        for field, text in texts.items():
+            # 不足三个字符的文本整体作为一项，短查询在词中出现时也能取到候选
+            grams.update(self._grams(text) if len(text) >= 3 else (text,) if text else ())
+            prefixes.update(self._word_prefixes(text))
+            if text:
+                if keep_sorted:
+                    insort(self._sorted[field], (text, doc_id))
+                else:
+                    self._sorted[field].append((text, doc_id))
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = []
+                for inner in {gram[1:], gram[1:2], gram[2:]} - {""}:
+                    self._inner.setdefault(inner, []).append(gram)
+            postings.append(doc_id)
+        for prefix in prefixes:
+            self._prefixes.setdefault(prefix, []).append(doc_id)
+
+    def _remove(self, No: str):
+        doc_id = self._doc_of.pop(No, None)
+        if doc_id is None:
+            return
+        for field, text in self._docs[doc_id][1].items():
+            if text:
+                keys = self._sorted[field]
+                i = bisect_left(keys, (text, doc_id))
+                if i < len(keys) and keys[i] == (text, doc_id):
+                    del keys[i]
+        self._docs[doc_id] = None
+        self._dead += 1
+
+    def _compact(self):
+        """丢弃失效文档，重建倒排表（文本已规范化，不再重复处理）"""
+        self._load([(No, self._docs[doc_id][1]) for No, doc_id in self._doc_of.items()])
+
+    def _check(self, q: str, candidates, fields: tuple, found: dict):
+        """逐个核对候选文档，命中的写入found；最多核对MAX_SCAN个未评分的文档"""
+        scanned = 0
+        for doc_id in candidates:
+            doc = self._docs[doc_id]
+            if doc is None or doc_id in found:
+                continue
+            score = self._score(q, doc[1], fields)
+            if score > 0:
+                found[doc_id] = score
+            scanned += 1
+            if scanned >= self.MAX_SCAN:
+                return
+
+    def _inner_candidates(self, q: str):
+        """
+        不足三个字符的查询：依次产出q出现在文本第2个字符之后的文档，不重复
+        这样的出现总落在某个三元组的第2个字符之后（两个字符的文本本身即一项），开头的出现由前缀表负责
+        """
+        seen = set()
+        for gram in self._inner.get(q, ()):
+            for doc_id in self._postings[gram]:
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    yield doc_id
+
+    def _candidates(self, grams: set):
+        """
+        取包含全部查询三元组的文档（各倒排表的交集）
+        最短的表不长时整体求交集；否则按文档号顺序逐个在其他表中二分查找，调用方核对够MAX_SCAN个即停止，
+        不为几乎命中全部条目的查询建立完整的交集（最多走查最短表的8*MAX_SCAN项）
+        """
+        lists = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        first, rest = lists[0], lists[1:]
+        if len(first) <= self.MAX_SCAN * 4:
+            result = set(first)
+            for postings in rest:
+                if not result:
+                    break
+                if len(postings) > len(result) * 16:    # 长表不整体遍历，逐个二分查找
+                    result = {doc_id for doc_id in result if self._contains(postings, doc_id)}
+                else:
+                    result.intersection_update(postings)
+            return result
+        return self._walk_intersection(first, rest)
+
+    @staticmethod
+    def _contains(postings: list[int], doc_id: int) -> bool:
+        i = bisect_left(postings, doc_id)
+        return i < len(postings) and postings[i] == doc_id
+
+    def _walk_intersection(self, first: list[int], rest: list[list[int]]):
+        """按文档号顺序产出同时出现在first和rest各表中的文档号（倒排表按文档号升序）"""
+        starts = [0] * len(rest)
+        for doc_id in first[:self.MAX_SCAN * 8]:
+            for n, postings in enumerate(rest):
+                i = bisect_left(postings, doc_id, starts[n])
+                starts[n] = i
+                if i == len(postings) or postings[i] != doc_id:
+                    break
+            else:
+                yield doc_id
+
+    def _score(self, q: str, texts: dict, fields: tuple) -> float:
+        """精确 > 字段前缀 > 词前缀 > 子串；同分时较短的文本优先"""
+        best = 0.0
+        for field in fields:
+            text = texts[field]
+            pos = text.find(q)
+            if pos < 0:
+                continue
+            if len(text) == len(q):
+                score = 1.0
+            elif pos == 0:
+                score = 0.9
+            else:
+                score = 0.6
+                while pos > 0:      # 任一处出现在词首即算词前缀
+                    if not text[pos - 1].isalnum():
+                        score = 0.8
+                        break
+                    pos = text.find(q, pos + 1)
+            score = score * self.FIELD_WEIGHT[field] - len(text) * 1e-6
+            best = max(best, score)
+        return best
+
+    def _fuzzy(self, grams: set, fields: tuple, found: dict, limit: int) -> dict:
+        """按三元组重合比例做模糊匹配（容忍拼写错误）"""
+        live = len(self._doc_of) or 1
+        counts = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram, [])
+            if len(postings) <= live * self.COMMON_RATIO:
+                counts.update(postings)
+        need = self.FUZZY_THRESHOLD * len(grams)
+        results = {}
+        # 只核对重合最多的一部分候选
+        for doc_id, shared in counts.most_common(limit * 4):
+            if shared < need:
+                break
+            if doc_id in found or self._docs[doc_id] is None:
+                continue
+            # 计数覆盖所有字段，这里只按指定字段重新核对
+            texts = self._docs[doc_id][1]
+            best = 0.0
+            for field in fields:
+                ratio = len(grams & self._grams(texts[field])) / len(grams)
+                if ratio >= self.FUZZY_THRESHOLD:
+                    best = max(best, 0.5 * ratio * self.FIELD_WEIGHT[field])
+            if best:
+                results[doc_id] = best
+        return results
+
+    @staticmethod
+    def _normalize(field: str, text: str) -> str:
+        """小写化；网址去掉协议头和www.，便于按域名前缀匹配"""
+        text = text.lower()
+        if field in ("URL", "LinkURL", ""):
+            for prefix in ("https://", "http://"):
+                if text.startswith(prefix):
+                    text = text[len(prefix):]
+                    break
+            if text.startswith("www."):
+                text = text[4:]
+        return text
+
+    @staticmethod
+    def _word_prefixes(text: str) -> set:
+        """每个词首（文本开头和非字母数字字符之后）的前1~2个字符，供不足三个字符的查询使用"""
+        prefixes = set()
+        for head in _WORD_HEAD.findall(text):
+            prefixes.add(head[:1])
+            prefixes.add(head)
+        return prefixes
+
+    @staticmethod
+    def _grams(text: str) -> set:
+        """文本的三元组集合"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class DomainIndex:
+    """
+    网址索引：按可注册域名（如mail.google.com -> google.com）把条目分桶，查找时只看同一个桶
+    协议、www.、子域名、端口和路径不影响分桶；IP地址、localhost等无后缀主机按主机名本身分桶
+    """
+    # 常见的多级公共后缀（不引入完整的公共后缀列表），命中时可注册域名取三级
+    MULTI_PART_SUFFIXES = frozenset({
+        "com.cn", "net.cn", "org.cn", "gov.cn", "edu.cn", "ac.cn",
+        "com.hk", "com.tw", "com.sg", "com.my",
+        "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk",
+        "co.jp", "ne.jp", "or.jp", "ac.jp", "co.kr", "or.kr",
+        "com.au", "net.au", "org.au", "edu.au", "co.nz",
+        "com.br", "com.mx", "com.ar", "co.in", "co.za", "com.tr", "com.ru",
+    })
+
+    def __init__(self):
+        self._buckets: dict[str, set[str]] = {}   # 可注册域名 -> Index集合
+        self._hosts: dict[str, tuple[str, str]] = {}   # Index -> (可注册域名, 主机名)
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def build(self, items: dict):
+        """
+        用全部条目重建索引
+        :param items: {Index: KeyItem}
+        """
+        self._buckets, self._hosts = {}, {}
+        for No, item in items.items():
+            self._add(No, item)
+
+    def update(self, put: dict = None, delete: list = None):
+        """
+        增量更新索引
+        :param put: 新增或修改的条目 {Index: KeyItem}
+        :param delete: 删除的条目Index列表
+        """
+        for No in delete or []:
+            self._remove(No)
+        for No, item in (put or {}).items():
+            self._remove(No)
+            self._add(No, item)
+
+    def lookup(self, url: str) -> list[str]:
+        """
+        查找与网址属于同一可注册域名的条目
+        :param url: 任意形式的网址
+        :return: Index列表，主机名完全相同的在前，其余按Index排序
+        """
+        host = self.host(url)
+        if not host:
+            return []
+        keys = self._buckets.get(self.registrable_domain(host), ())
+        return sorted(keys, key=lambda No: (self._hosts[No][1] != host, int(No) if No.isdigit() else 0, No))
+
+    @staticmethod
+    def host(url: str) -> str:
+        """网址的主机名：小写，去掉协议、用户信息、端口、路径和开头的www."""
+        text = url.strip().lower()
+        if "://" not in text:
+            text = "//" + text      # 无协议时urlsplit会把主机名当作路径
+        try:
+            host = urlsplit(text).hostname or ""
+        except ValueError:          # 非法的IPv6写法等
+            return ""
+        host = host.rstrip(".")
+        return host[4:] if host.startswith("www.") else host
+
+    @classmethod
+    def registrable_domain(cls, host: str) -> str:
+        """主机名对应的可注册域名"""
+        if "." not in host:
+            return host
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+        labels = host.split(".")
+        if len(labels) >= 3 and ".".join(labels[-2:]) in cls.MULTI_PART_SUFFIXES:
+            return ".".join(labels[-3:])
+        return ".".join(labels[-2:])
+
+    def _add(self, No: str, item: dict):
+        host = self.host(str(item.get("URL", "")))
+        if not host:
+            return
+        domain = self.registrable_domain(host)
+        self._hosts[No] = (domain, host)
+        self._buckets.setdefault(domain, set()).add(No)
+
+    def _remove(self, No: str):
+        entry = self._hosts.pop(No, None)
+        if entry is None:
+            return
+        bucket = self._buckets[entry[0]]
+        bucket.discard(No)
+        if not bucket:
+            del self._buckets[entry[0]]
+
+
+class ReuseIndex:
+    """
+    密码指纹 -> Index 的多重映射，用于找出重复使用同一密码的条目
+    只读取条目的Fingerprint字段（密码的带密钥HMAC），不接触密码本身
+    """
+
+    def __init__(self):
+        self._groups: dict[str, set[str]] = {}     # 指纹 -> Index集合
+        self._fingerprint_of: dict[str, str] = {}  # Index -> 指纹
+
+    def __len__(self):
+        return len(self._fingerprint_of)
+
+    def build(self, items: dict):
+        """
+        用全部条目重建索引
+        :param items: {Index: KeyItem}
+        """
+        self._groups, self._fingerprint_of = {}, {}
+        for No, item in items.items():
+            self._add(No, item)
+
+    def update(self, put: dict = None, delete: list = None):
+        """
+        增量更新索引
+        :param put: 新增或修改的条目 {Index: KeyItem}
+        :param delete: 删除的条目Index列表
+        """
+        for No in delete or []:
+            self._remove(No)
+        for No, item in (put or {}).items():
+            self._remove(No)
+            self._add(No, item)
+
+    def groups(self) -> list[list[str]]:
+        """
+        使用同一密码的条目分组
+        :return: 每组至少两个Index，组内按Index排序，组按第一个Index排序
+        """
+        def order(No: str):
+            return int(No) if No.isdigit() else 0, No
+
+        result = [sorted(keys, key=order) for keys in self._groups.values() if len(keys) > 1]
+        return sorted(result, key=lambda group: order(group[0]))
+
+    def peers(self, No: str) -> set[str]:
+        """与No使用同一密码的其他条目（不含No本身）"""
+        fingerprint = self._fingerprint_of.get(No)
+        return self._groups[fingerprint] - {No} if fingerprint is not None else set()
+
+    def _add(self, No: str, item: dict):
+        fingerprint = item.get("Fingerprint")
+        if not fingerprint:
+            return
+        self._fingerprint_of[No] = fingerprint
+        self._groups.setdefault(fingerprint, set()).add(No)
+
+    def _remove(self, No: str):
+        fingerprint = self._fingerprint_of.pop(No, None)
+        if fingerprint is None:
+            return
+        group = self._groups[fingerprint]
+        group.discard(No)
+        if not group:
+            del self._groups[fingerprint]
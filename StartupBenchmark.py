@@ -0,0 +1,149 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：StartupBenchmark.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/18 01:30
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+启动耗时基准测试
+每个入口模块在全新的解释器中用 python -X importtime 导入若干次，取导入耗时的中位数与预算比较，
+并检查启动路径上不应加载的模块（加密库、SQLite等应在首次使用时才导入）
+先做一次不计时的导入生成字节码缓存，统计的是缓存已就绪时的导入耗时
+
+用法：
+    python StartupBenchmark.py                          # 全部入口，默认预算
+    python StartupBenchmark.py --budget main=300 --repeat 9
+    python StartupBenchmark.py --targets CLI,Core --json startup.json
+返回码：有入口超出预算或加载了不应加载的模块时为1；缺少依赖（如未安装PyQt5）的入口跳过
+"""
+__version__ = "0.0.1.0"
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# 加密库、线程池、SQLite和评估/检索/泄露检查模块都在首次使用时导入，启动路径上不应出现
+LAZY_MODULES = ("argon2", "cryptography", "concurrent.futures", "sqlite3", "Strength", "Search", "Breach")
+# 入口 -> (导入耗时预算（毫秒）, 不应加载的模块)
+TARGETS = {
+    "main": (400.0, LAZY_MODULES),                  # 图形界面：显示登录窗口前的全部导入（含PyQt5）
+    "CLI": (80.0, LAZY_MODULES + ("PyQt5",)),       # 命令行工具
+    "Core": (60.0, LAZY_MODULES + ("PyQt5",)),      # 核心模块本身
+}
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, str, int, int]]:
+    """解析 -X importtime 的输出：[(层级, 模块名, 自身耗时us, 累计耗时us)]，按输出顺序"""
+    records = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            records.append((len(m.group(3)) // 2, m.group(4), int(m.group(1)), int(m.group(2))))
+    return records
+
+
+def run_once(module: str) -> tuple[list, str | None]:
+    """在全新的解释器中导入module，返回(导入记录, 缺少的依赖)；其他导入错误直接抛出"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        missing = re.search(r"ModuleNotFoundError: No module named '([^']+)'", proc.stderr)
+        # 缺少的是第三方依赖时跳过；本仓库的模块缺失属于错误
+        if missing and not os.path.exists(os.path.join(ROOT, missing.group(1).split(".")[0] + ".py")):
+            return [], missing.group(1)
+        raise RuntimeError(f"导入 {module} 失败：\n{proc.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(proc.stderr), None
+
+
+def measure(module: str, repeat: int) -> dict:
+    """导入module repeat次，统计目标模块的累计导入耗时，并列出耗时最多的直接依赖"""
+    records, missing = run_once(module)     # 预热：生成字节码缓存，不计时
+    if missing:
+        return {"skipped": f"缺少依赖 {missing}"}
+    samples, runs = [], []
+    for _ in range(repeat):
+        records, _ = run_once(module)
+        # 子模块先于父模块输出：目标模块那一行之前、上一个顶层导入之后的记录都是它引入的
+        end = next(i for i, (level, name, _, _) in enumerate(records) if level == 0 and name == module)
+        start = end
+        while start > 0 and records[start - 1][0] > 0:
+            start -= 1
+        samples.append(records[end][3] / 1000)
+        runs.append(records[start:end + 1])
+    # 中位数那次运行里，目标模块的直接依赖按累计耗时排序
+    median_run = runs[sorted(range(repeat), key=samples.__getitem__)[repeat // 2]]
+    heaviest = sorted(((name, cum / 1000) for level, name, _, cum in median_run if level == 1),
+                      key=lambda x: -x[1])[:8]
+    loaded = {name for _, name, _, _ in median_run}
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "max_ms": max(samples),
+            "heaviest": heaviest, "loaded": loaded}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="启动耗时基准测试（python -X importtime）")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="要测试的入口模块，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=5, help="每个入口的计时次数")
+    parser.add_argument("--budget", action="append", default=[], metavar="入口=毫秒",
+                        help="覆盖某个入口的预算，可重复指定")
+    parser.add_argument("--json", dest="json_out", help="把结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    budgets = {name: budget for name, (budget, _) in TARGETS.items()}
+    for item in args.budget:
+        name, _, value = item.partition("=")
+        if name not in TARGETS or not value:
+            parser.error(f"无效的预算: {item}")
+        budgets[name] = float(value)
+
+    failures, results = [], {}
+    for name in (t.strip() for t in args.targets.split(",") if t.strip()):
+        if name not in TARGETS:
+            parser.error(f"未知的入口: {name}")
+        print(f"正在测试 {name}...", file=sys.stderr)
+        result = measure(name, max(1, args.repeat))
+        results[name] = result
+        if "skipped" in result:
+            print(f"\n== {name}  跳过（{result['skipped']}）")
+            continue
+        forbidden = sorted(m for m in result.pop("loaded")
+                           if any(m == lazy or m.startswith(lazy + ".") for lazy in TARGETS[name][1]))
+        result.update(budget_ms=budgets[name], forbidden=forbidden)
+        over = result["median_ms"] > budgets[name]
+        print(f"\n== {name}  中位数 {result['median_ms']:.1f}ms（最小 {result['min_ms']:.1f}ms，"
+              f"最大 {result['max_ms']:.1f}ms）  预算 {budgets[name]:.0f}ms  {'超出预算' if over else '通过'}")
+        for module, ms in result["heaviest"]:
+            print(f"    {module:<32}{ms:>10.1f}ms")
+        if over:
+            failures.append(f"{name} 导入耗时 {result['median_ms']:.1f}ms 超出预算 {budgets[name]:.0f}ms")
+        if forbidden:
+            failures.append(f"{name} 启动时加载了应延迟导入的模块: {', '.join(forbidden)}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if failures:
+        print("\n启动耗时检查未通过：")
+        for failure in failures:
+            print("  " + failure)
+        return 1
+    print("\n启动耗时检查通过")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,816 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：Storage.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/17 10:12
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+密码本存储层
+定义存储后端接口，提供JSON文件、SQLite和索引容器（mmap按需加载）三种实现，以及它们之间的迁移
+实现追加式日志（journal），变更只追加记录，不重写整个文件
+"""
+__version__ = "0.0.1.0"
+
+import base64
+import binascii
+import contextlib
+import json
+import os
+import hmac
+import hashlib
+import mmap
+import struct
+import zlib
+from collections.abc import MutableMapping
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import sqlite3      # SQLite后端在首次连接时才导入sqlite3
+
+
+def atomic_write_text(path: str, text: str):
+    """
+    原子写入文本文件：先写临时文件并落盘，再整体替换目标文件
+    写入过程中崩溃时，原文件保持完整
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JournalFile:
+    """
+    追加式日志文件
+    每行一条记录：{"base": 检查点校验值, "seq": 序号, "token": 加密后的变更, "mac": 链式HMAC}
+    - token 由调用方提供的encrypt加密（Fernet，自带认证）
+    - mac 串联上一条记录的mac，能发现记录被删除、重排或替换
+    - base 绑定记录所属的检查点，检查点更新后旧日志自动失效
+    """
+    def __init__(self, path: str, max_bytes: int = 1 << 20, max_records: int = 1000):
+        """
+        :param path: 日志文件路径
+        :param max_bytes: 日志超过该大小（字节）时需要压缩
+        :param max_records: 日志超过该记录数时需要压缩
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.records = 0        # 当前日志中的有效记录数
+        self.size = 0           # 当前日志文件大小
+        self._base = ""         # 所属检查点的校验值
+        self._prev_mac = ""     # 上一条记录的mac
+        self._encrypt = None
+        self._decrypt = None
+        self._mac_key = None
+
+    def attach(self, base: str, encrypt, decrypt, mac_key: bytes):
+        """
+        绑定检查点和加解密上下文（登录完成后调用）
+        :param base: 检查点校验值
+        :param encrypt: str->str 加密函数
+        :param decrypt: str->str 解密函数
+        :param mac_key: HMAC密钥
+        """
+        self._base = base
+        self._prev_mac = base
+        self._encrypt = encrypt
+        self._decrypt = decrypt
+        self._mac_key = mac_key
+
+    def replay(self) -> list[dict]:
+        """
+        读取并校验日志，返回属于当前检查点的变更列表
+        末尾不完整的记录（写入时崩溃）被丢弃；中间记录校验失败视为篡改
+        """
+        ops = []
+        if not os.path.exists(self.path):
+            return ops
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            lines = f.readlines()
+
+        prev_mac = self._base
+        valid_size = 0      # 有效记录的字节数，用于截掉不完整的末尾
+        for line_no, line in enumerate(lines):
+            last = line_no == len(lines) - 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if last and not line.endswith("\n"):
+                    print("日志末尾记录不完整，已丢弃")
+                    os.truncate(self.path, valid_size)
+                    break
+                raise ValueError(f"日志第{line_no + 1}行格式错误，内容可能被篡改或损坏")
+            if record.get("base") != self._base:
+                # 检查点已更新（压缩完成后尚未截断日志时崩溃），旧日志全部作废
+                print("日志不属于当前检查点，已忽略")
+                self.reset(self._base)
+                return []
+            expected = self._mac(prev_mac, record["seq"], record["token"])
+            if record.get("seq") != len(ops) or not hmac.compare_digest(expected, record.get("mac", "")):
+                raise ValueError(f"日志第{line_no + 1}行HMAC校验失败，内容可能被篡改或损坏")
+            ops.append(json.loads(self._decrypt(record["token"])))
+            prev_mac = expected
+            valid_size += len(line.encode('utf-8'))
+
+        self._prev_mac = prev_mac
+        self.records = len(ops)
+        self.size = os.path.getsize(self.path)
+        return ops
+
+    def append(self, op: dict):
+        """追加一条变更记录并落盘"""
+        token = self._encrypt(json.dumps(op, ensure_ascii=False, sort_keys=True))
+        mac = self._mac(self._prev_mac, self.records, token)
+        line = json.dumps({"base": self._base, "seq": self.records, "token": token, "mac": mac}) + "\n"
+        with open(self.path, 'a', encoding='utf-8', newline='\n') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._prev_mac = mac
+        self.records += 1
+        self.size += len(line.encode('utf-8'))
+
+    def needs_compaction(self) -> bool:
+        """日志是否超过压缩阈值"""
+        return self.records >= self.max_records or self.size >= self.max_bytes
+
+    def reset(self, base: str):
+        """检查点写入完成后截断日志，并绑定到新的检查点"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._base = base
+        self._prev_mac = base
+        self.records = 0
+        self.size = 0
+
+    def remove(self):
+        """删除日志文件"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.records = 0
+        self.size = 0
+
+    def _mac(self, prev_mac: str, seq: int, token: str) -> str:
+        """计算链式HMAC"""
+        msg = f"{prev_mac}|{self._base}|{seq}|{token}".encode('utf-8')
+        return hmac.new(self._mac_key, msg=msg, digestmod=hashlib.sha256).hexdigest()
+
+
+class RotationFile:
+    """
+    主密码修改（密钥轮换）的进度文件，轮换中途崩溃后可以续做
+    第一行为文件头：{"base": 开始时主文件的校验值, "params": 新的加密参数（新验证哈希、盐和加密后的新HMAC密钥）, "mac"}
+    之后每行一批：{"seq": 序号, "items": {Index: 新密文}, "frequent": {键: 新密文}, "mac": 链式HMAC}
+    HMAC使用新的HMAC密钥；轮换结果整体写入主文件后删除本文件
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.batches = 0        # 已记录的批次数
+        self._prev_mac = ""
+        self._mac_key = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read_header(self) -> dict | None:
+        """读取文件头（未校验），文件不存在或文件头损坏时返回None"""
+        if not self.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            line = f.readline()
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+    def begin(self, header: dict, mac_key: bytes):
+        """开始新的轮换：写入文件头"""
+        self._mac_key = mac_key
+        mac = self._mac("", 0, header)
+        atomic_write_text(self.path, json.dumps({**header, "mac": mac}, sort_keys=True) + "\n")
+        self._prev_mac = mac
+        self.batches = 0
+
+    def resume(self, mac_key: bytes) -> tuple[dict, list[dict]]:
+        """
+        校验并读取已记录的文件头和批次，末尾不完整的批次（写入时崩溃）被截掉
+        :return: (文件头, 批次列表)
+        """
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            lines = f.readlines()
+        self._mac_key = mac_key
+        records, valid_size = [], 0
+        for line_no, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if line_no == len(lines) - 1 and line_no > 0 and not line.endswith("\n"):
+                    os.truncate(self.path, valid_size)
+                    break
+                raise ValueError(f"轮换进度文件第{line_no + 1}行格式错误，内容可能被篡改或损坏")
+            mac = record.pop("mac", "")
+            expected = self._mac(records[-1][1] if records else "", line_no, record)
+            if not hmac.compare_digest(expected, mac):
+                raise ValueError(f"轮换进度文件第{line_no + 1}行HMAC校验失败，内容可能被篡改或损坏")
+            records.append((record, expected))
+            valid_size += len(line.encode('utf-8'))
+        if not records:
+            raise ValueError("轮换进度文件为空")
+        self._prev_mac = records[-1][1]
+        self.batches = len(records) - 1
+        return records[0][0], [record for record, _ in records[1:]]
+
+    def append(self, items: dict, frequent: dict = None):
+        """追加一批重新加密后的密文并落盘"""
+        record = {"seq": self.batches, "items": items, "frequent": frequent or {}}
+        mac = self._mac(self._prev_mac, self.batches + 1, record)
+        with open(self.path, 'a', encoding='utf-8', newline='\n') as f:
+            f.write(json.dumps({**record, "mac": mac}, sort_keys=True) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._prev_mac = mac
+        self.batches += 1
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.batches = 0
+
+    def _mac(self, prev_mac: str, line_no: int, record: dict) -> str:
+        """计算链式HMAC（绑定上一行的mac和行号）"""
+        msg = f"{prev_mac}|{line_no}|{json.dumps(record, sort_keys=True)}".encode('utf-8')
+        return hmac.new(self._mac_key, msg=msg, digestmod=hashlib.sha256).hexdigest()
+
+
+class VaultStorage:
+    """
+    存储后端接口
+    后端只负责保存和读取load_dict，不解密数据，也不计算完整性校验值
+    load_dict = {"ARGON2_PARAMS": dict, "ItemList": dict, "ItemMAC": dict, "FrequentlyKeys": dict}
+    """
+    incremental = False     # 是否支持只写入变更的条目（不支持时apply会重写全部数据）
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        """密码本是否已存在"""
+        raise NotImplementedError
+
+    def load(self) -> dict:
+        """读取完整的load_dict"""
+        raise NotImplementedError
+
+    def save(self, load_dict: dict):
+        """写入完整的load_dict"""
+        raise NotImplementedError
+
+    def apply(self, load_dict: dict, put: dict = None, delete: list = None):
+        """
+        写入一次变更
+        :param load_dict: 变更后的完整数据（文件头从这里读取）
+        :param put: 新增或修改的条目 {Index: KeyItem}
+        :param delete: 删除的条目Index列表
+        """
+        self.save(load_dict)
+
+    def close(self):
+        """释放后端占用的资源"""
+        pass
+
+
+class JsonStorage(VaultStorage):
+    """JSON文件后端（默认格式）：每次写入都重写整个文件"""
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> dict:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)  # json文件->dict，格式错误时抛出JSONDecodeError
+
+    def save(self, load_dict: dict):
+        atomic_write_text(self.path, json.dumps(load_dict,
+                                                sort_keys=True,
+                                                ensure_ascii=False,
+                                                indent=4,
+                                                separators=(',', ': ')))
+
+
+class SqliteStorage(VaultStorage):
+    """
+    SQLite后端：每个条目一行，密码字段保存密文
+    Index/URL/UserName/LinkURL/PasswordLevel为带索引的列，写入在事务中提交，使用WAL模式
+    修改单个条目只更新一行
+    """
+    incremental = True
+    # 有独立列的条目字段：字段名 -> 列名
+    COLUMNS = {
+        "URL": "url",
+        "UserName": "user_name",
+        "Password": "password",
+        "LinkURL": "link_url",
+        "PasswordLevel": "password_level",
+        "Note": "note",
+    }
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._conn: "sqlite3.Connection | None" = None
+
+    def exists(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        import sqlite3
+        try:
+            row = self._connect().execute(
+                "SELECT 1 FROM meta WHERE key = 'ARGON2_PARAMS'").fetchone()
+        except sqlite3.DatabaseError:
+            return True     # 文件存在但已损坏，交给load报错
+        return row is not None
+
+    def load(self) -> dict:
+        import sqlite3
+        try:
+            conn = self._connect()
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            rows = conn.execute(
+                f"SELECT idx, {', '.join(self.COLUMNS.values())}, mac, extra FROM items ORDER BY idx"
+            ).fetchall()
+        except sqlite3.DatabaseError as e:
+            raise UnicodeError(f"数据库文件损坏：{str(e)}")
+
+        item_list, item_macs = {}, {}
+        for row in rows:
+            No = str(row[0])
+            item = {"Index": No}
+            for field, value in zip(self.COLUMNS, row[1:-2]):
+                if value is not None:
+                    item[field] = value
+            if row[-1]:
+                item.update(json.loads(row[-1]))
+            item_list[No] = item
+            if row[-2] is not None:
+                item_macs[No] = row[-2]
+        return {
+            "ARGON2_PARAMS": json.loads(meta.get("ARGON2_PARAMS", "{}")),
+            "ItemList": item_list,
+            "ItemMAC": item_macs,
+            "FrequentlyKeys": json.loads(meta.get("FrequentlyKeys", "{}")),
+        }
+
+    def save(self, load_dict: dict):
+        conn = self._connect()
+        with conn:  # 事务：全部成功或全部回滚
+            conn.execute("DELETE FROM items")
+            self._write_header(conn, load_dict)
+            self._write_items(conn, load_dict, load_dict["ItemList"])
+
+    def apply(self, load_dict: dict, put: dict = None, delete: list = None):
+        conn = self._connect()
+        with conn:
+            self._write_header(conn, load_dict)
+            self._write_items(conn, load_dict, put or {})
+            conn.executemany("DELETE FROM items WHERE idx = ?", [(int(No),) for No in delete or []])
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> "sqlite3.Connection":
+        """打开数据库并建表（首次使用时）"""
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS items ("
+                    "idx INTEGER PRIMARY KEY, url TEXT, user_name TEXT, password TEXT, "
+                    "link_url TEXT, password_level INTEGER, note TEXT, mac TEXT, extra TEXT)")
+                for column in ("url", "user_name", "link_url", "password_level"):
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_items_{column} ON items ({column})")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _write_header(conn: "sqlite3.Connection", load_dict: dict):
+        """写入文件头（加密参数和常用条目）"""
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+            ("ARGON2_PARAMS", json.dumps(load_dict["ARGON2_PARAMS"], sort_keys=True)),
+            ("FrequentlyKeys", json.dumps(load_dict.get("FrequentlyKeys", {}), sort_keys=True, ensure_ascii=False)),
+        ])
+
+    def _write_items(self, conn: "sqlite3.Connection", load_dict: dict, items: dict):
+        """写入（覆盖）条目行"""
+        item_macs = load_dict.get("ItemMAC", {})
+        rows = []
+        for No, item in items.items():
+            extra = {k: v for k, v in item.items() if k != "Index" and k not in self.COLUMNS}
+            rows.append((int(No), *(item.get(field) for field in self.COLUMNS),
+                         item_macs.get(No), json.dumps(extra, ensure_ascii=False) if extra else None))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO items (idx, {', '.join(self.COLUMNS.values())}, mac, extra) "
+            f"VALUES ({', '.join('?' * (len(self.COLUMNS) + 3))})", rows)
+
+
+def _write_varint(out: bytearray, n: int):
+    """写入无符号变长整数（LEB128）"""
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos: int) -> tuple[int, int]:
+    """读取无符号变长整数，返回(值, 新位置)"""
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+class _Unloaded:
+    """尚未解码的记录在文件中的位置"""
+    __slots__ = ("offset", "length")
+
+    def __init__(self, offset: int, length: int):
+        self.offset = offset
+        self.length = length
+
+
+class LazyRecords(MutableMapping):
+    """
+    按需解码的条目映射（IndexedStorage.load返回的ItemList）
+    键来自偏移表，值在首次访问时才从映射的文件中解码；新增、修改和删除只作用于内存
+    判断键是否存在、遍历键都不会解码记录
+    修改条目需整体赋值（items[No] = 新条目）；已解码但未重新赋值的条目写入时直接复制原始记录
+    """
+
+    def __init__(self, buf, decode, version: int):
+        self._buf = buf
+        self._decode = decode       # (Index, 记录字节, 版本) -> 条目dict
+        self.version = version      # 记录编码版本
+        self._entries: dict[str, object] = {}     # Index -> 条目dict或_Unloaded
+        self._clean: dict[str, _Unloaded] = {}    # 已解码且未修改的条目 -> 原始记录的位置
+
+    def __getitem__(self, key):
+        value = self._entries[key]
+        if isinstance(value, _Unloaded):
+            self._clean[key] = value
+            value = self._decode(key, self._buf[value.offset:value.offset + value.length], self.version)
+            self._entries[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._entries[key] = value
+        self._clean.pop(key, None)
+
+    def __delitem__(self, key):
+        del self._entries[key]
+        self._clean.pop(key, None)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def raw(self, key) -> bytes | None:
+        """未修改条目的原始记录字节，新增或修改过的条目返回None"""
+        value = self._entries[key]
+        if not isinstance(value, _Unloaded):
+            value = self._clean.get(key)
+            if value is None:
+                return None
+        return self._buf[value.offset:value.offset + value.length]
+
+    def _attach(self, buf):
+        """改用同一文件的新映射（记录位置不变）"""
+        self._buf = buf
+
+    def _rebind(self, buf, positions: dict, version: int):
+        """文件重写后，把全部条目指向新文件中的记录：未解码的仍按需解码，已解码的下次写入时直接复制"""
+        self._buf = buf
+        self.version = version
+        for key, value in self._entries.items():
+            if isinstance(value, _Unloaded):
+                value.offset, value.length = positions[key]
+            else:
+                self._clean[key] = _Unloaded(*positions[key])
+
+
+class IndexedStorage(VaultStorage):
+    """
+    索引容器后端（.kwnb）：通过mmap打开，加载时只读取文件头、元数据和偏移表，
+    条目记录在被列出或查看时才解码，打开耗时与条目内容无关（仅需扫描定长的偏移表）
+    每次写入重写整个文件，未修改的记录按原始字节复制（版本不同时重新编码）
+        文件头  MAGIC(4) 版本(u16) 保留(u16) 条目数(u32) 元数据长度(u32)
+        元数据  JSON {"ARGON2_PARAMS", "FrequentlyKeys"}
+        偏移表  每个条目一项：Index(u64) 记录偏移(u64) 记录长度(u32) 条目MAC(32字节)，按Index升序
+        记录区  v1：条目的紧凑JSON
+                v2：标志(u8) 元数据块长度(varint) 元数据块 密文字段...
+                    字段 = 字段号(varint，0表示后跟字段名) 类型(u8) 长度(varint) 内容，长度均为变长整数；
+                    密文以原始字节保存（不再是JSON中的Base64字符串），非敏感字段组成的元数据块可选zlib压缩
+    """
+    MAGIC = b"KWNB"
+    VERSION = 2
+    HEADER = struct.Struct("<4sHHII")
+    ENTRY = struct.Struct("<QQI32s")
+    # v2记录
+    FIELD_IDS = {"Index": 1, "URL": 2, "UserName": 3, "Password": 4, "LinkURL": 5, "Note": 6, "PasswordLevel": 7,
+                 "Fingerprint": 8, "Breached": 9}
+    FIELD_NAMES = {v: k for k, v in FIELD_IDS.items()}
+    SECRET_FIELDS = ("Password",)           # 密文字段，不参与压缩
+    T_STR, T_INT, T_TOKEN, T_JSON = range(4)    # 字段类型：文本、整数、Fernet令牌原始字节、其他JSON值
+    FLAG_COMPRESSED = 0x01                  # 元数据块已压缩
+    FLAG_INDEX_IMPLICIT = 0x02              # Index字段与偏移表一致，未保存
+
+    def __init__(self, path: str, compress: bool = True):
+        """
+        :param compress: 写入时是否压缩非敏感字段（只在压缩后更小时生效）
+        """
+        super().__init__(path)
+        self.compress = compress
+        self._mm: mmap.mmap | None = None
+        self._items: LazyRecords | None = None     # load返回的映射，重写文件后需要重新绑定
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> dict:
+        self._unmap()
+        try:
+            self._map()
+            mm = self._mm
+            magic, version, _, count, meta_len = self.HEADER.unpack_from(mm, 0)
+            if magic != self.MAGIC:
+                raise UnicodeError("不是有效的密码本索引文件")
+            if version > self.VERSION:
+                raise UnicodeError(f"不支持的文件版本: {version}")
+            meta_start = self.HEADER.size
+            table_start = meta_start + meta_len
+            table_end = table_start + count * self.ENTRY.size
+            meta = json.loads(mm[meta_start:table_start])
+            items = LazyRecords(mm, self._decode_record, version)
+            item_macs = {}
+            for index, offset, length, mac in self.ENTRY.iter_unpack(mm[table_start:table_end]):
+                if offset < table_end or offset + length > len(mm):
+                    raise UnicodeError(f"条目 {index} 的偏移超出文件范围")
+                No = str(index)
+                items[No] = _Unloaded(offset, length)
+                item_macs[No] = mac.hex()
+        except (ValueError, struct.error) as e:    # 包含mmap空文件和JSON解码错误
+            raise UnicodeError(f"索引文件损坏：{str(e)}")
+        self._items = items
+        return {
+            "ARGON2_PARAMS": meta.get("ARGON2_PARAMS", {}),
+            "ItemList": items,
+            "ItemMAC": item_macs,
+            "FrequentlyKeys": meta.get("FrequentlyKeys", {}),
+        }
+
+    def save(self, load_dict: dict):
+        items = load_dict["ItemList"]
+        item_macs = load_dict.get("ItemMAC", {})
+        # 只有编码版本相同时才能直接复制原始记录
+        lazy = items if isinstance(items, LazyRecords) and items.version == self.VERSION else None
+        meta = json.dumps({"ARGON2_PARAMS": load_dict["ARGON2_PARAMS"],
+                           "FrequentlyKeys": load_dict.get("FrequentlyKeys", {})},
+                          sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        records = []
+        for No in sorted(items, key=int):
+            blob = lazy.raw(No) if lazy is not None else None
+            records.append((No, blob if blob is not None else self._encode_record(No, items[No])))
+
+        offset = self.HEADER.size + len(meta) + len(records) * self.ENTRY.size
+        table = bytearray()
+        positions = {}
+        for No, blob in records:
+            mac = bytes.fromhex(item_macs[No]) if No in item_macs else bytes(32)
+            table += self.ENTRY.pack(int(No), offset, len(blob), mac)
+            positions[No] = (offset, len(blob))
+            offset += len(blob)
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, 0, len(records), len(meta)))
+                f.write(meta)
+                f.write(table)
+                for _, blob in records:
+                    f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.name == "nt":     # Windows下被映射的文件不能替换，先解除映射；未解码的记录已复制到新文件
+                self._unmap()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            # 旧文件仍在原处：保持（或恢复）旧的映射，未解码的记录照常可读
+            if self._mm is None and self._items is not None:
+                self._map()
+                self._items._attach(self._mm)
+            raise
+        # 新文件映射好并改指之后再释放旧映射
+        old, self._mm = self._mm, None
+        self._map()
+        if items is self._items:
+            items._rebind(self._mm, positions, self.VERSION)
+        else:
+            self._items = None
+        if old is not None:
+            old.close()
+
+    def close(self):
+        self._unmap()
+        self._items = None
+
+    def _map(self):
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _encode_record(self, No: str, item: dict) -> bytes:
+        """把条目编码为v2记录"""
+        flags = 0
+        meta, secret = bytearray(), bytearray()
+        for field, value in item.items():
+            if field == "Index" and value == No:
+                flags |= self.FLAG_INDEX_IMPLICIT
+                continue
+            self._encode_field(secret if field in self.SECRET_FIELDS else meta, field, value)
+        if self.compress and meta:
+            compressed = zlib.compress(meta, 6)
+            if len(compressed) < len(meta):
+                meta = compressed
+                flags |= self.FLAG_COMPRESSED
+        out = bytearray((flags,))
+        _write_varint(out, len(meta))
+        return bytes(out + meta + secret)
+
+    def _encode_field(self, out: bytearray, field: str, value):
+        field_id = self.FIELD_IDS.get(field, 0)
+        _write_varint(out, field_id)
+        if not field_id:
+            name = field.encode('utf-8')
+            _write_varint(out, len(name))
+            out += name
+        kind, payload = self.T_JSON, None
+        if type(value) is str:
+            kind, payload = self.T_STR, value.encode('utf-8')
+            if field in self.SECRET_FIELDS:
+                try:    # Fernet令牌是URL安全的Base64，能无损还原时保存原始字节
+                    raw = base64.urlsafe_b64decode(value)
+                    if base64.urlsafe_b64encode(raw).decode('ascii') == value:
+                        kind, payload = self.T_TOKEN, raw
+                except (binascii.Error, ValueError):
+                    pass
+        elif type(value) is int:
+            kind, payload = self.T_INT, str(value).encode('ascii')
+        if kind == self.T_JSON:
+            payload = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        out.append(kind)
+        _write_varint(out, len(payload))
+        out += payload
+
+    def _decode_record(self, No: str, blob: bytes, version: int) -> dict:
+        """按记录版本解码条目"""
+        try:
+            if version == 1:
+                return json.loads(blob)
+            flags = blob[0]
+            meta_len, pos = _read_varint(blob, 1)
+            meta = blob[pos:pos + meta_len]
+            if flags & self.FLAG_COMPRESSED:
+                meta = zlib.decompress(meta)
+            item = {"Index": No} if flags & self.FLAG_INDEX_IMPLICIT else {}
+            self._decode_fields(meta, item)
+            self._decode_fields(blob[pos + meta_len:], item)
+            return item
+        except (IndexError, KeyError, ValueError, zlib.error) as e:
+            raise UnicodeError(f"条目 {No} 的记录损坏：{str(e)}")
+
+    def _decode_fields(self, buf: bytes, item: dict):
+        pos = 0
+        while pos < len(buf):
+            field_id, pos = _read_varint(buf, pos)
+            if field_id:
+                field = self.FIELD_NAMES[field_id]
+            else:
+                name_len, pos = _read_varint(buf, pos)
+                field = buf[pos:pos + name_len].decode('utf-8')
+                pos += name_len
+            kind = buf[pos]
+            length, pos = _read_varint(buf, pos + 1)
+            payload = buf[pos:pos + length]
+            pos += length
+            if kind == self.T_STR:
+                item[field] = payload.decode('utf-8')
+            elif kind == self.T_INT:
+                item[field] = int(payload)
+            elif kind == self.T_TOKEN:
+                item[field] = base64.urlsafe_b64encode(payload).decode('ascii')
+            else:
+                item[field] = json.loads(payload)
+
+
+# 后端类型 -> 实现类
+STORAGE_TYPES = {
+    "json": JsonStorage,
+    "sqlite": SqliteStorage,
+    "indexed": IndexedStorage,
+}
+# 文件扩展名 -> 后端类型
+STORAGE_EXTENSIONS = {
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".kwnb": "indexed",
+}
+
+
+def open_storage(path: str, kind: str = None) -> VaultStorage:
+    """
+    按类型或文件扩展名创建存储后端
+    :param path: 密码本文件路径
+    :param kind: 后端类型（"json"/"sqlite"/"indexed"），None时按扩展名选择，未知扩展名使用JSON
+    """
+    if kind is None:
+        kind = STORAGE_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "json")
+    if kind not in STORAGE_TYPES:
+        raise ValueError(f"不支持的存储类型: {kind}")
+    return STORAGE_TYPES[kind](path)
+
+
+def migrate(src_path: str, dst_path: str, src_kind: str = None, dst_kind: str = None):
+    """
+    在存储格式之间迁移密码本
+    只复制密文和校验值，不需要主密码；完整性校验值与存储格式无关，迁移后仍然有效
+    :param src_path: 源文件
+    :param dst_path: 目标文件（必须不存在）
+    :param src_kind: 源后端类型，None时按扩展名选择
+    :param dst_kind: 目标后端类型，None时按扩展名选择
+    """
+    if os.path.exists(dst_path):
+        raise FileExistsError(f"目标文件已存在: {dst_path}")
+    journal_path = src_path + ".journal"
+    if os.path.exists(journal_path) and os.path.getsize(journal_path) > 0:
+        raise RuntimeError("源文件还有未合并的日志，请先正常打开一次密码本")
+    src = open_storage(src_path, src_kind)
+    dst = open_storage(dst_path, dst_kind)
+    try:
+        if not src.exists():
+            raise FileNotFoundError(f"源文件不存在: {src_path}")
+        load_dict = src.load()
+        if "merkle_root" not in load_dict.get("ARGON2_PARAMS", {}):
+            raise RuntimeError("源文件为旧格式，请先用当前版本打开一次以完成升级")
+        load_dict["ItemList"] = dict(load_dict["ItemList"])     # 索引容器按需加载，这里全部解码
+        dst.save(load_dict)
+    finally:
+        src.close()
+        dst.close()
+    print(f"已迁移 {len(load_dict['ItemList'])} 条条目: {src_path} -> {dst_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="密码本存储工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = sub.add_parser("migrate", help="在JSON、SQLite和索引容器格式之间迁移密码本")
+    migrate_parser.add_argument("src", help="源文件")
+    migrate_parser.add_argument("dst", help="目标文件")
+    migrate_parser.add_argument("--from", dest="src_kind", choices=STORAGE_TYPES, help="源格式（默认按扩展名）")
+    migrate_parser.add_argument("--to", dest="dst_kind", choices=STORAGE_TYPES, help="目标格式（默认按扩展名）")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate(args.src, args.dst, args.src_kind, args.dst_kind)
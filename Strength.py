@@ -0,0 +1,236 @@
+# Copyright (c) 2025 Y.MF. All rights reserved.
+#
+# 本代码及相关文档受著作权法保护，未经授权，禁止任何形式的复制、分发、修改或商业使用。
+# 如需使用或修改本代码，请联系版权所有者获得书面许可（联系方式：1428483061@qq.com）。
+#
+# 免责声明：本代码按"原样"提供，不提供任何明示或暗示的担保，包括但不限于对适销性、特定用途适用性的担保。
+# 在任何情况下，版权所有者不对因使用本代码或本代码的衍生作品而导致的任何直接或间接损失承担责任。
+#
+# 项目名称：Strength.py
+# 项目仓库：https://github.com/YiMuFeng/KeyWordNoteBook.git
+# 创建时间：2026/10/17 21:40
+# 版权所有者：Y.MF
+# 联系方式：1428483061@qq.com
+# 许可协议：Apache License 2.0
+
+"""
+密码强度评估（0-5级）
+在长度和字符多样性评分的基础上，识别常见密码词典、键盘路径、连续/重复字符和日期，
+这些模式覆盖密码的大部分时降低等级。所有模式在导入时预编译；
+批量评估时把整批密码用\0连接成一个字符串，每种模式只扫描一次，逐字符的工作都在C层完成
+"""
+__version__ = "0.0.1.0"
+
+import operator
+import re
+import sys
+from bisect import bisect_right
+from itertools import repeat
+
+STRENGTH_VERSION = 2    # 评估算法版本，记录在文件头中，版本变化后重新评估全部条目
+
+# 常见密码和词语（小写，至少4个字符），做leet归一化后构建为字典树，再转成正则
+COMMON_PASSWORDS = (
+    "password", "passwd", "passport", "admin", "administrator", "root", "user", "login", "welcome",
+    "qwerty", "qwertyuiop", "asdfgh", "zxcvbn", "qazwsx", "1qaz2wsx", "abc123", "abcd1234",
+    "iloveyou", "letmein", "trustno1", "monkey", "dragon", "master", "shadow", "sunshine",
+    "princess", "football", "baseball", "basketball", "soccer", "superman", "batman", "starwars",
+    "michael", "jennifer", "jordan", "charlie", "hunter", "killer", "freedom", "whatever",
+    "computer", "internet", "google", "secret", "summer", "winter", "spring", "autumn",
+    "flower", "angel", "baby", "lover", "love", "family", "forever", "mustang", "access",
+    "cheese", "cookie", "banana", "orange", "apple", "chocolate", "pepper", "ginger", "hello",
+    "world", "test", "guest", "default", "changeme", "temp", "pass", "code", "server",
+    "woaini", "nihao", "aini", "baobao", "laopo", "laogong", "wangyi", "tiancai", "zhang",
+    "wang", "china", "beijing", "shanghai", "qq123",
+    "123456", "1234567", "12345678", "123456789", "1234567890", "123123", "654321", "111111",
+    "000000", "666666", "888888", "112233", "121212", "123321", "147258", "159753", "741852",
+    "520520", "5201314", "1314520", "7758521",
+)
+
+# 键盘行（不按Shift），x为每行第一个键的水平位置，键宽为1
+KEYBOARD_ROWS = (
+    ("`1234567890-=", 0.0),
+    ("qwertyuiop[]\\", 1.5),
+    ("asdfghjkl;'", 1.75),
+    ("zxcvbnm,./", 2.25),
+)
+SHIFTED = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+LEET = str.maketrans({"@": "a", "4": "a", "3": "e", "1": "i", "!": "i", "0": "o",
+                      "$": "s", "5": "s", "7": "t", "+": "t"})
+
+MIN_PATTERN = 4         # 连续、键盘路径等模式的最短长度
+WALK, ASCENDING, DESCENDING = 1, 2, 4   # 相邻两个字符的关系编码，按位组合
+SEQUENCE_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+_LOWER = re.compile(r"[a-z]")
+_UPPER = re.compile(r"[A-Z]")
+_DIGIT = re.compile(r"\d")
+_SPECIAL = re.compile(r"[^a-zA-Z0-9]")
+# 重复（aaa、ababab、abcabcabc，每种周期一个正则比合在一起快）和日期/年份（19900101、1988），
+# [^\0]保证匹配不跨越两个密码
+_REPEATS_AND_DATES = [re.compile(r"([^\0]{%d})\1\1+" % width) for width in (1, 2, 3)] + [
+    re.compile(r"(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])|(?:19[5-9]|20[0-3])\d")]
+# 在关系编码串上查找：连续MIN_PATTERN-1对相邻字符属于同一种关系
+_RUNS = [re.compile(b"[" + bytes(c for c in range(8) if c & code) + b"]{%d,}" % (MIN_PATTERN - 1))
+         for code in (WALK, ASCENDING, DESCENDING)]
+
+
+def _build_trie(words) -> dict:
+    """构建字典树：{字符: 子树}，""键表示单词结束"""
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return root
+
+
+def _trie_pattern(node: dict) -> str:
+    """把字典树转成正则：共享前缀只出现一次，贪婪匹配取最长的词"""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return "(?:" + body + ")?" if "" in node else body
+
+
+def _build_neighbors() -> dict:
+    """键盘上相邻的键（同一行左右相邻，或相邻行水平距离不超过0.75个键），按Shift的字符与原键等同"""
+    positions = {}
+    for row, (keys, offset) in enumerate(KEYBOARD_ROWS):
+        for col, key in enumerate(keys):
+            positions[key] = (row, offset + col)
+    neighbors: dict[str, set] = {key: set() for key in positions}
+    for a, (ra, xa) in positions.items():
+        for b, (rb, xb) in positions.items():
+            if (ra == rb and abs(xa - xb) == 1) or (abs(ra - rb) == 1 and abs(xa - xb) <= 0.75):
+                neighbors[a].add(b)
+    for shifted, base in SHIFTED.items():
+        neighbors[shifted] = neighbors[base]
+    return {key: keys | {k for k, b in SHIFTED.items() if b in keys} for key, keys in neighbors.items()}
+
+
+def _build_pair_codes() -> dict:
+    """相邻两个字符 -> 关系编码（键盘相邻、升序、降序），只收录存在关系的字符对"""
+    codes = {}
+    for key, neighbors in _build_neighbors().items():
+        for neighbor in neighbors:
+            codes[key + neighbor] = WALK
+    for a, b in zip(SEQUENCE_CHARS, SEQUENCE_CHARS[1:]):
+        codes[a + b] = codes.get(a + b, 0) | ASCENDING
+        codes[b + a] = codes.get(b + a, 0) | DESCENDING
+    return codes
+
+
+def _build_pair_table(codes: dict) -> bytes:
+    """ASCII字符对按本机字节序视为16位整数 -> 关系编码的查找表"""
+    table = bytearray(1 << 16)
+    for pair, code in codes.items():
+        table[int.from_bytes(pair.encode("ascii"), sys.byteorder)] = code
+    return bytes(table)
+
+
+# 词典和待查文本都做leet归一化（p@ssw0rd与password归一化后相同），一遍扫描即可识别变形
+_DICTIONARY = re.compile(_trie_pattern(_build_trie(word.translate(LEET) for word in COMMON_PASSWORDS)))
+_PAIR_CODES = _build_pair_codes()
+_PAIR_TABLE = _build_pair_table(_PAIR_CODES)
+
+
+def _encode_pairs(text: str) -> bytes:
+    """每对相邻字符的关系编码（含\0的字符对不在表中，编码为0）"""
+    n = len(text) - 1   # 字符对个数
+    if n <= 0:
+        return b""
+    if not text.isascii():
+        return bytes(map(_PAIR_CODES.get, map(operator.add, text, text[1:]), repeat(0)))
+    # ASCII文本按两字节一组转成16位整数直接查表，偶数和奇数位置开头的字符对各查一遍
+    data = text.encode("ascii")
+    codes = bytearray(n)
+    for start in (0, 1):
+        count = (n - start + 1) // 2
+        codes[start::2] = bytes(map(_PAIR_TABLE.__getitem__, memoryview(data[start:start + 2 * count]).cast("H")))
+    return bytes(codes)
+
+
+def _pattern_coverage(texts: list[str]) -> tuple[list[int], list[bool], list[bool]]:
+    """
+    找出每个密码中被常见模式覆盖的位置
+    :param texts: 小写的密码列表（不含\0）
+    :return: (覆盖位置（按位保存）, 是否含常见密码词, 整个密码是否就是一个常见密码)
+    """
+    n = len(texts)
+    covered, has_word, whole = [0] * n, [False] * n, [False] * n
+    joined = "\0".join(texts)
+    starts, pos = [], 0
+    for text in texts:
+        starts.append(pos)
+        pos += len(text) + 1
+
+    def mark(start: int, end: int) -> int:
+        i = bisect_right(starts, start) - 1
+        covered[i] |= (1 << (end - starts[i])) - (1 << (start - starts[i]))
+        return i
+
+    # 1. 常见密码词（含leet变形），词中不含\0，匹配不会跨越两个密码
+    for m in _DICTIONARY.finditer(joined.translate(LEET)):
+        i = mark(m.start(), m.end())
+        has_word[i] = True
+        whole[i] = whole[i] or (m.start() == starts[i] and m.end() - m.start() == len(texts[i]))
+    # 2. 重复和日期
+    for pattern in _REPEATS_AND_DATES:
+        for m in pattern.finditer(joined):
+            mark(m.start(), m.end())
+    # 3. 键盘路径和顺序：每对相邻字符编码成一个字节，在编码串上找连续的同类关系
+    codes = _encode_pairs(joined)
+    for run in _RUNS:
+        for m in run.finditer(codes):
+            mark(m.start(), m.end() + 1)
+    return covered, has_word, whole
+
+
+def password_level(key: str) -> int:
+    """
+    估计密码强度（0-5级，数字越大越安全）
+    :param key: 待评估的密码字符串
+    :return: 强度等级（0-5）
+    """
+    return score_all([key])[0]
+
+
+def score_all(keys) -> list[int]:
+    """
+    批量评估密码强度，结果与输入顺序一致；同一批中重复的密码只评估一次
+    :param keys: 密码字符串的可迭代对象
+    :return: 强度等级（0-5）列表，空密码和非字符串为0级
+    """
+    keys = list(keys)
+    unique = [key for key in dict.fromkeys(k for k in keys if isinstance(k, str)) if key]
+    # 密码中的\0换成另一个控制字符，保证连接后只有分隔符是\0
+    covered, has_word, whole = _pattern_coverage([key.lower().replace("\0", "\1") for key in unique])
+    levels = {}
+    for i, key in enumerate(unique):
+        length = len(key)
+        # 1. 长度（0-3分）
+        score = 3 if length >= 16 else 2 if length >= 12 else 1 if length >= 8 else 0
+        # 2. 字符类型多样性（0-4分）
+        score += ((_LOWER.search(key) is not None) + (_UPPER.search(key) is not None)
+                  + (_DIGIT.search(key) is not None) + (_SPECIAL.search(key) is not None))
+        # 3. 不是纯数字或纯字母（1分）
+        if not (key.isdigit() or key.isalpha()):
+            score += 1
+        # 4. 不含常见密码词（1分）；词典、键盘路径、顺序、重复、日期等模式覆盖不到1/4（1分）
+        ratio = covered[i].bit_count() / length
+        if not has_word[i]:
+            score += 1
+        if ratio < 0.25:
+            score += 1
+
+        # 映射分数到0-5级（总分最高10分）；模式覆盖大部分密码时封顶
+        level = min(5, score // 2)
+        if whole[i] or ratio >= 0.8:
+            level = min(level, 1)
+        elif ratio >= 0.5:
+            level = min(level, 2)
+        levels[key] = level
+    return [levels.get(key, 0) if isinstance(key, str) else 0 for key in keys]
@@ -21,10 +21,12 @@ __version__ = "0.0.1.1"
 import sys
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
-    QDialog, QFormLayout,  QHeaderView, )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont,QCursor
+    QLabel, QLineEdit, QPushButton, QTableView, QAbstractItemView,
+    QDialog, QFormLayout,  QHeaderView, QStyledItemDelegate, QProgressBar, QFileDialog, )
+from PyQt5.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QRect, QEvent, pyqtSignal,
+    QObject, QRunnable, QThreadPool, )
+from PyQt5.QtGui import QFont,QCursor,QColor,QPainter
 
 from Core import KeyWordNoteBook,KeyItem
 
@@ -128,6 +130,102 @@ class ConfirmDialog(QDialog):
         main_layout.addLayout(btn_layout)
         self.setLayout(main_layout)
 
+class WorkerSignals(QObject):
+    """工作线程的结果信号（QRunnable不是QObject，不能直接定义信号）"""
+    finished = pyqtSignal(object)   # 任务返回值
+    failed = pyqtSignal(object)     # 任务抛出的异常
+
+class Worker(QRunnable):
+    """
+    在线程池中执行的任务
+    Argon2计算无法中途打断，取消只是丢弃结果：设置cancelled后不再发出信号
+    """
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.cancelled = False
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(e)
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(result)
+
+class BusyDialog(QDialog):
+    """
+    忙碌提示对话框：把耗时任务交给线程池执行，期间显示进度动画，界面保持响应
+    用法：busy = BusyDialog(parent, "正在验证..."); if busy.run(fn, *args): 使用busy.result
+    """
+    def __init__(self, parent=None, msg="正在处理，请稍候...", cancellable=True):
+        """
+        :param msg: 提示信息
+        :param cancellable: 是否允许取消（写入类任务不应取消，否则界面与文件状态不一致）
+        """
+        super().__init__(parent, Qt.FramelessWindowHint | Qt.Dialog)
+        self.setWindowModality(Qt.ApplicationModal)
+        self.setFixedSize(300, 150)
+        self.result = None      # 任务返回值
+        self.error = None       # 任务抛出的异常
+        self._worker = None
+        self._cancellable = cancellable
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        label = QLabel(msg)        # 提示文本
+        label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(label)
+
+        progress = QProgressBar()   # 范围为0时显示为忙碌动画
+        progress.setRange(0, 0)
+        progress.setTextVisible(False)
+        layout.addWidget(progress)
+
+        if cancellable:
+            cancel_btn = QPushButton("取消")
+            cancel_btn.setFixedSize(120, 32)
+            cancel_btn.clicked.connect(self.reject)
+            layout.addWidget(cancel_btn, alignment=Qt.AlignCenter)
+        self.setLayout(layout)
+
+    def run(self, fn, *args, **kwargs) -> bool:
+        """
+        执行任务并等待结束
+        :return: 任务完成返回True（结果在self.result中），用户取消返回False；任务异常时重新抛出
+        """
+        self._worker = Worker(fn, *args, **kwargs)
+        self._worker.signals.finished.connect(self._on_finished)
+        self._worker.signals.failed.connect(self._on_failed)
+        QThreadPool.globalInstance().start(self._worker)
+        if self.exec_() != QDialog.Accepted:
+            self._worker.cancelled = True
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+    def keyPressEvent(self, event):
+        """不可取消时屏蔽Esc"""
+        if event.key() == Qt.Key_Escape and not self._cancellable:
+            return
+        super().keyPressEvent(event)
+
+    def _on_finished(self, result):
+        self.result = result
+        self.accept()
+
+    def _on_failed(self, error):
+        self.error = error
+        self.accept()
+
 class LoginDialog(QDialog):
     """
     登录对话框：程序启动时验证登录
@@ -468,9 +566,248 @@ class ItemEditDialog(QDialog):
         """鼠标释放时停止拖动"""
         self.dragging = False
 
+ACTION_ROLE = Qt.UserRole + 1   # 单元格是否为按钮区："row"=条目操作按钮，"add"=添加按钮
+
+class ItemTableModel(QAbstractTableModel):
+    """
+    条目表格模型：只保存非敏感条目列表，视图按需取数据，只有可见行会被绘制
+    最后一行是放置"添加"按钮的空行
+    """
+    COLUMNS = ["条目ID", "URL", "用户名", "密码","关联地址","密码等级", "备注","操作",]  # 列定义
+    FIELDS = ["Index", "URL", "UserName", None, "LinkURL", "PasswordLevel", "Note", None]  # 列对应的条目字段
+    MASK = "  ********  "
+    REUSED_COLOR = QColor("#e74c3c")    # 重复使用或已泄露的密码，密码等级列标红
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: list[dict] = []
+        self._revealed: tuple[int, str] | None = None   # (行, 明文密码)，同时最多显示一行
+        self._reused: set[str] = set()                  # 密码与其他条目重复的条目ID
+        self._row_of: dict[str, int] | None = None      # 条目ID -> 行号，删除行后失效，用到时重建
+
+    def set_items(self, items: list[dict]):
+        """整体替换条目列表"""
+        self.beginResetModel()
+        self._items = items
+        self._revealed = None
+        self._row_of = None
+        self.endResetModel()
+
+    def item_count(self) -> int:
+        """条目数（不含添加行）"""
+        return len(self._items)
+
+    def item_id(self, row: int) -> str:
+        """指定行的条目ID"""
+        return self._items[row]["Index"]
+
+    def item_at(self, row: int) -> dict:
+        """指定行的非敏感条目"""
+        return self._items[row]
+
+    def row_of(self, item_id: str) -> int:
+        """条目ID所在的行，不存在时返回-1"""
+        if self._row_of is None:
+            self._row_of = {item["Index"]: row for row, item in enumerate(self._items)}
+        return self._row_of.get(item_id, -1)
+
+    def insert_item(self, item: dict) -> int:
+        """在添加行之前追加一条条目，返回新行号"""
+        row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._items.append(item)
+        if self._row_of is not None:
+            self._row_of[item["Index"]] = row
+        self.endInsertRows()
+        return row
+
+    def update_item(self, row: int, item: dict):
+        """替换指定行的条目并刷新该行"""
+        self._items[row] = item
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1), [Qt.DisplayRole])
+
+    def remove_item(self, row: int):
+        """删除指定行，显示中的密码行号随之调整"""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._reused.discard(self._items[row]["Index"])
+        del self._items[row]
+        self._row_of = None     # 之后的行号都变了
+        if self._revealed is not None:
+            if self._revealed[0] == row:
+                self._revealed = None
+            elif self._revealed[0] > row:
+                self._revealed = (self._revealed[0] - 1, self._revealed[1])
+        self.endRemoveRows()
+
+    def set_reused(self, ids: set[str]):
+        """整体替换密码重复的条目（加载时使用），只刷新密码等级列"""
+        self._reused = ids
+        if self._items:
+            self.dataChanged.emit(self.index(0, 5), self.index(len(self._items) - 1, 5),
+                                  [Qt.DisplayRole, Qt.ForegroundRole, Qt.ToolTipRole])
+
+    def update_reused(self, changes: dict[str, bool]):
+        """
+        修改部分条目的重复标记，只刷新标记有变化的单元格
+        :param changes: {条目ID: 是否重复}
+        """
+        for item_id, reused in changes.items():
+            if reused == (item_id in self._reused):
+                continue
+            if reused:
+                self._reused.add(item_id)
+            else:
+                self._reused.discard(item_id)
+            row = self.row_of(item_id)
+            if row >= 0:
+                cell = self.index(row, 5)
+                self.dataChanged.emit(cell, cell, [Qt.DisplayRole, Qt.ForegroundRole, Qt.ToolTipRole])
+
+    def revealed_row(self) -> int:
+        """当前显示密码的行，-1表示无"""
+        return -1 if self._revealed is None else self._revealed[0]
+
+    def reveal_password(self, row: int, password: str):
+        """在指定行显示明文密码"""
+        self._revealed = (row, password)
+        cell = self.index(row, 3)
+        self.dataChanged.emit(cell, cell, [Qt.DisplayRole])
+
+    def hide_password(self):
+        """恢复显示星号"""
+        if self._revealed is not None:
+            row = self._revealed[0]
+            self._revealed = None
+            cell = self.index(row, 3)
+            self.dataChanged.emit(cell, cell, [Qt.DisplayRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items) + 1
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if row == len(self._items):     # 添加行
+            if role == ACTION_ROLE and col == 1:
+                return "add"
+            return None
+        if role == ACTION_ROLE:
+            return "row" if col == 7 else None
+        if role == Qt.DisplayRole:
+            if col == 3:
+                if self._revealed is not None and self._revealed[0] == row:
+                    return self._revealed[1]
+                return self.MASK
+            field = self.FIELDS[col]
+            if col == 5 and (warnings := self._level_warnings(row)):
+                return " ".join([str(self._items[row].get(field, ""))] + [text for text, _ in warnings])
+            return str(self._items[row].get(field, "")) if field else None
+        if col == 5 and (warnings := self._level_warnings(row)):
+            if role == Qt.ForegroundRole:
+                return self.REUSED_COLOR
+            if role == Qt.ToolTipRole:
+                return "\n".join(tip for _, tip in warnings)
+        return None
+
+    def _level_warnings(self, row: int) -> list[tuple[str, str]]:
+        """密码等级列附加的警告：[(标记, 提示)]"""
+        item = self._items[row]
+        warnings = []
+        if item.get("Breached"):
+            warnings.append(("泄露", "该密码出现在泄露密码库中，请尽快修改"))
+        if item["Index"] in self._reused:
+            warnings.append(("重复", "该密码与其他条目重复使用"))
+        return warnings
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """
+    操作按钮委托：直接绘制按钮并处理点击，不为每行创建按钮控件
+    clicked(行, 动作)，动作为 show/edit/delete/add/import
+    """
+    clicked = pyqtSignal(int, str)
+    # (动作, 文本, 常态色, 悬停色, 按下色)
+    ROW_BUTTONS = (("show", "显示", "#555555", "#666666", "#444444"),
+                   ("edit", "修改", "#4da6ff", "#398ae5", "#2a6dbb"),
+                   ("delete", "删除", "#e74c3c", "#c0392b", "#a52a1d"))
+    ADD_BUTTONS = (("add", "添加", "#4da6ff", "#398ae5", "#2a6dbb"),
+                   ("import", "导入", "#555555", "#666666", "#444444"))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hover: tuple[int, str] | None = None      # 鼠标悬停的按钮 (行, 动作)
+        self._pressed: tuple[int, str] | None = None    # 按下的按钮 (行, 动作)
+
+    def _buttons(self, rect: QRect, index) -> list:
+        """计算单元格内各按钮的位置：[(QRect, 按钮定义), ...]"""
+        kind = index.data(ACTION_ROLE)
+        if kind == "row":
+            specs, width, height = self.ROW_BUTTONS, 55, 30
+        elif kind == "add":
+            specs, width, height = self.ADD_BUTTONS, 80, 30
+        else:
+            return []
+        spacing = 5
+        total = len(specs) * width + (len(specs) - 1) * spacing
+        x = rect.x() + (rect.width() - total) // 2
+        y = rect.y() + (rect.height() - height) // 2
+        return [(QRect(x + i * (width + spacing), y, width, height), spec) for i, spec in enumerate(specs)]
+
+    def paint(self, painter, option, index):
+        buttons = self._buttons(option.rect, index)
+        if not buttons:
+            super().paint(painter, option, index)
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        for rect, (action, text, normal, hover, pressed) in buttons:
+            key = (index.row(), action)
+            color = pressed if self._pressed == key else hover if self._hover == key else normal
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(color))
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(QColor("#ffffff"))
+            painter.drawText(rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        buttons = self._buttons(option.rect, index)
+        if not buttons or event.type() not in (QEvent.MouseMove, QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            return super().editorEvent(event, model, option, index)
+        hit = next((spec[0] for rect, spec in buttons if rect.contains(event.pos())), None)
+        key = (index.row(), hit) if hit else None
+        view = self.parent()
+        if event.type() == QEvent.MouseMove:
+            if key != self._hover:
+                self._hover = key
+                view.viewport().update(option.rect)
+            return False
+        if event.type() == QEvent.MouseButtonPress:
+            if key is None or event.button() != Qt.LeftButton:
+                return False
+            self._pressed = key
+            view.viewport().update(option.rect)
+            return True
+        # 鼠标释放：在同一个按钮上按下并释放才算点击
+        pressed, self._pressed = self._pressed, None
+        view.viewport().update(option.rect)
+        if key is not None and key == pressed:
+            self.clicked.emit(index.row(), hit)
+            return True
+        return False
+
 class MainWindow(QMainWindow):
     """密码本主窗口：程序的核心交互界面，整合所有功能入口"""
     # todo：实现自定义标题栏
+    TOKEN_TTL = 300     # 二次验证令牌有效期（秒），需覆盖用户填写编辑对话框的时间
     def __init__(self, password_book: KeyWordNoteBook):
         super().__init__()
         # -------------------------- 核心依赖初始化 --------------------------
@@ -478,8 +815,8 @@ class MainWindow(QMainWindow):
         self.shown_password_row = -1    # 记录当前显示密码的行索引（-1表示无密码显示）
 
         self.item_table = None  # 主内容表单
+        self.item_model = None  # 表格数据模型
         self.status_bar = None  # 状态栏
-        self.table_columns = ["条目ID", "URL", "用户名", "密码","关联地址","密码等级", "备注","操作",]  # 列定义
 
         self.window_width = 1200  # 目标窗口宽度
         self.window_height = 800  # 目标窗口高度
@@ -501,12 +838,12 @@ class MainWindow(QMainWindow):
                         close_btn:QPushButton
                 content_widget:QWidget()
                     content_layout:QVBoxLayout
-                        item_table:QTableWidget()
+                        item_table:QTableView()
                         status_bar:self.statusBar()
         当前布局
         central_widget:QWidget()
             main_layout:QVBoxLayout垂直布局
-                item_table:QTableWidget()
+                item_table:QTableView()（item_model + ActionButtonDelegate）
                 status_bar:self.statusBar()
         """
         # -------------------------- 窗口基础设置 --------------------------
@@ -520,11 +857,18 @@ class MainWindow(QMainWindow):
         main_layout.setSpacing(20)
 
         # -------------------------- 3. 条目表格（核心展示控件） --------------------------
-        self.item_table = QTableWidget()
-        # 3.1 设置表格列数和列标题
-        self.item_table.setColumnCount(len(self.table_columns))
-        self.item_table.setHorizontalHeaderLabels(self.table_columns)
+        self.item_table = QTableView()
+        # 3.1 设置数据模型（列标题由模型提供）和操作按钮委托
+        self.item_model = ItemTableModel(self)
+        self.item_table.setModel(self.item_model)
+        self.action_delegate = ActionButtonDelegate(self.item_table)
+        self.action_delegate.clicked.connect(self._on_action_click)
+        self.item_table.setItemDelegate(self.action_delegate)
+        self.item_table.setMouseTracking(True)  # 按钮悬停效果需要鼠标移动事件
         self.item_table.verticalHeader().setVisible(False)  # 隐藏行号列
+        # 固定行高，视图无需逐行计算高度
+        self.item_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.item_table.verticalHeader().setDefaultSectionSize(35)
         # 3.2 表格样式优化
         header = self.item_table.horizontalHeader()
         header.setSectionResizeMode(1, QHeaderView.Stretch)  # 列1"URL"按内容自适应
@@ -537,10 +881,9 @@ class MainWindow(QMainWindow):
         header.resizeSection(5, 80)  # 列5"密码等级"固定100px宽
         header.resizeSection(7, 180)  # 列7（操作）固定120px宽（容下按钮）
 
-        self.item_table.setSelectionBehavior(QTableWidget.SelectRows)  # 选中时整行选中
-        self.item_table.setEditTriggers(QTableWidget.NoEditTriggers)  # 禁止表格直接编辑
+        self.item_table.setSelectionBehavior(QAbstractItemView.SelectRows)  # 选中时整行选中
+        self.item_table.setEditTriggers(QAbstractItemView.NoEditTriggers)  # 禁止表格直接编辑
         self.item_table.setColumnHidden(0, True) # 隐藏"条目ID"列
-        self.item_table.setRowHeight(0, 35)
         # -------------------------- 4. 状态栏（底部信息提示） --------------------------
         self.status_bar = self.statusBar()
         self.status_bar.setStyleSheet("""
@@ -572,253 +915,266 @@ class MainWindow(QMainWindow):
         self.setGeometry(x, y, self.window_width, self.window_height)
 
     def _load_items_to_table(self):
-        """从核心类获取条目数据，加载到表格中（仅显示非敏感字段）"""
-        # 1. 清空表格现有数据
-        self.item_table.setRowCount(0)  # 重置行数为0
-        # 2. 从核心类获取非敏感条目数据
+        """从核心类获取条目数据，加载到表格模型中（仅显示非敏感字段）"""
+        self.shown_password_row = -1
+        # 从核心类获取非敏感条目数据，整体交给模型；视图只绘制可见行
         items = self.password_book.get_non_secret_items()
+        self.item_model.set_items(items)
+        self.item_model.set_reused({No for group in self.password_book.find_reused() for No in group})
         if not items:
             self.status_bar.showMessage("提示：当前无密码条目，可点击「添加条目」创建", 3000)
             return
-        # 3. 遍历数据，填充表格
-        for row_idx, item in enumerate(items):
-            self.item_table.insertRow(row_idx)
-            self.item_table.setRowHeight(row_idx, 35)
-            # 为每行的每列设置数据（与table_columns对应）
-            self.item_table.setItem(row_idx, 0, QTableWidgetItem(item["Index"]))
-            self.item_table.setItem(row_idx, 1, QTableWidgetItem(item["URL"]))
-            self.item_table.setItem(row_idx, 2, QTableWidgetItem(item["UserName"]))
-            self.item_table.setItem(row_idx, 3, QTableWidgetItem("  ********  "))
-            self.item_table.setItem(row_idx, 4, QTableWidgetItem(item["LinkURL"]))
-            self.item_table.setItem(row_idx, 5, QTableWidgetItem(item["PasswordLevel"]))
-            self.item_table.setItem(row_idx, 6, QTableWidgetItem(item["Note"]))
-
-            # 3.3 最后一列（列7）：添加操作按钮
-            btn_container = QWidget()
-            btn_layout = QHBoxLayout(btn_container)
-            btn_layout.setContentsMargins(2, 2, 2, 2)
-            btn_layout.setSpacing(5)
-
-            show_btn = QPushButton("显示")
-            show_btn.setFixedSize(55, 30)
-            show_btn.clicked.connect(lambda _, r=row_idx: self._on_show_password_click(r))
-            btn_layout.addWidget(show_btn)
-
-            edit_btn = QPushButton("修改")
-            edit_btn.setFixedSize(55, 30)
-            edit_btn.setStyleSheet("""
-                                QPushButton {
-                                    background-color: #4da6ff;
-                                    color: white;
-                                    border: none;
-                                    padding: 6px 12px;
-                                    border-radius: 4px;
-                                }
-                                QPushButton:hover {
-                                    background-color: #398ae5;
-                                }
-                                QPushButton:pressed {
-                                    background-color: #2a6dbb;
-                                }
-                            """)
-            edit_btn.clicked.connect(lambda _, r=row_idx: self._on_edit_item_click(r))
-            btn_layout.addWidget(edit_btn)
-
-            delete_btn = QPushButton("删除")
-            delete_btn.setStyleSheet("""
-                                        QPushButton {
-                                            background-color:  #e74c3c;
-                                            color: #ffffff;
-                                            border: none;
-                                            padding: 6px 12px;
-                                            border-radius: 4px;
-                                        }
-                                        QPushButton:hover {
-                                            background-color: #c0392b;
-                                        }
-                                        QPushButton:pressed {
-                                            background-color: #a52a1d;
-                                        }
-                                    """)
-            delete_btn.setFixedSize(55, 30)
-            delete_btn.clicked.connect(lambda _, r=row_idx: self._on_delete_item_click(r))
-            btn_layout.addWidget(delete_btn)
-
-            self.item_table.setCellWidget(row_idx, 7, btn_container)
-
-        add_row_idx = len(items)
-        self.item_table.insertRow(add_row_idx)
-        self.item_table.setRowHeight(add_row_idx, 40)
-        add_btn = QPushButton("添加")
-        add_btn.setFixedSize(80, 35)
-        add_btn.setStyleSheet("""
-                            QPushButton {
-                                background-color: #4da6ff;
-                                color: white;
-                                border: none;
-                                padding: 6px 12px;
-                                border-radius: 4px;
-                            }
-                            QPushButton:hover {
-                                background-color: #398ae5;
-                            }
-                            QPushButton:pressed {
-                                background-color: #2a6dbb;
-                            }
-                        """)
-        add_btn.clicked.connect(self._on_add_item_click)
-        self.item_table.setCellWidget(add_row_idx, 1, add_btn)
-
-        # 4. 状态栏提示加载结果
+        # 状态栏提示加载结果
         self.status_bar.showMessage(f"成功加载 {len(items)} 条密码条目", 3000)
 
+    def _refresh_reused(self, item_id: str, old_peers: set[str], deleted: bool = False):
+        """
+        增删改一个条目后，只更新与它的新旧密码相关的条目的重复标记（按密码指纹，不解密，不遍历全部条目）
+        :param item_id: 变更的条目ID
+        :param old_peers: 变更前与它使用同一密码的条目（新增时为空集合）
+        :param deleted: 条目是否已删除
+        """
+        new_peers = set() if deleted else set(self.password_book.reused_with(item_id))
+        changes = {No: True for No in new_peers}
+        # 与旧密码重复的条目之间仍然互相重复，只剩一个时不再标记
+        changes.update({No: len(old_peers) > 1 for No in old_peers - new_peers})
+        if not deleted:
+            changes[item_id] = bool(new_peers)
+        self.item_model.update_reused(changes)
+
     def _get_selected_item_id(self) -> str | None:
         """
         获取表格中选中条目的ID（仅支持选中一行）
         :return: 选中条目的ID，无选中/多选时返回None
         """
-        # 获取所有选中的单元格，提取对应的行索引
-        selected_items = self.item_table.selectedItems()
-        if not selected_items:
+        # 获取所有选中的行（排除添加行）
+        selected_rows = {index.row() for index in self.item_table.selectionModel().selectedRows()
+                         if index.row() < self.item_model.item_count()}
+        if not selected_rows:
             msg_box = ErrorDialog(self, "选择错误:请先选中一条密码条目")
             msg_box.exec_()
             return None
         # 确保只选中一行（避免多行动作混乱）
-        selected_rows = {item.row() for item in selected_items}
         if len(selected_rows) > 1:
             msg_box = ErrorDialog(self, "选择错误:仅支持选中一条条目，请重新选择！")
             msg_box.exec_()
             return None
-        selected_row = selected_rows.pop()
-        return self.item_table.item(selected_row, 0).text()
+        return self.item_model.item_id(selected_rows.pop())
 
     def _hide_password(self):
         """隐藏当前显示的密码（恢复为星号）"""
         if self.shown_password_row != -1:  # 存在显示密码的行
-            # 获取原始条目数据（用于重新生成星号）
-            row_idx = self.shown_password_row
-            # 重新设置为星号
-            self.item_table.setItem(row_idx, 3, QTableWidgetItem("********"))
+            self.item_model.hide_password()
             self.shown_password_row = -1  # 重置记录
 
+    def _run_busy(self, msg: str, fn, *args, cancellable=True, **kwargs) -> tuple[bool, object]:
+        """
+        在工作线程中调用核心类API，期间显示忙碌提示
+        :return: (是否完成, 返回值)，用户取消时为(False, None)
+        """
+        busy = BusyDialog(self, msg, cancellable=cancellable)
+        if not busy.run(fn, *args, **kwargs):
+            return False, None
+        return True, busy.result
+
+    def _verify_for(self, title: str, fail_msg: str, uses: int = 1) -> str | None:
+        """
+        二次验证：弹出密码框，在工作线程中做一次Argon2验证并换取授权令牌
+        后续API调用使用令牌，同一次操作不再重复验证；输入的密码不在窗口中保留
+        :param uses: 令牌可用次数（本次操作需要调用的受保护API次数）
+        :return: 授权令牌，取消或验证失败时为None
+        """
+        verify_dialog = SecondaryVerifyDialog(title, self)
+        if verify_dialog.exec_() != QDialog.Accepted:
+            return None
+        password, verify_dialog.input_password = verify_dialog.input_password, None
+        done, token = self._run_busy("正在验证主密码...", self.password_book.verify_main_key,
+                                     password, issue_token=True, uses=uses, ttl=self.TOKEN_TTL)
+        if not done:
+            return None
+        if token is None:
+            error_msg = ErrorDialog(msg=fail_msg)
+            error_msg.exec_()
+        return token
+
     # -------------------------- 按钮点击事件处理 --------------------------
+    def _on_action_click(self, row_idx: int, action: str):
+        """表格按钮点击事件：按动作分发"""
+        if action == "add":
+            self._on_add_item_click()
+        elif action == "import":
+            self._on_import_click()
+        elif action == "show":
+            self._on_show_password_click(row_idx)
+        elif action == "edit":
+            self._on_edit_item_click(row_idx)
+        elif action == "delete":
+            self._on_delete_item_click(row_idx)
+
     def _on_add_item_click(self):
         """添加条目按钮点击事件：二次验证→打开添加对话框→保存数据"""
         self._hide_password()
         # 1. 二次验证（不通过则终止）
-        verify_dialog = SecondaryVerifyDialog("添加密码条目", self)
-        if verify_dialog.exec_() != QDialog.Accepted:
+        token = self._verify_for("添加密码条目", "密码验证失败，无法添加条目", uses=1)
+        if token is None:
             return
-        if not self.password_book.verify_main_key(verify_dialog.input_password):
-            error_msg = ErrorDialog(msg=f"密码验证失败，无法添加条目")
-            error_msg.exec_()
+        try:
+            # 2. 打开添加对话框
+            add_dialog = ItemEditDialog(parent=self)
+            if add_dialog.exec_() != QDialog.Accepted:
+                return
+            # 3. 调用核心类添加条目
+            item_data = add_dialog.item_data
+            print(item_data)
+            _, success = self._run_busy("正在添加条目...", self.password_book.add_item,
+                                        item_data, upw=token, cancellable=False)
+            if success != "-1":
+                error_msg = ErrorDialog(msg=f"添加条目{success}成功")
+                error_msg.exec_()
+                # 只插入新增的一行，选中状态和滚动位置由模型保持
+                self.item_model.insert_item(self.password_book.get_non_secret_item(success))
+                self._refresh_reused(success, set())
+                self.status_bar.showMessage(f"共 {self.item_model.item_count()} 条密码条目", 3000)
+            else:
+                error_msg = ErrorDialog(msg=f"添加失败，请重试")
+                error_msg.exec_()
+        finally:
+            # 取消或出错时令牌可能未用完，及时作废
+            self.password_book.revoke_token(token)
+
+    def _on_import_click(self):
+        """导入按钮点击事件：选择导出文件→二次验证→分块导入→重新加载表格"""
+        from Importer import import_file
+        self._hide_password()
+        path, _ = QFileDialog.getOpenFileName(self, "导入密码", "",
+                                              "浏览器/密码管理器导出 (*.csv *.json);;所有文件 (*)")
+        if not path:
             return
-        # 2. 打开添加对话框
-        add_dialog = ItemEditDialog(parent=self)
-        if add_dialog.exec_() != QDialog.Accepted:
+        # 导入分块调用add_items，令牌不限次数，导入结束后作废
+        token = self._verify_for("导入密码条目", "密码验证失败，无法导入", uses=None)
+        if token is None:
             return
-        # 3. 调用核心类添加条目
-        item_data = add_dialog.item_data
-        print(item_data)
-        success = self.password_book.add_item(item_data,upw=verify_dialog.input_password)
-        if success != "-1":
-            error_msg = ErrorDialog(msg=f"添加条目{success}成功")
-            error_msg.exec_()
-            self._load_items_to_table()
-        else:
-            error_msg = ErrorDialog(msg=f"添加失败，请重试")
-            error_msg.exec_()
+        try:
+            _, result = self._run_busy("正在导入...", import_file, self.password_book, path, token,
+                                       cancellable=False)
+            msg = (f"导入 {result['imported']} 条，重复 {result['duplicates']} 条，"
+                   f"跳过 {result['skipped_count']} 条")
+        except (OSError, ValueError) as e:     # 含令牌失效、UnicodeDecodeError和JSON格式错误
+            msg = f"导入失败：{e}"
+        finally:
+            self.password_book.revoke_token(token)
+        # 失败前已写入的块同样需要显示
+        self._load_items_to_table()
+        error_msg = ErrorDialog(msg=msg)
+        error_msg.exec_()
 
     def _on_delete_item_click(self,row_idx:int):
         """删除条目按钮点击事件：二次验证→获取选中条目→确认删除→调用核心类删除"""
         self._hide_password()
         # 1. 二次验证
-        verify_dialog = SecondaryVerifyDialog("删除密码条目", self)
-        if verify_dialog.exec_() != QDialog.Accepted:
-            return
-        if not self.password_book.verify_main_key(verify_dialog.input_password):
-            error_msg = ErrorDialog(msg=f"密码验证失败，无法删除条目")
-            error_msg.exec_()
+        token = self._verify_for("删除密码条目", "密码验证失败，无法删除条目", uses=1)
+        if token is None:
             return
-        # 2. 获取选中条目的ID
-        print(row_idx)
-        item_id = self.item_table.item(row_idx, 0).text()
-        item_url = self.item_table.item(row_idx, 1).text()
-        # 3. 额外确认
-        confirm = ConfirmDialog(self, f"确定要删除「{item_url}」条目吗？删除后不可恢复！",)
-        if confirm.exec_() != QDialog.Accepted:
-            return
-        # 4. 调用核心类删除条目
-        success = self.password_book.delete_item(item_id,upw=verify_dialog.input_password)
-        if success:
-            error_msg = ErrorDialog(msg=f"删除成功")
-            error_msg.exec_()
-            self._load_items_to_table()
-        else:
-            error_msg = ErrorDialog(msg=f"删除失败，请重试")
-            error_msg.exec_()
-
-    def _on_show_password_click(self,row_idx:str):
+        try:
+            # 2. 获取选中条目的ID
+            print(row_idx)
+            item_id = self.item_model.item_id(row_idx)
+            item_url = self.item_model.item_at(row_idx)["URL"]
+            # 3. 额外确认
+            confirm = ConfirmDialog(self, f"确定要删除「{item_url}」条目吗？删除后不可恢复！",)
+            if confirm.exec_() != QDialog.Accepted:
+                return
+            # 4. 调用核心类删除条目
+            old_peers = set(self.password_book.reused_with(item_id))
+            _, success = self._run_busy("正在删除条目...", self.password_book.delete_item,
+                                        item_id, upw=token, cancellable=False)
+            if success:
+                error_msg = ErrorDialog(msg=f"删除成功")
+                error_msg.exec_()
+                # 只移除被删除的一行
+                self.item_model.remove_item(row_idx)
+                self._refresh_reused(item_id, old_peers, deleted=True)
+                self.shown_password_row = self.item_model.revealed_row()
+                self.status_bar.showMessage(f"共 {self.item_model.item_count()} 条密码条目", 3000)
+            else:
+                error_msg = ErrorDialog(msg=f"删除失败，请重试")
+                error_msg.exec_()
+        finally:
+            # 取消或出错时令牌可能未用完，及时作废
+            self.password_book.revoke_token(token)
+
+    def _on_show_password_click(self,row_idx:int):
         """显示密码按钮点击事件：二次验证→获取选中条目→调用核心类解密并显示密码"""
         self._hide_password()
         # 1. 二次验证
-        verify_dialog = SecondaryVerifyDialog("查看密码条目", self)
-        if verify_dialog.exec_() != QDialog.Accepted:
-            return
-        if not self.password_book.verify_main_key(verify_dialog.input_password):
-            error_msg = ErrorDialog(msg=f"密码验证失败，无法查看条目")
-            error_msg.exec_()
-            return
-        # 2. 获取选中条目的ID
-        item_id = self.item_table.item(row_idx, 0).text()
-        print(row_idx,item_id)
-        # 3. 从核心类获取解密后的密码
-        item_data = self.password_book.get_item_by_id(item_id,upw=verify_dialog.input_password)
-
-        if not item_data or "Password" not in item_data:
-            error_msg = ErrorDialog(msg=f"错误:无法获取该条目的密码")
-            error_msg.exec_()
+        token = self._verify_for("查看密码条目", "密码验证失败，无法查看条目", uses=1)
+        if token is None:
             return
-        # 4. 显示密码
-        self.item_table.setItem(row_idx, 3, QTableWidgetItem(item_data["Password"]))
-        self.shown_password_row = row_idx
-
-    def _on_edit_item_click(self,row_idx:str):
+        try:
+            # 2. 获取选中条目的ID
+            item_id = self.item_model.item_id(row_idx)
+            print(row_idx,item_id)
+            # 3. 从核心类获取解密后的密码
+            done, item_data = self._run_busy("正在解密条目...", self.password_book.get_item_by_id,
+                                             item_id, upw=token)
+            if not done:
+                return
+
+            if not item_data or "Password" not in item_data:
+                error_msg = ErrorDialog(msg=f"错误:无法获取该条目的密码")
+                error_msg.exec_()
+                return
+            # 4. 显示密码
+            self.item_model.reveal_password(row_idx, item_data["Password"])
+            self.shown_password_row = row_idx
+        finally:
+            # 取消或出错时令牌可能未用完，及时作废
+            self.password_book.revoke_token(token)
+
+    def _on_edit_item_click(self,row_idx:int):
         """修改条目按钮点击事件：二次验证→获取选中条目→打开修改对话框→更新数据"""
         self._hide_password()
         # 1. 二次验证
-        verify_dialog = SecondaryVerifyDialog("修改密码条目", self)
-        if verify_dialog.exec_() != QDialog.Accepted:
-            return
-        if not self.password_book.verify_main_key(verify_dialog.input_password):
-            error_msg = ErrorDialog(msg=f"密码验证失败，无法修改条目" )
-            error_msg.exec_()
+        token = self._verify_for("修改密码条目", "密码验证失败，无法修改条目", uses=2)
+        if token is None:
             return
-
-        # 3. 从核心类获取该条目的完整数据
-        print(row_idx)
-        item_id = self.item_table.item(row_idx, 0).text()
-        item_data = self.password_book.get_item_by_id(item_id,upw=verify_dialog.input_password)
-
-        if not item_data:
-            error_msg = ErrorDialog(msg=f"获取条目{row_idx}失败，无法修改条目")
-            error_msg.exec_()
-            return
-        print(item_data)#dict
-
-        # 4. 打开修改对话框
-        edit_dialog = ItemEditDialog(item_data, self)
-        if edit_dialog.exec_() != QDialog.Accepted:
-            return
-        # # 5. 调用核心类更新条目
-        success = self.password_book.update_item(item_id, data=edit_dialog.item_data, upw=verify_dialog.input_password)
-        if success:
-            error_msg = ErrorDialog(msg=f"修改条目{success}成功")
-            error_msg.exec_()
-            self._load_items_to_table()
-        else:
-            error_msg = ErrorDialog(msg=f"修改失败，请重试")
-            error_msg.exec_()
+        try:
+
+            # 3. 从核心类获取该条目的完整数据
+            print(row_idx)
+            item_id = self.item_model.item_id(row_idx)
+            done, item_data = self._run_busy("正在解密条目...", self.password_book.get_item_by_id,
+                                             item_id, upw=token)
+            if not done:
+                return
+
+            if not item_data:
+                error_msg = ErrorDialog(msg=f"获取条目{row_idx}失败，无法修改条目")
+                error_msg.exec_()
+                return
+            print(item_data)#dict
+
+            # 4. 打开修改对话框
+            edit_dialog = ItemEditDialog(item_data, self)
+            if edit_dialog.exec_() != QDialog.Accepted:
+                return
+            # # 5. 调用核心类更新条目
+            old_peers = set(self.password_book.reused_with(item_id))
+            _, success = self._run_busy("正在保存条目...", self.password_book.update_item,
+                                        item_id, data=edit_dialog.item_data, upw=token,
+                                        cancellable=False)
+            if success:
+                error_msg = ErrorDialog(msg=f"修改条目{success}成功")
+                error_msg.exec_()
+                # 只刷新被修改的一行
+                self.item_model.update_item(row_idx, self.password_book.get_non_secret_item(success))
+                self._refresh_reused(item_id, old_peers)
+            else:
+                error_msg = ErrorDialog(msg=f"修改失败，请重试")
+                error_msg.exec_()
+        finally:
+            # 取消或出错时令牌可能未用完，及时作废
+            self.password_book.revoke_token(token)
 
 if __name__ == "__main__":
     pass
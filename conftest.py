@@ -0,0 +1,30 @@
+"""
+测试公共夹具：在临时目录中创建使用低Argon2参数的密码本
+"""
+import pytest
+
+from Core import KeyWordNoteBook
+
+MAIN_KEY = "main-key"
+FAST_ARGON2 = {"memory_cost": 8192, "time_cost": 1, "parallelism": 1}
+
+
+@pytest.fixture
+def open_book(tmp_path):
+    """open_book(name="vault.json", key=MAIN_KEY, **kwargs) -> KeyWordNoteBook，测试结束时关闭"""
+    books = []
+
+    def _open(name: str = "vault.json", key: str = MAIN_KEY, **kwargs):
+        kwargs.setdefault("argon2_cost", FAST_ARGON2)
+        book = KeyWordNoteBook(key, path=str(tmp_path / name), **kwargs)
+        books.append(book)
+        return book
+
+    yield _open
+    for book in books:
+        book.close()
+
+
+def make_items(n: int, password=lambda i: f"Pw!{i:06d}xyz", url=lambda i: f"https://site{i}.example.com"):
+    """生成n个条目的输入数据"""
+    return [{"URL": url(i), "UserName": f"user{i}", "Password": password(i)} for i in range(n)]
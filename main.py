@@ -18,95 +18,104 @@
 __version__ = "0.0.1.1"
 
 import sys
+import threading
 from PyQt5.QtWidgets import QApplication, QDialog
 
-from UI import LoginDialog,MainWindow,ErrorDialog
-from Core import KeyWordNoteBook
+from UI import LoginDialog,MainWindow,ErrorDialog,BusyDialog
+from Core import KeyWordNoteBook, warm_up
+
+# 全局深色样式表分两部分：登录前只需要对话框和基础控件的样式，
+# 表格、表头、状态栏等主界面样式在登录成功、创建主窗口前再追加，登录窗口不必等它们解析
+BASE_STYLE_SHEET = """
+        QDialog {
+           background-color: #2d2d2d;
+        }
+        QLabel {
+           color: #ffffff;
+        }
+        QLineEdit {
+           background-color: #333333;
+           color: #ffffff;
+           border: 1px solid #555555;
+           border-radius: 4px;
+           padding: 5px;
+        }
+        QLineEdit:focus {
+           border: 1px solid #4da6ff;
+        }
+        QPushButton {
+           background-color: #555555;
+           color: white;
+           border: none;
+           padding: 6px 12px;
+           border-radius: 4px;
+        }
+        QPushButton:hover {
+           background-color: #666666;
+        }
+        QPushButton:pressed {
+           background-color: #444444;
+        }
+        QMessageBox {
+           background-color: #2d2d2d;
+           color: #ffffff;
+        }
+        QMessageBox QPushButton {
+           background-color: #555555;
+           color: white;
+           border: none;
+           padding: 5px 10px;
+           border-radius: 3px;
+        }
+"""
+MAIN_WINDOW_STYLE_SHEET = """
+        QMainWindow {
+           background-color: #2d2d2d;
+        }
+        QMainWindow > QWidget {
+            background-color: #2d2d2d;
+        }
+        QTableView {
+            background-color: #333333;
+            color: #ffffff;
+            gridline-color: #444444;
+        }
+        QHeaderView::section {
+            background-color: #333333;
+            color: #ffffff;
+            border: 1px solid #555555;
+            padding: 5px;
+        }
+        QTableView QHeaderView::section:vertical {
+            width: 10px;
+            text-align: center;
+        }
+        QTableView::item {
+            background-color: #2d2d2d;
+            border: 1px solid #444444;
+        }
+        QTableView::item:selected {
+            background-color: #4da6ff;  /* 选中时蓝色高亮 */
+            color: #ffffff;
+        }
+        QStatusBar {
+            background-color: #333333;
+            color: #ffffff;
+            border-top: 1px solid #444444;
+        }
+"""
 
 
 def main():
     """程序入口：初始化应用→登录→启动主界面"""
     app = QApplication(sys.argv)
 
-    # 设置全局深色样式表
+    # 1. 设置登录前需要的深色样式
     app.setStyle("Fusion")
-    app.setStyleSheet("""
-            QMainWindow {
-               background-color: #2d2d2d;  
-            }
-            QMainWindow > QWidget {  
-                background-color: #2d2d2d;
-            }
-            QDialog {
-               background-color: #2d2d2d;
-            }
-            QLabel {
-               color: #ffffff;
-            }
-            QLineEdit {
-               background-color: #333333;
-               color: #ffffff;
-               border: 1px solid #555555;
-               border-radius: 4px;
-               padding: 5px;
-            }
-            QLineEdit:focus {
-               border: 1px solid #4da6ff;
-            }
-            QPushButton {
-               background-color: #555555;
-               color: white;
-               border: none;
-               padding: 6px 12px;
-               border-radius: 4px;
-            }
-            QPushButton:hover {
-               background-color: #666666;
-            }
-            QPushButton:pressed {
-               background-color: #444444;
-            }
-            QMessageBox {
-               background-color: #2d2d2d;
-               color: #ffffff;
-            }
-            QMessageBox QPushButton {
-               background-color: #555555;
-               color: white;
-               border: none;
-               padding: 5px 10px;
-               border-radius: 3px;
-            }
-            QTableWidget {
-                background-color: #333333;
-                color: #ffffff;
-                gridline-color: #444444;
-            }
-            QHeaderView::section {
-                background-color: #333333;
-                color: #ffffff;
-                border: 1px solid #555555;
-                padding: 5px;
-            }
-            QTableWidget QHeaderView::section:vertical {
-                width: 10px;                
-                text-align: center; 
-            }
-            QTableWidget::item {
-                background-color: #2d2d2d
-                border: 1px solid #444444;
-            }
-            QTableWidget::item:selected {
-                background-color: #4da6ff;  /* 选中时蓝色高亮 */
-                color: #ffffff;
-            }
-            QStatusBar {
-                background-color: #333333;
-                color: #ffffff;
-                border-top: 1px solid #444444;
-            }
-        }
-       """)
+    app.setStyleSheet(BASE_STYLE_SHEET)
+
+    # 用户输入主密码期间在后台导入加密库等模块，点击登录后不必再等待导入
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
 
     # 2. 显示登录对话框
     while True:
@@ -114,9 +123,16 @@ def main():
         if login_dialog.exec_() != QDialog.Accepted:  # 用户取消登录
             sys.exit(0)
 
-        # 3. 初始化核心类（传入登录成功的主密码）
+        # 3. 初始化核心类（传入登录成功的主密码），Argon2解锁在工作线程中进行
         try:
-            password_book = KeyWordNoteBook(mainKey=login_dialog.main_key)#login_dialog.main_key
+            # 解锁时可能升级文件格式或按新参数重新哈希，属于写入类任务，不可取消：
+            # 被放弃的解锁仍会在后台写文件，与重新登录打开的实例冲突
+            busy = BusyDialog(msg="正在解锁密码本...", cancellable=False)
+            # 近期展示过的少量条目缓存30秒，反复查看同一条目时不必重复解密；
+            # 连续编辑在1秒内合并为一次写入，退出时close()写入剩余变更
+            busy.run(KeyWordNoteBook, mainKey=login_dialog.main_key,
+                     reveal_cache_size=8, reveal_cache_ttl=30, flush_delay=1.0)
+            password_book = busy.result
             break
         except UnicodeError as e:
             error_msg = ErrorDialog(msg=f"文件损坏：{str(e)}",button="退出")
@@ -132,9 +148,11 @@ def main():
             error_msg.exec_()
             sys.exit(1)
 
-    # 4. 启动主界面
+    # 4. 追加主界面样式并启动主界面
+    app.setStyleSheet(BASE_STYLE_SHEET + MAIN_WINDOW_STYLE_SHEET)
     main_window = MainWindow(password_book)
     main_window.show()  # 显示主窗口
+    app.aboutToQuit.connect(password_book.close)  # 退出前写入未落盘的变更
 
     sys.exit(app.exec_())
 
@@ -0,0 +1,158 @@
+"""
+离线泄露库的行为测试：排序去重转换、分桶边界查找、布隆过滤器、损坏文件、条目泄露标记
+"""
+import hashlib
+import os
+
+import pytest
+
+import Breach
+from Breach import BreachCorpus, password_digest
+from Core import KeyItem
+from conftest import MAIN_KEY, make_items
+
+
+def _corpus(tmp_path, passwords, name: str = "corpus.bin", **kwargs) -> str:
+    source = tmp_path / (name + ".txt")
+    source.write_text("".join(f"{password_digest(p).hex().upper()}:3\n" for p in passwords), encoding="ascii")
+    dest = str(tmp_path / name)
+    BreachCorpus.convert(str(source), dest, **kwargs)
+    return dest
+
+
+def _edit(book, No: str, **changes):
+    item = KeyItem()
+    item.update({**book.get_item_by_id(No, MAIN_KEY), **changes})
+    for key in ("Index", "PasswordLevel", "Fingerprint", "Breached"):
+        item.pop(key, None)     # 与编辑界面一样只提交可编辑的字段，密码总会带上
+    assert book.update_item(No, item, MAIN_KEY) == No
+
+
+def test_edit_keeps_breached_flag_unless_password_changes(tmp_path, open_book):
+    book = open_book()
+    book.add_items(make_items(2), MAIN_KEY)
+    assert book.check_breached(_corpus(tmp_path, ["Pw!000000xyz"]), MAIN_KEY) == ["1"]
+
+    _edit(book, "1", Note="只改了备注", URL="https://moved.example.com")
+    assert book.get_non_secret_item("1")["Breached"] is True
+    _edit(book, "1", Password="a-new-password")
+    assert "Breached" not in book.get_non_secret_item("1")
+
+
+def _lines(tmp_path, lines) -> str:
+    source = tmp_path / "list.txt"
+    source.write_text("".join(line + "\n" for line in lines), encoding="ascii")
+    return str(source)
+
+
+def _records(path: str) -> list[bytes]:
+    with BreachCorpus(path) as corpus:
+        data = corpus._map[corpus._records_offset:]
+        return [data[i:i + corpus.width] for i in range(0, len(data), corpus.width)]
+
+
+def test_convert_sorts_and_dedupes_across_runs(tmp_path):
+    digests = [hashlib.sha1(str(i).encode()).digest() for i in range(50)]
+    lines = [d.hex().upper() + ":7" for d in digests] + [d.hex() for d in digests[::3]] + ["", "  "]
+    dest = str(tmp_path / "c.bin")
+    # 每个排序分段只有4条，重复的摘要落在不同分段中，归并时去重
+    assert BreachCorpus.convert(_lines(tmp_path, lines), dest, chunk_records=4) == 50
+    assert _records(dest) == sorted(digests)
+    with BreachCorpus(dest) as corpus:
+        assert len(corpus) == 50 and corpus.kind == "sha1"
+        assert corpus.check(["7", "not-there", "7"]) == [True, False, True]
+
+    with pytest.raises(ValueError, match="第 2 行"):
+        BreachCorpus.convert(_lines(tmp_path, [digests[0].hex(), "abc"]), dest)
+
+
+def test_lookup_at_fanout_bucket_boundaries(tmp_path):
+    edges = [bytes(20), b"\x00" * 19 + b"\x02", b"\x7f" + b"\xff" * 19, b"\x80" + bytes(19),
+             b"\x80" + bytes(18) + b"\x01", b"\xff" * 19 + b"\xfe", b"\xff" * 20]
+    dest = str(tmp_path / "c.bin")
+    BreachCorpus.convert(_lines(tmp_path, [d.hex() for d in reversed(edges)]), dest)
+    near = [b"\x00" * 19 + b"\x01", b"\x7f" + b"\xff" * 18 + b"\xfe", b"\x80" + bytes(18) + b"\x02",
+            b"\xff" * 19 + b"\xfd", b"\x01" + bytes(19)]
+    with BreachCorpus(dest) as corpus:
+        assert corpus.fanout_bits == 8
+        assert all(corpus.contains(d) for d in edges)
+        assert not any(corpus.contains(d) for d in near)
+        with pytest.raises(ValueError):
+            corpus.contains(bytes(16))
+
+
+def test_ntlm_digest_and_md4_fallback():
+    assert password_digest("password", "ntlm").hex() == "8846f7eaee8fb117ad06bdd830b7586c"
+    assert Breach._md4(b"").hex() == "31d6cfe0d16ae931b73c59d7e0c089c0"
+    assert Breach._md4(b"a" * 100) == Breach._md4(b"a" * 100) != Breach._md4(b"a" * 99)
+
+
+class _CountingStruct:
+    """记录分桶表的读取次数：布隆过滤器判定不存在时不应访问分桶表和记录区"""
+    def __init__(self, real):
+        self.real, self.calls = real, 0
+
+    def unpack_from(self, *args):
+        self.calls += 1
+        return self.real.unpack_from(*args)
+
+
+def test_bloom_negative_skips_record_lookup(tmp_path, monkeypatch):
+    passwords = [f"leaked-{i}" for i in range(2000)]
+    dest = _corpus(tmp_path, passwords, bloom_bits_per_entry=10)
+    assert os.path.exists(dest + ".bloom")
+    fanout = _CountingStruct(Breach._FANOUT)
+    monkeypatch.setattr(Breach, "_FANOUT", fanout)
+    with BreachCorpus(dest) as corpus:
+        assert corpus._bloom is not None
+        assert all(corpus.check(passwords[::97]))
+        fanout.calls = 0
+        assert not any(corpus.check([f"safe-{i}" for i in range(500)]))
+    assert fanout.calls <= 50       # 每条10位时误判率约1%
+
+    # 重新转换后旧的过滤器被删除，不会与新库错配
+    _corpus(tmp_path, passwords[:10])
+    assert not os.path.exists(dest + ".bloom")
+
+
+def test_corrupt_or_truncated_corpus_is_rejected(tmp_path):
+    dest = _corpus(tmp_path, [f"p{i}" for i in range(100)], bloom_bits_per_entry=10)
+    data = open(dest, "rb").read()
+
+    with open(dest, "wb") as f:
+        f.write(data[:-7])
+    with pytest.raises(ValueError, match="长度与头部不符"):
+        BreachCorpus(dest)
+    with open(dest, "wb") as f:
+        f.write(b"XXXX" + data[4:])
+    with pytest.raises(ValueError, match="不是泄露库文件"):
+        BreachCorpus(dest)
+    with open(dest, "wb"):
+        pass
+    with pytest.raises(ValueError, match="不是泄露库文件"):
+        BreachCorpus(dest)
+
+    # 布隆过滤器被截断时忽略它，直接查记录区
+    with open(dest, "wb") as f:
+        f.write(data)
+    with open(dest + ".bloom", "r+b") as f:
+        f.truncate(os.path.getsize(dest + ".bloom") - 1)
+    with BreachCorpus(dest) as corpus:
+        assert corpus._bloom is None
+        assert corpus.check(["p5", "q5"]) == [True, False]
+
+
+def test_check_breached_sets_and_clears_flag(tmp_path, open_book):
+    book = open_book()
+    book.add_items(make_items(4), MAIN_KEY)
+    first = _corpus(tmp_path, ["Pw!000001xyz", "Pw!000003xyz", "unrelated"], name="first.bin")
+    assert book.check_breached(first, MAIN_KEY) == ["2", "4"]
+    assert [No for No in "1234" if book.get_non_secret_item(No).get("Breached")] == ["2", "4"]
+
+    # 再次检查时不在新库中的条目清除标记；标记随文件保存
+    with BreachCorpus(_corpus(tmp_path, ["Pw!000003xyz"], name="second.bin")) as second:
+        assert book.check_breached(second, MAIN_KEY) == ["4"]
+    assert book.check_breached(first, "wrong") == []
+    book.close()
+    book = open_book(verify_mode="full")
+    assert [No for No in "1234" if book.get_non_secret_item(No).get("Breached")] == ["4"]
@@ -0,0 +1,316 @@
+"""
+Core的行为测试：密码重复检测、主密码修改、完整性校验、日志重放、授权令牌、写回
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import Core
+from Core import KeyItem, MerkleTree
+from conftest import MAIN_KEY, make_items
+
+
+def _item(url: str, user: str, password: str) -> KeyItem:
+    item = KeyItem()
+    item.update({"URL": url, "UserName": user, "Password": password})
+    return item
+
+
+def _reused(book) -> list[list[str]]:
+    return sorted(sorted(group) for group in book.find_reused())
+
+
+def test_reuse_index_follows_add_edit_delete(open_book):
+    book = open_book()
+    book.add_items(make_items(4, password=lambda i: "same-pass" if i < 2 else f"unique-{i}"), MAIN_KEY)
+    assert _reused(book) == [["1", "2"]]
+
+    book.update_item("3", _item("https://site2.example.com", "user2", "same-pass"), MAIN_KEY)
+    assert _reused(book) == [["1", "2", "3"]]
+    book.update_item("1", _item("https://site0.example.com", "user0", "changed"), MAIN_KEY)
+    assert _reused(book) == [["2", "3"]]
+    book.delete_item("2", MAIN_KEY)
+    assert _reused(book) == []
+    assert book.add_item(_item("https://new.example.com", "me", "changed"), MAIN_KEY) == "5"
+    assert _reused(book) == [["1", "5"]]
+
+
+def test_reuse_index_after_change_main_key(open_book):
+    book = open_book()
+    book.add_items(make_items(3, password=lambda i: "same-pass" if i < 2 else "other"), MAIN_KEY)
+    assert _reused(book) == [["1", "2"]]
+
+    assert book.change_main_key(MAIN_KEY, "new-key")
+    # 指纹已按新密钥重算，内存中的索引必须随之更新，新增条目也能与旧条目匹配
+    assert _reused(book) == [["1", "2"]]
+    book.add_item(_item("https://x.example.com", "me", "other"), "new-key")
+    assert _reused(book) == [["1", "2"], ["3", "4"]]
+
+    book.close()
+    assert _reused(open_book(key="new-key")) == [["1", "2"], ["3", "4"]]
+
+
+def test_merkle_sparse_root_matches_dense_tree():
+    for leaves in ({}, {0: b"a" * 32}, {1: b"a" * 32, 2: b"b" * 32, 3: b"c" * 32, 9: b"d" * 32}):
+        assert MerkleTree.sparse_root(leaves) == MerkleTree(leaves).root()
+
+
+@pytest.mark.parametrize("forged, message", [("4000000000", "Merkle根校验失败"), ("02", "Index或MAC格式错误"),
+                                             ("9" * 30, "Index或MAC格式错误")])
+def test_forged_index_fails_before_building_tree(tmp_path, open_book, forged, message):
+    book = open_book()
+    book.add_items(make_items(3), MAIN_KEY)
+    book.close()
+
+    path = tmp_path / "vault.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    # 把条目连同MAC移到一个极大的Index：按原始值分配Merkle树会耗尽内存
+    data["ItemList"][forged] = data["ItemList"].pop("2")
+    data["ItemMAC"][forged] = data["ItemMAC"].pop("2")
+    path.write_text(json.dumps(data), encoding="utf-8")
+    with pytest.raises(ValueError, match=message):
+        open_book()
+
+
+def _passwords(book) -> dict:
+    items = book.get_items_by_ids([item["Index"] for item in book.get_non_secret_items()], MAIN_KEY)
+    return {item["Index"]: item["Password"] for item in items}
+
+
+def test_journal_replay_restores_changes(tmp_path, open_book):
+    book = open_book(journal=True)
+    book.add_items(make_items(3), MAIN_KEY)
+    book.update_item("1", _item("https://site0.example.com", "user0", "changed"), MAIN_KEY)
+    book.delete_item("2", MAIN_KEY)
+    book.close()
+    # 变更只在日志中，检查点仍是新建时的空密码本
+    assert json.loads((tmp_path / "vault.json").read_text(encoding="utf-8"))["ItemList"] == {}
+    expected = {"1": "changed", "3": "Pw!000002xyz"}
+
+    book = open_book(journal=True, verify_mode="full")
+    assert _passwords(book) == expected
+    assert book.add_item(_item("https://new.example.com", "me", "new"), MAIN_KEY) == "4"    # 计数器随日志恢复
+    book.close()
+
+    # 关闭日志模式后打开：重放结果合并回主文件，日志删除
+    book = open_book()
+    assert _passwords(book) == {**expected, "4": "new"}
+    assert not (tmp_path / "vault.json.journal").exists()
+    assert len(json.loads((tmp_path / "vault.json").read_text(encoding="utf-8"))["ItemList"]) == 3
+
+
+def test_journal_torn_tail_is_dropped_and_tampering_detected(tmp_path, open_book):
+    book = open_book(journal=True)
+    book.add_items(make_items(2), MAIN_KEY)
+    book.add_item(_item("https://x.example.com", "me", "x"), MAIN_KEY)
+    book.close()
+    journal = tmp_path / "vault.json.journal"
+    lines = journal.read_text(encoding="utf-8").splitlines(keepends=True)
+
+    # 写入时崩溃留下的不完整末尾被丢弃，之前的记录照常重放
+    journal.write_text("".join(lines) + lines[-1][:40], encoding="utf-8")
+    assert sorted(_passwords(open_book(journal=True))) == ["1", "2", "3"]
+    assert journal.read_text(encoding="utf-8") == "".join(lines)
+
+    # 中间记录被删除时链式HMAC不符
+    journal.write_text(lines[0] + lines[-1], encoding="utf-8")
+    with pytest.raises(ValueError, match="HMAC校验失败"):
+        open_book(journal=True)
+
+
+def test_reused_with_returns_only_the_items_group(open_book):
+    book = open_book()
+    book.add_items(make_items(5, password=lambda i: "same-pass" if i < 3 else f"unique-{i}"), MAIN_KEY)
+    assert book.reused_with("2") == ["1", "3"]
+    assert book.reused_with("4") == [] and book.reused_with("99") == []
+    book.update_item("4", _item("https://site3.example.com", "user3", "same-pass"), MAIN_KEY)
+    assert book.reused_with("1") == ["2", "3", "4"]
+    book.delete_item("1", MAIN_KEY)
+    assert book.reused_with("4") == ["2", "3"]
+
+
+class _Interrupt(Exception):
+    pass
+
+
+def _rotate(book, new_key: str = "new-key", stop_at: int = None) -> list[tuple[int, int]]:
+    """修改主密码（每批2条），返回进度回调的记录；stop_at不为None时在完成该条数后模拟崩溃"""
+    calls = []
+
+    def progress(done, total):
+        calls.append((done, total))
+        if stop_at is not None and done >= stop_at:
+            raise _Interrupt
+
+    try:
+        assert book.change_main_key(MAIN_KEY, new_key, progress=progress, batch_size=2)
+    except _Interrupt:
+        pass
+    return calls
+
+
+def _interrupted_book(tmp_path, open_book):
+    """7个条目的密码本，修改主密码在完成4条后崩溃，进程重启后用原主密码重新打开"""
+    book = open_book()
+    book.add_items(make_items(7), MAIN_KEY)
+    assert _rotate(book, stop_at=4)[-1] == (4, 7)
+    book.close()
+    rotation = tmp_path / "vault.json.rotate"
+    assert len(rotation.read_text(encoding="utf-8").splitlines()) == 3     # 文件头和两批
+    # 主文件仍是原密钥：新密码不能登录，并提示使用原主密码
+    with pytest.raises(ValueError, match="上次修改主密码未完成"):
+        open_book(key="new-key")
+    return open_book(), rotation
+
+
+def _assert_rotated(tmp_path, open_book, book):
+    expected = {str(i + 1): item["Password"] for i, item in enumerate(make_items(7))}
+    assert _passwords_with(book, "new-key") == expected
+    assert not (tmp_path / "vault.json.rotate").exists()
+    # 原主密码失效：二级验证失败，也不能再登录
+    assert book.verify_main_key(MAIN_KEY) is False
+    assert book.get_item_by_id("1", MAIN_KEY) is None
+    book.close()
+    with pytest.raises(ValueError, match="登录密码不正确"):
+        open_book()
+    assert _passwords_with(open_book(key="new-key", verify_mode="full"), "new-key") == expected
+
+
+def _passwords_with(book, key: str) -> dict:
+    items = book.get_items_by_ids([item["Index"] for item in book.get_non_secret_items()], key)
+    return {item["Index"]: item["Password"] for item in items}
+
+
+def test_interrupted_rotation_resumes(tmp_path, open_book):
+    book, _ = _interrupted_book(tmp_path, open_book)
+    assert _passwords(book) == {str(i + 1): item["Password"] for i, item in enumerate(make_items(7))}
+    assert _rotate(book) == [(4, 7), (6, 7), (7, 7)]     # 从已落盘的两批之后继续
+    _assert_rotated(tmp_path, open_book, book)
+
+
+def test_rotation_truncates_torn_batch(tmp_path, open_book):
+    book, rotation = _interrupted_book(tmp_path, open_book)
+    lines = rotation.read_text(encoding="utf-8").splitlines(keepends=True)
+    rotation.write_text("".join(lines) + lines[-1][:50], encoding="utf-8")     # 写入第三批时崩溃
+    assert _rotate(book)[0] == (4, 7)
+    _assert_rotated(tmp_path, open_book, book)
+
+
+@pytest.mark.parametrize("tamper", ["batch", "order", "new_key"])
+def test_rotation_discards_tampered_or_foreign_progress(tmp_path, open_book, tamper):
+    book, rotation = _interrupted_book(tmp_path, open_book)
+    lines = rotation.read_text(encoding="utf-8").splitlines(keepends=True)
+    if tamper == "batch":       # 批次内容被修改
+        record = json.loads(lines[1])
+        No = next(iter(record["items"]))
+        record["items"][No]["Password"] = record["items"][No]["Password"][:-4] + "AAAA"
+        lines[1] = json.dumps(record, sort_keys=True) + "\n"
+    elif tamper == "order":     # 批次被调换
+        lines[1], lines[2] = lines[2], lines[1]
+    rotation.write_text("".join(lines), encoding="utf-8")
+    # 进度校验失败或新密码与进度不符时不采用其中任何密文，从头开始
+    new_key = "other-key" if tamper == "new_key" else "new-key"
+    assert _rotate(book, new_key=new_key)[0] == (0, 7)
+    if new_key == "new-key":
+        _assert_rotated(tmp_path, open_book, book)
+    else:
+        assert book.verify_main_key("new-key") is False and book.verify_main_key("other-key") is True
+
+
+def _token_works(book, token: str) -> bool:
+    return book.get_item_by_id("1", token) is not None
+
+
+def test_token_uses_ttl_and_revoke(open_book, monkeypatch):
+    book = open_book()
+    book.add_items(make_items(1), MAIN_KEY)
+    assert book.verify_main_key("wrong", issue_token=True) is None
+
+    token = book.verify_main_key(MAIN_KEY, issue_token=True, uses=2)
+    assert [_token_works(book, token) for _ in range(3)] == [True, True, False]
+    # 伪造的令牌按二级密码校验，同样失败
+    assert not _token_works(book, book.TOKEN_PREFIX + "forged")
+
+    now = [1000.0]
+    monkeypatch.setattr(Core.time, "monotonic", lambda: now[0])
+    token = book.verify_main_key(MAIN_KEY, issue_token=True, uses=None, ttl=30)
+    assert all(_token_works(book, token) for _ in range(5))    # 不限次数
+    now[0] += 30
+    assert not _token_works(book, token)
+    assert book._tokens == {}     # 过期的令牌随即删除
+
+    token = book.verify_main_key(MAIN_KEY, issue_token=True, uses=None)
+    book.revoke_token(token)
+    assert not _token_works(book, token)
+
+
+def test_tokens_invalidated_by_lock_and_key_change(open_book):
+    book = open_book()
+    book.add_items(make_items(1), MAIN_KEY)
+    token = book.verify_main_key(MAIN_KEY, issue_token=True, uses=None)
+    book.lock()
+    assert not _token_works(book, token)
+    assert _token_works(book, MAIN_KEY)     # 锁定后重新派生密钥，二级密码照常可用
+
+    token = book.verify_main_key(MAIN_KEY, issue_token=True, uses=None)
+    assert book.change_main_key(MAIN_KEY, "new-key")
+    assert not _token_works(book, token)
+    assert _token_works(book, book.verify_main_key("new-key", issue_token=True))
+
+
+def test_close_waits_for_journal_compaction(tmp_path, open_book, monkeypatch):
+    book = open_book(journal=True)
+    book._journal.max_records = 3
+    events = []
+    save = book._storage.save
+
+    def slow_save(*args, **kwargs):
+        time.sleep(0.2)
+        save(*args, **kwargs)
+        events.append("save")
+
+    monkeypatch.setattr(book._storage, "save", slow_save)
+    monkeypatch.setattr(book._storage, "close", lambda: events.append("close"))
+    book.add_items(make_items(3), MAIN_KEY)     # 第3条记录触发后台压缩
+    assert book._compact_thread.is_alive()
+    book.close()
+    # 压缩写完检查点后才释放存储后端
+    assert events == ["save", "close"] and not book._compact_thread.is_alive()
+    assert not (tmp_path / "vault.json.journal").read_text(encoding="utf-8")
+
+
+def test_write_behind_timer_is_daemon_and_keeps_failures():
+    calls = []
+
+    def flush_fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("disk full")
+
+    scheduler = Core.FlushScheduler(flush_fn, 0.01)
+    scheduler.mark_dirty()
+    assert scheduler._timer.daemon
+    scheduler._timer.join()
+    # 后台写入失败：异常保留，变更仍为脏，下次flush()重试
+    assert isinstance(scheduler.error, OSError) and scheduler.dirty
+    scheduler.flush()
+    assert calls == [1, 1] and scheduler.error is None and not scheduler.dirty
+
+
+def test_unclosed_book_is_flushed_at_exit_without_waiting(tmp_path):
+    script = f"""
+import sys
+sys.path.insert(0, {os.path.dirname(os.path.abspath(Core.__file__))!r})
+from Core import KeyWordNoteBook
+from conftest import FAST_ARGON2, MAIN_KEY, make_items
+book = KeyWordNoteBook(MAIN_KEY, path={str(tmp_path / "vault.json")!r}, argon2_cost=FAST_ARGON2, flush_delay=60)
+book.add_items(make_items(2), MAIN_KEY)
+"""
+    # 没有调用close()：进程不等待60秒的写回窗口（否则超时），退出前写入剩余变更
+    subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, timeout=30, cwd=str(tmp_path))
+    data = json.loads((tmp_path / "vault.json").read_text(encoding="utf-8"))
+    assert sorted(data["ItemList"]) == ["1", "2"]
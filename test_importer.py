@@ -0,0 +1,115 @@
+"""
+导入的行为测试：格式识别、去重、分块提交
+"""
+import io
+import json
+import time
+
+import pytest
+
+import Importer
+from conftest import MAIN_KEY
+
+CHROME = ("﻿name,url,username,password,note\n"
+          "Gmail,https://mail.google.com/,me,p1,n\n"
+          "x,https://a.com,u,p2,\n"
+          "x,https://A.com/,u,dup,\n"
+          ",https://b.com,u,,\n")
+SAMPLES = {
+    "firefox.csv": ('"url","username","password","httpRealm","formActionOrigin","guid","timeCreated"\n'
+                    '"https://c.com","u","p3",,"https://c.com","{1}",1\n'),
+    "bitwarden.csv": ("folder,favorite,type,name,notes,fields,reprompt,login_uri,login_username,login_password\n"
+                      ',,login,D,,,,"https://d.com,https://d2.com",u,p4\n'
+                      ",,note,N,secret,,,,,\n"),
+    "keepassxc.csv": '"Group","Title","Username","Password","URL","Notes"\n"Root","e.com","u","p5","","nn"\n',
+    "keepass.csv": '"Account","Login Name","Password","Web Site","Comments"\n"Files","u","p6","https://f.com","c"\n',
+    "bitwarden.json": json.dumps({"encrypted": False, "folders": [], "items": [
+        {"type": 1, "name": "G", "notes": None,
+         "login": {"uris": [{"uri": "https://g.com"}], "username": "u", "password": "p7"}},
+        {"type": 2, "name": "note"}]}),
+    "export.json": json.dumps({"items": [{"Index": "9", "URL": "h.com", "UserName": "u", "Password": "p8",
+                                          "LinkURL": "l", "Note": ""}]}),
+}
+
+
+def _write(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _vault(book) -> dict:
+    items = book.get_items_by_ids([item["Index"] for item in book.get_non_secret_items()], MAIN_KEY)
+    return {item["URL"]: item for item in items}
+
+
+def test_formats_are_detected_and_mapped(tmp_path, open_book):
+    book = open_book()
+    for name, text in SAMPLES.items():
+        result = Importer.import_file(book, _write(tmp_path, name, text), MAIN_KEY)
+        assert result["imported"] == 1, name
+    vault = _vault(book)
+    assert {url: item["Password"] for url, item in vault.items()} == {
+        "https://c.com": "p3", "https://d.com": "p4", "e.com": "p5", "https://f.com": "p6",
+        "https://g.com": "p7", "h.com": "p8"}
+    assert vault["https://f.com"]["Note"] == "Files\nc"     # 名称不在网址中时写入备注
+    assert vault["h.com"]["LinkURL"] == "l"
+
+
+def test_dedupe_within_file_and_against_vault(tmp_path, open_book):
+    book = open_book()
+    path = _write(tmp_path, "chrome.csv", CHROME)
+    result = Importer.import_file(book, path, MAIN_KEY)
+    assert (result["read"], result["imported"], result["duplicates"]) == (4, 2, 1)
+    assert result["skipped"] == [{"at": 5, "reason": "没有密码"}]
+    assert _vault(book)["https://a.com"]["Password"] == "p2"    # 保留先出现的条目
+
+    again = Importer.import_file(book, path, MAIN_KEY)
+    assert (again["imported"], again["duplicates"]) == (0, 3)
+    assert Importer.import_file(book, path, "wrong") is None
+
+
+@pytest.mark.parametrize("name, options", [("vault.json", {}), ("vault.db", {}), ("vault.kwnb", {}),
+                                           ("vault.json", {"flush_delay": 0.01})])
+def test_chunks_keep_configured_size(tmp_path, open_book, name, options):
+    book = open_book(name, **options)
+    rows = "".join(f"s{i},https://s{i}.com,u,p{i},\n" for i in range(10))
+    path = _write(tmp_path, "rows.csv", "name,url,username,password,note\n" + rows)
+    sizes, writes = [], []
+    add_items, apply = book.add_items, book._storage.apply
+    book.add_items = lambda items, upw: (sizes.append(len(items)), time.sleep(0.02), add_items(items, upw))[2]
+    book._storage.apply = lambda *args, **kwargs: (writes.append(1), apply(*args, **kwargs))[1]
+
+    progress = []
+    result = Importer.import_file(book, path, MAIN_KEY, chunk_size=3, progress=lambda *p: progress.append(p))
+    assert result["imported"] == 10
+    assert sizes == [3, 3, 3, 1]
+    assert progress[-1] == (10, 10)
+    # 重写整个文件的后端只在导入结束时写入一次（写回定时器到期也不写入），增量后端每块写入一次
+    assert len(writes) == (4 if name.endswith(".db") else 1)
+
+    book.close()
+    assert len(_vault(open_book(name, verify_mode="full"))) == 10
+
+
+def test_error_keeps_committed_chunks(tmp_path, open_book):
+    book = open_book()
+    records = [{"URL": f"https://s{i}.com", "UserName": "u", "Password": f"p{i}"} for i in range(5)]
+    path = _write(tmp_path, "broken.json", json.dumps(records)[:-1] + ", {oops")
+    with pytest.raises(ValueError):
+        Importer.import_file(book, path, MAIN_KEY, chunk_size=2)
+    book.close()
+    # 出错前提交的两块已写入文件
+    assert len(_vault(open_book(verify_mode="full"))) == 4
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 7, 64])
+def test_json_stream_across_block_boundaries(monkeypatch, block_size):
+    monkeypatch.setattr(Importer._JSONStream.__init__, "__defaults__", (block_size,))
+    items = [{"type": 1, "n": 1.5e10, "s": "a,b]"}, [], -12, "x"]
+    for text in (json.dumps({"meta": {"a": [1, 2]}, "items": items, "tail": 3}),
+                 json.dumps(items, indent=3)):
+        assert list(Importer.iter_json_array(io.StringIO(text))) == items
+    assert list(Importer.iter_json_array(io.StringIO('{"other": 1}'))) == []
+    with pytest.raises(ValueError):
+        list(Importer.iter_json_array(io.StringIO("[1 2]")))
@@ -0,0 +1,97 @@
+"""
+检索索引的行为测试：排序、短查询、增量更新
+"""
+from Search import SearchIndex
+from conftest import MAIN_KEY, make_items
+
+
+def _index(items: dict) -> SearchIndex:
+    index = SearchIndex()
+    index.build(items)
+    return index
+
+
+def test_ranking_exact_prefix_word_substring_fuzzy():
+    index = _index({
+        "1": {"URL": "https://www.mail.example.com", "UserName": "bob"},
+        "2": {"URL": "mail.com", "UserName": "alice"},
+        "3": {"URL": "https://gmail.com", "UserName": "carol"},
+        "4": {"URL": "mailbox.org", "UserName": "dave"},
+        "5": {"URL": "shop.com", "UserName": "eve", "Note": "old mail account"},
+        "6": {"URL": "bank.com", "UserName": "frank"},
+    })
+    # 字段前缀（短的优先）> 词前缀 > 子串；不含查询的条目不返回
+    assert index.search("mail") == ["2", "4", "1", "5", "3"]
+    assert index.search("mail.com") == ["2", "3"]
+    assert index.search("MAIL", fields=["Note"]) == ["5"]
+    # 拼写错误按三元组重合比例模糊匹配
+    assert index.search("mailbx.org") == ["4"]
+    assert index.search("") == [] and index.search("mail", limit=0) == []
+
+
+def test_word_prefix_beats_earlier_substring():
+    # 同一字段中查询先以子串出现、后出现在词首，按词前缀计分
+    index = _index({"1": {"URL": "xabc.com"}, "2": {"URL": "abcabc.com/abc"}, "3": {"URL": "zz.com/xabc"}})
+    assert index.search("abc") == ["2", "1", "3"]
+
+
+def test_short_queries_use_word_prefixes_before_scanning():
+    items = {str(i): {"URL": f"site{i}.com", "UserName": f"user{i}"} for i in range(1, 5001)}
+    items["5001"] = {"URL": "other.com", "UserName": "qx"}
+    items["5002"] = {"URL": "other.com", "UserName": "aqx"}
+    index = _index(items)
+    # 词首匹配排在词中匹配之前；少见的短查询在大量条目中也能找全
+    assert index.search("qx") == ["5001", "5002"]
+    assert index.search("q") == ["5001", "5002"]
+    assert len(index.search("s", limit=10)) == 10
+
+
+def test_unselective_query_is_bounded():
+    items = {str(i): {"URL": f"https://site{i}.example.com/login"} for i in range(1, 20001)}
+    index = _index(items)
+    result = index.search("/login", limit=50)
+    assert len(result) == 50 and all(No in items for No in result)
+
+
+def test_incremental_update_and_compaction():
+    index = _index({"1": {"URL": "alpha.com"}, "2": {"URL": "beta.com"}})
+    index.update(put={"3": {"URL": "alphabet.org"}}, delete=["2"])
+    assert index.search("alpha") == ["1", "3"]
+    assert index.search("beta") == []
+    index.update(put={"1": {"URL": "gamma.com"}})
+    assert index.search("alpha") == ["3"]
+    assert index.search("gam") == ["1"]
+
+    # 失效文档过多时整体重建，结果不变
+    for round_ in range(3):
+        index.update(put={str(i): {"URL": f"host{i}-{round_}.net"} for i in range(10, 1200)})
+    assert index._dead <= len(index)
+    assert index.search("host500-2") == ["500"]
+    assert index.search("host500-1", fields=["URL"])[0] == "500"    # 旧文本已失效，只剩模糊匹配
+    assert index.search("host500-2.net") == ["500"]
+    assert index.search("gamma") == ["1"]
+
+
+def test_core_search_follows_edits(open_book):
+    book = open_book(search_index=True)
+    assert book._search_index is not None
+    book.add_items(make_items(3), MAIN_KEY)
+    assert [item["Index"] for item in book.search("site1")] == ["2"]
+    book.delete_item("2", MAIN_KEY)
+    assert book.search("site1") == []
+    assert [item["URL"] for item in book.search("site2")] == ["https://site2.example.com"]
+
+
+def test_compaction_does_not_normalize_twice():
+    items = {"1": {"URL": "https://www.www.shop.com", "LinkURL": "http://https://pay.example"},
+             "2": {"URL": "https://bank.com"}}
+    index = _index(items)
+    # 协议头和www.只去掉一层，剩下的部分仍可检索
+    queries = ("www.www.shop", "s://pay", "shop")
+    expected = [index.search(q) for q in queries]
+    assert expected == [["1"], ["1"], ["1"]]
+    # 反复修改其他条目直到触发整体重建，未修改的条目检索结果不变
+    for round_ in range(3):
+        index.update(put={str(i): {"URL": f"host{i}-{round_}.net"} for i in range(10, 1200)})
+    assert index._dead == 0
+    assert [index.search(q) for q in queries] == expected
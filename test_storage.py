@@ -0,0 +1,90 @@
+"""
+存储后端的行为测试：索引容器读写往返、写入失败后的映射
+"""
+import base64
+import json
+import os
+
+import pytest
+
+import Storage
+from Storage import IndexedStorage, LazyRecords, migrate, open_storage
+
+TOKEN = base64.urlsafe_b64encode(bytes(range(80))).decode("ascii")     # 形如Fernet令牌的密文
+
+
+def _load_dict(n: int = 20) -> dict:
+    items = {}
+    for i in range(1, n + 1):
+        items[str(i)] = {"Index": str(i), "URL": f"https://site{i}.example.com/" + "path/" * (i % 4),
+                         "UserName": f"用户{i}", "Password": TOKEN, "LinkURL": "", "Note": "备注" * i,
+                         "PasswordLevel": i % 5, "Fingerprint": f"{i:064x}"}
+    items["3"].update(Breached=True, Custom={"nested": [1, 2]})
+    items["4"]["Password"] = "not-base64!"
+    items["5"]["Index"] = "五"      # Index与偏移表不一致时原样保存
+    return {"ARGON2_PARAMS": {"memory_cost": 8192, "merkle_root": "ab" * 32},
+            "ItemList": items,
+            "ItemMAC": {No: f"{int(No):02x}" * 32 for No in items},
+            "FrequentlyKeys": {"1": {"Password": TOKEN}}}
+
+
+def _plain(load_dict: dict) -> dict:
+    return {**load_dict, "ItemList": {No: dict(item) for No, item in load_dict["ItemList"].items()},
+            "ItemMAC": dict(load_dict["ItemMAC"])}
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_container_round_trip(tmp_path, compress):
+    data = _load_dict()
+    storage = IndexedStorage(str(tmp_path / "v.kwnb"), compress=compress)
+    storage.save(data)
+    loaded = storage.load()
+    assert isinstance(loaded["ItemList"], LazyRecords)
+    assert _plain(loaded) == data
+
+    # 读取部分条目并修改其中一个后再写入：未修改的记录按原始字节复制，修改的重新编码
+    loaded["ItemList"]["2"]
+    loaded["ItemList"]["7"] = {**loaded["ItemList"]["7"], "Note": "changed"}
+    del loaded["ItemList"]["9"]
+    del loaded["ItemMAC"]["9"]
+    storage.save(loaded)
+    expected = _load_dict()
+    expected["ItemList"]["7"]["Note"] = "changed"
+    del expected["ItemList"]["9"], expected["ItemMAC"]["9"]
+    assert _plain(loaded) == expected
+    storage.close()
+    assert _plain(IndexedStorage(str(tmp_path / "v.kwnb")).load()) == expected
+
+
+def test_migrate_between_formats(tmp_path):
+    data = _load_dict()
+    data["ItemList"]["5"]["Index"] = "5"    # SQLite以Index为行键，不保存不一致的Index
+    paths = [str(tmp_path / name) for name in ("a.json", "b.kwnb", "c.db", "d.kwnb", "e.json")]
+    open_storage(paths[0]).save(data)
+    for src, dst in zip(paths, paths[1:]):
+        migrate(src, dst)
+    result = open_storage(paths[-1]).load()
+    assert result == json.loads(json.dumps(data))
+
+
+@pytest.mark.parametrize("os_name", ["posix", "nt"])
+def test_failed_replace_keeps_records_readable(tmp_path, monkeypatch, os_name):
+    path = str(tmp_path / "v.kwnb")
+    IndexedStorage(path).save(_load_dict())
+    storage = IndexedStorage(path)
+    loaded = storage.load()
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Storage.os, "name", os_name)    # nt：替换前先解除映射，失败后需恢复
+    monkeypatch.setattr(Storage.os, "replace", fail)
+    loaded["ItemList"]["1"] = {**loaded["ItemList"]["1"], "Note": "unsaved"}
+    with pytest.raises(OSError):
+        storage.save(loaded)
+    monkeypatch.undo()
+
+    assert not os.path.exists(path + ".tmp")
+    assert loaded["ItemList"]["12"]["UserName"] == "用户12"     # 未解码的记录仍可从旧文件读取
+    storage.save(loaded)
+    assert IndexedStorage(path).load()["ItemList"]["1"]["Note"] == "unsaved"
@@ -0,0 +1,67 @@
+"""
+密码强度评估的行为测试：常见弱模式、批量与逐个评估一致
+"""
+import pytest
+
+from Core import KeyItem, KeyWordNoteBook
+from Strength import password_level, score_all
+from conftest import MAIN_KEY
+
+# (密码, 最高等级)：被常见模式覆盖大部分的密码不论字符种类多丰富都封顶
+WEAK = [
+    ("19900101", 1),                # 日期
+    ("1988-07-15", 2),
+    ("Jan1988!", 2),
+    ("qwertyuiop", 1),              # 键盘路径
+    ("1qaz2wsx3edc", 1),            # 竖向键盘路径
+    ("zxcvbnm,./", 1),
+    ("asdfghjkl;", 1),
+    ("P@ssw0rd", 1),                # leet变形的词典词
+    ("p@ssw0rd!", 1),
+    ("Dr@g0n2024", 1),
+    ("abcdefgh", 1),                # 顺序
+    ("98765432", 1),
+    ("aaaaaaaa", 1),                # 重复
+    ("abcabcabcabc", 1),
+    ("5201314", 0),
+]
+STRONG = [
+    ("xK9#mQ2$vL7@pR4!", 5),
+    ("Lz#4qPw9", 4),
+    ("Tr0ub4dor&3", 4),
+    ("correct horse battery staple", 4),
+]
+
+
+@pytest.mark.parametrize("password, highest", WEAK)
+def test_weak_patterns_are_capped(password, highest):
+    assert password_level(password) <= highest
+
+
+@pytest.mark.parametrize("password, level", STRONG)
+def test_strong_passwords(password, level):
+    assert password_level(password) == level
+
+
+def test_batch_matches_single():
+    keys = [p for p, _ in WEAK + STRONG] + ["", "Ab1!", "密码测试1234abc", "hello\0world", "qwer", "P@ssw0rd", None]
+    # 同一批中的密码连接后扫描，模式不能跨越相邻两个密码
+    assert score_all(keys) == [password_level(k) if isinstance(k, str) else 0 for k in keys]
+    assert score_all(["qwe", "rty"]) == [password_level("qwe"), password_level("rty")]
+
+
+def test_core_score_all_rescores_stale_levels(open_book, monkeypatch):
+    book = open_book()
+    passwords = ["19900101", "xK9#mQ2$vL7@pR4!", "P@ssw0rd", "Lz#4qPw9"]
+    with monkeypatch.context() as patch:    # 模拟按旧算法评估的等级
+        patch.setattr(KeyWordNoteBook, "get_password_level", staticmethod(lambda key: 3))
+        for i, password in enumerate(passwords):
+            item = KeyItem()
+            item.update({"URL": f"https://s{i}.com", "UserName": "u", "Password": password})
+            book.add_item(item, MAIN_KEY)
+
+    expected = [password_level(p) for p in passwords]
+    assert book.score_all("wrong") == -1
+    assert book.score_all(MAIN_KEY) == sum(level != 3 for level in expected)
+    assert [book.get_non_secret_item(str(i + 1))["PasswordLevel"] for i in range(4)] == expected
+    assert book.score_all(MAIN_KEY) == 0